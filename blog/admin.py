@@ -1,6 +1,6 @@
 from django.contrib import admin
 from markdownx.admin import MarkdownxModelAdmin
-from .models import Post, Category, Tag, Comment
+from .models import Post, Category, Tag, Comment, Job
 
 admin.site.register(Post, MarkdownxModelAdmin)
 admin.site.register(Comment)
@@ -16,3 +16,11 @@ class TagAdmin(admin.ModelAdmin):
 
 admin.site.register(Category, CategoryAdmin)
 admin.site.register(Tag, TagAdmin)
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'args', 'status', 'attempts', 'run_at', 'updated_at')
+    list_filter = ('status', 'name')
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,256 @@
+import json
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+from .models import Post, Category, Tag, Comment
+from .pagination import keyset_paginate
+from .page_cache import cache_anonymous_page
+
+# 읽기 전용 JSON API (/api/<resource>/).
+#   ?fields=id,title     돌려줄 필드 (없으면 resource의 기본 필드)
+#   ?after=, ?before=    pk 커서 (blog/pagination.py), ?limit=  한 페이지 크기
+#   ?ids=1,2,3           id 목록으로 한 번에 조회 (요청한 순서대로)
+#   /api/<resource>/export/   전체를 한 줄씩 직렬화하며 스트리밍한다 (메모리에 다 올리지 않는다)
+# 포스트는 HTML 뷰와 같은 Post.objects.for_list()/for_detail()을 쓰고, 요청한 필드에 필요한 컬럼만 더 읽는다.
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_IDS = 100
+EXPORT_CHUNK_SIZE = 500
+
+
+class ApiError(Exception):
+    pass
+
+
+def _ref(obj):
+    return {'id': obj.pk, 'name': obj.name, 'slug': obj.slug} if obj else None
+
+
+def _username(user):
+    return user.username if user else None
+
+
+def _url(file):
+    return file.url if file else None
+
+
+# 필드 이름: (값을 만드는 함수, 그 필드에 필요한 지연(defer)된 컬럼)
+POST_FIELDS = {
+    'id': (lambda post: post.pk, ()),
+    'title': (lambda post: post.title, ()),
+    'hook_text': (lambda post: post.hook_text, ()),
+    'url': (lambda post: post.get_absolute_url(), ()),
+    'author': (lambda post: _username(post.author), ()),
+    'category': (lambda post: _ref(post.category), ()),
+    'tags': (lambda post: [_ref(tag) for tag in post.tags.all()], ()),
+    'created_at': (lambda post: post.created_at, ()),
+    'updated_at': (lambda post: post.updated_at, ()),
+    'excerpt_html': (lambda post: post.get_excerpt(), ()),
+    'content_html': (lambda post: post.get_content_markdown(), ('content_html',)),
+    'content': (lambda post: post.content, ('content',)),
+    'word_count': (lambda post: post.word_count, ()),
+    'comment_count': (lambda post: post.comment_count, ()),
+    'download_count': (lambda post: post.download_count, ()),
+    'head_image': (lambda post: _url(post.head_image), ()),
+    'file': (lambda post: post.get_download_url() if post.file_upload else None, ()),
+}
+TAXONOMY_FIELDS = {
+    'id': (lambda obj: obj.pk, ()),
+    'name': (lambda obj: obj.name, ()),
+    'slug': (lambda obj: obj.slug, ()),
+    'url': (lambda obj: obj.get_absolute_url(), ()),
+    'post_count': (lambda obj: obj.post_count, ()),
+}
+COMMENT_FIELDS = {
+    'id': (lambda comment: comment.pk, ()),
+    'post': (lambda comment: comment.post_id, ()),
+    'author': (lambda comment: _username(comment.author), ()),
+    'content': (lambda comment: comment.content, ()),
+    'created_at': (lambda comment: comment.created_at, ()),
+    'modified_at': (lambda comment: comment.modified_at, ()),
+}
+
+
+def _posts(fields, detail):
+    queryset = Post.objects.for_detail() if detail else Post.objects.for_list()
+    if not detail:
+        # for_list()가 미뤄 둔 본문 컬럼 중 요청한 필드에 필요한 것만 읽는다
+        needed = {column for field in fields for column in POST_FIELDS[field][1]}
+        queryset = queryset.defer(None).defer(*({'content', 'content_html'} - needed))
+    if 'tags' not in fields:
+        queryset = queryset.prefetch_related(None)
+    return queryset
+
+
+# resource 이름: 설정
+#   queryset(fields, detail), fields, default(목록 기본 필드), detail(상세 기본 필드),
+#   filters: {쿼리 파라미터: 조회 조건}, descending: 커서 순서 (True면 최신순)
+RESOURCES = {
+    'posts': {
+        'queryset': _posts,
+        'fields': POST_FIELDS,
+        'default': ['id', 'title', 'hook_text', 'url', 'author', 'category', 'tags', 'created_at', 'updated_at',
+                    'excerpt_html', 'comment_count'],
+        'detail': ['id', 'title', 'hook_text', 'url', 'author', 'category', 'tags', 'created_at', 'updated_at',
+                   'content_html', 'word_count', 'comment_count', 'head_image', 'file'],
+        'filters': {'category': 'category__slug', 'tag': 'tags__slug', 'author': 'author__username'},
+        'descending': True,
+    },
+    'categories': {
+        'queryset': lambda fields, detail: Category.objects.all(),
+        'fields': TAXONOMY_FIELDS,
+        'default': list(TAXONOMY_FIELDS),
+        'detail': list(TAXONOMY_FIELDS),
+        'filters': {},
+        'descending': False,
+    },
+    'tags': {
+        'queryset': lambda fields, detail: Tag.objects.all(),
+        'fields': TAXONOMY_FIELDS,
+        'default': list(TAXONOMY_FIELDS),
+        'detail': list(TAXONOMY_FIELDS),
+        'filters': {},
+        'descending': False,
+    },
+    'comments': {
+        'queryset': lambda fields, detail: Comment.objects.select_related('author'),
+        'fields': COMMENT_FIELDS,
+        'default': list(COMMENT_FIELDS),
+        'detail': list(COMMENT_FIELDS),
+        'filters': {'post': 'post_id'},
+        'descending': True,
+    },
+}
+
+
+def _resource(name):
+    try:
+        return RESOURCES[name]
+    except KeyError:
+        raise Http404(f'없는 API입니다: {name}')
+
+
+def _fields(request, spec, detail=False):
+    value = request.GET.get('fields')
+    if not value:
+        return spec['detail' if detail else 'default']
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in spec['fields']]
+    if unknown:
+        raise ApiError(f"알 수 없는 필드: {', '.join(unknown)} (가능한 필드: {', '.join(spec['fields'])})")
+    return fields
+
+
+def _int_list(value, limit):
+    try:
+        ids = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise ApiError('ids는 쉼표로 구분한 숫자여야 합니다.')
+    if len(ids) > limit:
+        raise ApiError(f'ids는 {limit}개까지 요청할 수 있습니다.')
+    return ids
+
+
+def _limit(request):
+    try:
+        return min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        raise ApiError('limit은 숫자여야 합니다.')
+
+
+def _cursor(request, param):
+    value = request.GET.get(param)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f'{param}는 숫자 커서여야 합니다: {value}')
+
+
+def _queryset(request, spec, fields, detail=False):
+    queryset = spec['queryset'](fields, detail)
+    for param, lookup in spec['filters'].items():
+        if param in request.GET:
+            value = request.GET[param]
+            try:
+                queryset = queryset.filter(**{lookup: value})
+            except (ValueError, ValidationError):  # 숫자 필드에 문자를 넘긴 경우 등
+                raise ApiError(f'{param} 값이 올바르지 않습니다: {value}')
+    return queryset
+
+
+def serialize(obj, spec, fields):
+    return {field: spec['fields'][field][0](obj) for field in fields}
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def api_view(view_func):
+    # 잘못된 파라미터는 400과 JSON 오류로 돌려준다. 로그인하지 않은 요청의 응답은 HTML 페이지처럼 캐시한다
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view_func(request, *args, **kwargs)
+        except ApiError as e:
+            return _json({'error': str(e)}, status=400)
+    return require_safe(cache_anonymous_page(wrapper))
+
+
+@api_view
+def resource_list(request, resource):
+    spec = _resource(resource)
+    fields = _fields(request, spec)
+    queryset = _queryset(request, spec, fields)
+
+    if 'ids' in request.GET:
+        ids = _int_list(request.GET['ids'], MAX_IDS)
+        found = queryset.in_bulk(ids)
+        return _json({
+            'results': [serialize(found[pk], spec, fields) for pk in ids if pk in found],
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+    page = keyset_paginate(
+        queryset, _limit(request), after=_cursor(request, 'after'), before=_cursor(request, 'before'),
+        descending=spec['descending'],
+    )
+    return _json({
+        'results': [serialize(obj, spec, fields) for obj in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+@api_view
+def resource_detail(request, resource, pk):
+    spec = _resource(resource)
+    fields = _fields(request, spec, detail=True)
+    obj = get_object_or_404(_queryset(request, spec, fields, detail=True), pk=pk)
+    return _json(serialize(obj, spec, fields))
+
+
+@require_safe
+def resource_export(request, resource):
+    # 페이지 캐시에 넣지 않는다. 결과 전체를 메모리에 만들지 않도록 EXPORT_CHUNK_SIZE개씩 읽어 바로 내보낸다
+    spec = _resource(resource)
+    try:
+        fields = _fields(request, spec)
+        queryset = _queryset(request, spec, fields).order_by('pk')
+    except ApiError as e:
+        return _json({'error': str(e)}, status=400)
+
+    def rows():
+        yield '['
+        for i, obj in enumerate(queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)):
+            row = json.dumps(serialize(obj, spec, fields), cls=DjangoJSONEncoder, ensure_ascii=False)
+            yield f',\n{row}' if i else f'\n{row}'
+        yield '\n]\n'
+    return StreamingHttpResponse(rows(), content_type='application/json')
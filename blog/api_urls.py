@@ -0,0 +1,9 @@
+from django.urls import path
+from . import api
+
+# /api/ 아래의 읽기 전용 JSON API. resource는 blog/api.py의 RESOURCES (posts, categories, tags, comments)
+urlpatterns = [
+    path('<str:resource>/export/', api.resource_export),
+    path('<str:resource>/<int:pk>/', api.resource_detail),
+    path('<str:resource>/', api.resource_list),
+]
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import async_views
+
+# 읽기 전용 페이지만 async 뷰로 바꾼다. 나머지(글쓰기, 댓글 등)는 blog/urls.py의 동기 뷰를 그대로 쓴다
+urlpatterns = [
+    path('search/<str:q>/', async_views.post_search),
+    path('tag/<str:slug>/', async_views.tag_page),
+    path('category/<str:slug>/', async_views.category_page),
+    path('', async_views.post_list),
+    path('<int:pk>/', async_views.post_detail),
+]
@@ -0,0 +1,118 @@
+from asgiref.sync import sync_to_async
+from django.core.paginator import Paginator
+from django.shortcuts import render, aget_object_or_404
+
+from .models import Post, Category, Tag
+from .forms import CommentForm
+from .sidebar import aget_sidebar
+from .comments import comment_order, aget_comment_page
+from .search import search_post_ids
+from .pagination import akeyset_paginate
+from .related import aget_related_posts
+from .page_cache import cache_anonymous_page
+from .conditional import (
+    async_condition, post_detail_etag, post_detail_last_modified, post_list_etag, post_list_last_modified,
+)
+
+# ASGI 서버에서 쓰는 읽기 전용 async 뷰 (blogcraft_django/asgi_urls.py).
+# views.py의 같은 이름 뷰와 같은 템플릿, 같은 쿼리셋을 쓰지만 DB는 async ORM으로 읽어서
+# 느린 클라이언트가 많아도 요청마다 스레드를 잡고 있지 않는다.
+# 글 목록 같은 주요 데이터는 async ORM으로 미리 불러오고, 템플릿 렌더링은 allauth 태그처럼
+# 템플릿 안에서 DB를 읽는 경우가 있어 sync_to_async로 스레드에서 실행한다.
+
+PER_PAGE = 5
+
+arender = sync_to_async(render)
+
+
+async def _posts(queryset):
+    return [post async for post in queryset]
+
+
+@async_condition(etag_func=post_list_etag, last_modified_func=post_list_last_modified())
+@cache_anonymous_page
+async def post_list(request):
+    queryset = Post.objects.for_list()
+    if 'page' in request.GET:  # 예전 ?page= 링크
+        paginator = Paginator(queryset.order_by('-pk'), PER_PAGE)
+        page = await sync_to_async(paginator.get_page)(request.GET['page'])
+        posts = await _posts(page.object_list)
+        is_paginated, keyset = paginator.num_pages > 1, False
+    else:
+        page = await akeyset_paginate(
+            queryset, PER_PAGE, after=request.GET.get('after'), before=request.GET.get('before'),
+        )
+        posts = page.object_list
+        is_paginated, keyset = page.has_next() or page.has_previous(), True
+
+    return await arender(request, 'blog/post_list.html', {
+        'post_list': posts,
+        'page_obj': page,
+        'is_paginated': is_paginated,
+        'keyset': keyset,
+        **await aget_sidebar(),
+    })
+
+
+@async_condition(etag_func=post_detail_etag, last_modified_func=post_detail_last_modified)
+@cache_anonymous_page
+async def post_detail(request, pk):
+    post = await aget_object_or_404(Post.objects.for_detail(), pk=pk)
+    order = comment_order(request.GET.get('comments'))
+    comments = await aget_comment_page(post.pk, order)
+
+    return await arender(request, 'blog/post_detail.html', {
+        'post': post,
+        'object': post,
+        'comments': comments,
+        'comment_order': order,
+        'comment_form': CommentForm,
+        'related_posts': await aget_related_posts(post.pk),
+        **await aget_sidebar(),
+    })
+
+
+@async_condition(etag_func=post_list_etag, last_modified_func=post_list_last_modified('category'))
+@cache_anonymous_page
+async def category_page(request, slug):
+    if slug == 'no_category':
+        category = '미분류'
+        post_list = Post.objects.for_list().filter(category=None)
+    else:
+        category = await aget_object_or_404(Category, slug=slug)
+        post_list = Post.objects.for_list().filter(category=category)
+
+    return await arender(request, 'blog/post_list.html', {
+        'post_list': await _posts(post_list),
+        'category': category,
+        **await aget_sidebar(),
+    })
+
+
+@async_condition(etag_func=post_list_etag, last_modified_func=post_list_last_modified('tag'))
+@cache_anonymous_page
+async def tag_page(request, slug):
+    tag = await aget_object_or_404(Tag, slug=slug)
+
+    return await arender(request, 'blog/post_list.html', {
+        'post_list': await _posts(Post.objects.for_list().filter(tags=tag)),
+        'tag': tag,
+        **await aget_sidebar(),
+    })
+
+
+@async_condition(etag_func=post_list_etag, last_modified_func=post_list_last_modified())
+@cache_anonymous_page
+async def post_search(request, q):
+    post_ids = await sync_to_async(search_post_ids)(q)  # FTS5 raw 쿼리는 async ORM이 없다
+    paginator = Paginator(post_ids, PER_PAGE)
+    page = paginator.get_page(request.GET.get('page'))
+    posts = await Post.objects.for_list().ain_bulk(page.object_list)
+
+    return await arender(request, 'blog/post_list.html', {
+        'post_list': [posts[pk] for pk in page.object_list if pk in posts],
+        'page_obj': page,
+        'is_paginated': paginator.num_pages > 1,
+        'search_info': f'Search: {q} ({paginator.count})',
+        **await aget_sidebar(),
+    })
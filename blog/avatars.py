@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from allauth.socialaccount.models import SocialAccount
+
+AVATAR_CACHE_TIMEOUT = 60 * 60 * 24  # 소셜 계정이 바뀌면 signal로 무효화된다
+
+
+def avatar_cache_key(user_id):
+    return f'blog:avatar:{user_id}'
+
+
+def default_avatar_url(user):
+    email = user.email if user is not None else ''
+    return f'https://api.dicebear.com/9.x/lorelei/svg?seed={email}'
+
+
+def _resolve(user, social_accounts):
+    # socialaccount_set.first()와 같은 계정(pk가 가장 작은 것)을 사용
+    if social_accounts:
+        return min(social_accounts, key=lambda a: a.pk).get_avatar_url()
+    return default_avatar_url(user)
+
+
+def avatar_url_for(user):
+    if user is None:
+        return default_avatar_url(user)
+    url = getattr(user, '_avatar_url', None)  # prefetch_avatars()로 미리 채워둔 값
+    if url is not None:
+        return url
+
+    url = cache.get(avatar_cache_key(user.pk))
+    if url is None:
+        prefetched = getattr(user, '_prefetched_objects_cache', {})
+        if 'socialaccount_set' in prefetched:
+            accounts = list(prefetched['socialaccount_set'])
+        else:
+            accounts = list(user.socialaccount_set.order_by('pk')[:1])
+        url = _resolve(user, accounts)
+        cache.set(avatar_cache_key(user.pk), url, AVATAR_CACHE_TIMEOUT)
+    user._avatar_url = url
+    return url
+
+
+def prefetch_avatars(users):
+    """여러 유저의 아바타 URL을 캐시 조회 한 번, 쿼리 최대 한 번으로 채운다."""
+    # select_related로 가져온 유저는 댓글마다 다른 인스턴스이므로 pk별로 묶는다
+    by_pk = {}
+    for user in users:
+        if user is not None:
+            by_pk.setdefault(user.pk, []).append(user)
+    if not by_pk:
+        return
+    urls = {}
+    cached = cache.get_many([avatar_cache_key(pk) for pk in by_pk])
+    for pk in by_pk:
+        if avatar_cache_key(pk) in cached:
+            urls[pk] = cached[avatar_cache_key(pk)]
+
+    missing = [pk for pk in by_pk if pk not in urls]
+    if missing:
+        accounts = {}
+        for account in SocialAccount.objects.filter(user_id__in=missing):
+            accounts.setdefault(account.user_id, []).append(account)
+        for pk in missing:
+            urls[pk] = _resolve(by_pk[pk][0], accounts.get(pk))
+        cache.set_many({avatar_cache_key(pk): urls[pk] for pk in missing}, AVATAR_CACHE_TIMEOUT)
+
+    for pk, same_users in by_pk.items():
+        for user in same_users:
+            user._avatar_url = urls[pk]
+
+
+def invalidate_avatar(user_id):
+    cache.delete(avatar_cache_key(user_id))
@@ -0,0 +1,30 @@
+from asgiref.sync import sync_to_async
+from .models import Comment
+from .avatars import prefetch_avatars
+from .pagination import keyset_paginate, akeyset_paginate
+
+# 포스트 상세 페이지의 댓글은 한 페이지씩 keyset으로 가져온다.
+# 첫 페이지는 상세 페이지에 바로 그리고, 다음 페이지는 /blog/<pk>/comments/?after=<cursor> 로 받아 이어붙인다.
+
+COMMENTS_PER_PAGE = 20
+NEWEST, OLDEST = 'newest', 'oldest'
+
+
+def comment_order(value):
+    return OLDEST if value == OLDEST else NEWEST  # 기본은 최신순 (방금 쓴 댓글이 첫 페이지에 보이도록)
+
+
+def _comments(post_id):
+    return Comment.objects.filter(post_id=post_id).select_related('author')
+
+
+def get_comment_page(post_id, order=NEWEST, after=None):
+    page = keyset_paginate(_comments(post_id), COMMENTS_PER_PAGE, after=after, descending=order == NEWEST)
+    prefetch_avatars([comment.author for comment in page])  # 댓글 작성자 아바타를 한 번에 가져온다
+    return page
+
+
+async def aget_comment_page(post_id, order=NEWEST, after=None):
+    page = await akeyset_paginate(_comments(post_id), COMMENTS_PER_PAGE, after=after, descending=order == NEWEST)
+    await sync_to_async(prefetch_avatars)([comment.author for comment in page])
+    return page
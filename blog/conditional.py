@@ -0,0 +1,114 @@
+import datetime
+from functools import wraps
+from hashlib import md5
+
+from asgiref.sync import sync_to_async
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .models import Post, RelatedPost
+from .page_cache import get_content_version, request_feed_versions
+
+# django.views.decorators.http.condition()에 넘기는 함수들.
+# 템플릿을 렌더링하기 전에 가벼운 쿼리 하나로 ETag/Last-Modified를 계산해서, 바뀐 게 없으면 304를 돌려준다.
+
+
+def _user_key(request):
+    # 로그인한 사용자는 수정 버튼, 댓글 폼 등이 다르게 보이므로 사용자마다 다른 ETag를 준다
+    return request.user.pk if request.user.is_authenticated else 0
+
+
+def _post_detail_state(request, pk):
+    if not hasattr(request, '_post_detail_state'):
+        # 관련 포스트 목록은 run_worker가 나중에 다시 계산하므로 계산한 시각도 함께 본다 (blog/related.py)
+        related_at = (
+            RelatedPost.objects.filter(post_id=OuterRef('pk')).order_by('-computed_at').values('computed_at')[:1]
+        )
+        rows = Post.objects.filter(pk=pk).values('updated_at', 'comment_count').annotate(
+            last_comment_at=Max('comment__modified_at'), related_at=Subquery(related_at),
+        ).order_by().values_list('updated_at', 'last_comment_at', 'comment_count', 'related_at')[:1]
+        request._post_detail_state = rows[0] if rows else None
+    return request._post_detail_state
+
+
+def post_detail_last_modified(request, pk):
+    state = _post_detail_state(request, pk)
+    if state is None:
+        return None  # 없는 포스트는 뷰에서 404를 낸다
+    updated_at, last_comment_at, num_comments, related_at = state
+    return max(t for t in (updated_at, last_comment_at, related_at) if t is not None)
+
+
+def post_detail_etag(request, pk):
+    state = _post_detail_state(request, pk)
+    if state is None:
+        return None
+    # 댓글이 삭제된 경우는 개수로, 관련 포스트 목록이 비워진 경우는 related_at이 None이 되는 것으로 알 수 있다
+    updated_at, last_comment_at, num_comments, related_at = state
+    key = f'{pk}:{updated_at}:{last_comment_at}:{num_comments}:{related_at}:{_user_key(request)}'
+    return md5(key.encode()).hexdigest()
+
+
+def _list_posts(slug=None, kind=None):
+    if kind == 'category':
+        return Post.objects.filter(category=None) if slug == 'no_category' else Post.objects.filter(category__slug=slug)
+    if kind == 'tag':
+        return Post.objects.filter(tags__slug=slug)
+    return Post.objects.all()
+
+
+def post_list_last_modified(kind=None):
+    def last_modified(request, slug=None, **kwargs):
+        return _list_posts(slug, kind).aggregate(last=Max('updated_at'))['last']
+    return last_modified
+
+
+def post_list_etag(request, *args, **kwargs):
+    # 목록에는 사이드바, 삭제된 포스트 등 여러 모델이 보이므로 페이지 캐시의 내용 버전을 그대로 쓴다
+    key = f'{get_content_version()}:{request.get_full_path()}:{_user_key(request)}'
+    return md5(key.encode()).hexdigest()
+
+
+def feed_etag(scopes):
+    def etag(request, *args, **kwargs):
+        versions = request_feed_versions(request, scopes, *args, **kwargs)
+        return md5(f'{versions}:{request.get_full_path()}'.encode()).hexdigest()
+    return etag
+
+
+def feed_last_modified(scopes):
+    def last_modified(request, *args, **kwargs):
+        # 피드 버전은 그 범위가 마지막으로 바뀐 시각(ns)이다
+        versions = request_feed_versions(request, scopes, *args, **kwargs)
+        return datetime.datetime.fromtimestamp(max(versions) / 1e9, datetime.timezone.utc)
+    return last_modified
+
+
+def async_condition(etag_func=None, last_modified_func=None):
+    """async 뷰용 condition(). ETag/Last-Modified 함수는 ORM을 쓰므로 sync_to_async로 실행한다."""
+    def validators(request, *args, **kwargs):
+        etag = etag_func(request, *args, **kwargs) if etag_func else None
+        last_modified = last_modified_func(request, *args, **kwargs) if last_modified_func else None
+        return etag, last_modified
+
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            etag, last_modified = await sync_to_async(validators)(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+            if last_modified is not None:
+                if not timezone.is_aware(last_modified):
+                    last_modified = timezone.make_aware(last_modified, datetime.timezone.utc)
+                last_modified = int(last_modified.timestamp())
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view_func(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return wrapper
+    return decorator
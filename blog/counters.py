@@ -0,0 +1,114 @@
+from collections import Counter
+
+from django.db.models import Count, F
+from .models import Post, Category, Tag
+
+# Category.post_count, Tag.post_count, Post.comment_count를 유지하는 함수들 (blog/signals.py에서 연결).
+# 동시에 들어온 요청끼리 값을 덮어쓰지 않도록 항상 F() 식으로 DB에서 더하고 뺀다.
+# QuerySet.update()처럼 신호가 가지 않는 경로로 바뀐 값은 manage.py recount로 바로잡는다.
+
+DEFERRED = object()
+Through = Post.tags.through
+
+
+def _add(queryset, field, delta):
+    if delta:
+        queryset.update(**{field: F(field) + delta})
+
+
+def _add_to_tags(tag_ids, sign):
+    # 같은 태그가 여러 번 나오면 한 번에 더한다 (태그 쪽에서 post_set.add(...)를 한 경우)
+    by_delta = {}
+    for tag_id, n in Counter(tag_ids).items():
+        by_delta.setdefault(n, []).append(tag_id)
+    for n, ids in by_delta.items():
+        _add(Tag.objects.filter(pk__in=ids), 'post_count', sign * n)
+
+
+def _linked_tag_ids(instance, reverse, pk_set):
+    # 실제로 연결되어 있는 (post, tag) 쌍의 tag_id. remove()에 연결되지 않은 pk가 섞여 와도 세지 않는다
+    if reverse:
+        rows = Through.objects.filter(tag_id=instance.pk)
+        if pk_set is not None:
+            rows = rows.filter(post_id__in=pk_set)
+    else:
+        rows = Through.objects.filter(post_id=instance.pk)
+        if pk_set is not None:
+            rows = rows.filter(tag_id__in=pk_set)
+    return list(rows.values_list('tag_id', flat=True))
+
+
+def remember_category(instance):
+    instance._counted_category_id = instance.__dict__.get('category_id', DEFERRED)
+
+
+def post_saved(instance, created, update_fields):
+    old = None if created else getattr(instance, '_counted_category_id', DEFERRED)
+    instance._saved_from_category_id = old  # 피드 캐시 범위에서 쓴다 (blog/feed_scopes.py)
+    if update_fields is not None and not {'category', 'category_id'} & set(update_fields):
+        return  # category를 저장하지 않았다
+    new = instance.category_id
+    if old is DEFERRED:
+        recount_categories()  # 예전 카테고리를 모르면 전부 다시 센다 (category를 defer한 경우에만)
+    elif old != new:
+        if old is not None:
+            _add(Category.objects.filter(pk=old), 'post_count', -1)
+        if new is not None:
+            _add(Category.objects.filter(pk=new), 'post_count', 1)
+    remember_category(instance)
+
+
+def post_deleting(instance):
+    # 포스트를 지우면 태그 연결도 m2m_changed 없이 지워지므로 지우기 전에 기억해 둔다
+    instance._counted_tag_ids = _linked_tag_ids(instance, False, None)
+
+
+def post_deleted(instance):
+    category_id = instance.__dict__.get('category_id', DEFERRED)
+    if category_id is DEFERRED:
+        recount_categories()
+    elif category_id is not None:
+        _add(Category.objects.filter(pk=category_id), 'post_count', -1)
+    _add_to_tags(getattr(instance, '_counted_tag_ids', []), -1)
+
+
+def tags_changed(instance, action, reverse, pk_set):
+    if action == 'post_add':
+        _add_to_tags([instance.pk] * len(pk_set) if reverse else pk_set, 1)
+    elif action in ('pre_remove', 'pre_clear'):
+        instance._counted_removed_tag_ids = _linked_tag_ids(instance, reverse, pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        _add_to_tags(instance.__dict__.pop('_counted_removed_tag_ids', []), -1)
+
+
+def comment_saved(instance, created):
+    if created:
+        _add(Post.objects.filter(pk=instance.post_id), 'comment_count', 1)
+
+
+def comment_deleted(instance):
+    _add(Post.objects.filter(pk=instance.post_id), 'comment_count', -1)
+
+
+def _recount(queryset, field, related):
+    # 실제 개수와 다른 행만 골라서 고친다. 고친 행 수를 돌려준다
+    wrong = [
+        obj for obj in queryset.annotate(actual=Count(related)).only('pk', field).order_by()
+        if getattr(obj, field) != obj.actual
+    ]
+    for obj in wrong:
+        setattr(obj, field, obj.actual)
+    queryset.model.objects.bulk_update(wrong, [field], batch_size=500)
+    return len(wrong)
+
+
+def recount_categories():
+    return _recount(Category.objects.all(), 'post_count', 'post')
+
+
+def recount_tags():
+    return _recount(Tag.objects.all(), 'post_count', 'post')
+
+
+def recount_comments():
+    return _recount(Post.objects.all(), 'comment_count', 'comment')
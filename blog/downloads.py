@@ -0,0 +1,168 @@
+import atexit
+import mimetypes
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import F
+from django.http import Http404, HttpResponse, FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+from .models import Post
+
+# 첨부 파일(Post.file_upload) 다운로드.
+# settings.BLOG_SENDFILE이 'nginx'/'apache'이면 헤더만 돌려주고 파일 전송(Range 포함)은 프록시에 맡긴다.
+# 아니면 Range 요청을 처리하며 블록 단위로 스트리밍한다.
+# 다운로드 수는 요청마다 UPDATE하지 않고 프로세스 안에 모아 두었다가 DOWNLOAD_FLUSH_INTERVAL마다 한 번에 더한다.
+
+DOWNLOAD_FLUSH_INTERVAL = 10.0  # 초
+BLOCK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+_lock = threading.Lock()
+_pending = Counter()  # {post_id: 아직 DB에 더하지 않은 다운로드 수}
+_last_flush = time.monotonic()
+
+
+def flush_download_counts():
+    """모아 둔 다운로드 수를 DB에 더한다. 같은 수를 더할 포스트끼리 묶어서 UPDATE 한 번으로 처리한다."""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    by_delta = {}
+    for post_id, n in pending.items():
+        by_delta.setdefault(n, []).append(post_id)
+    for n, ids in by_delta.items():
+        Post.objects.filter(pk__in=ids).update(download_count=F('download_count') + n)
+
+
+def count_download(post_id):
+    with _lock:
+        _pending[post_id] += 1
+        due = time.monotonic() - _last_flush >= DOWNLOAD_FLUSH_INTERVAL
+    if due:
+        flush_download_counts()
+
+
+@atexit.register
+def _flush_at_exit():
+    if _pending:
+        try:
+            flush_download_counts()
+        except Exception:  # 종료 중이라 DB에 연결할 수 없으면 버린다
+            pass
+
+
+class FileRange:
+    """파일의 [start, start + length) 구간만 읽는 파일 객체. FileResponse에 넘긴다."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """'bytes=0-99' 같은 Range 헤더를 (start, end)로 바꾼다. 범위가 여러 개거나 형식이 틀리면 None,
+    파일 밖의 범위면 ValueError."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or end < start:
+            raise ValueError(header)
+    else:
+        suffix = int(last)  # bytes=-500: 마지막 500바이트
+        if suffix == 0:
+            raise ValueError(header)
+        start, end = max(size - suffix, 0), size - 1
+    return start, end
+
+
+def _offloaded_response(post):
+    response = HttpResponse()
+    if settings.BLOG_SENDFILE == 'nginx':
+        # nginx의 internal location(BLOG_SENDFILE_URL)이 MEDIA_ROOT를 가리키도록 설정한다
+        response['X-Accel-Redirect'] = quote(settings.BLOG_SENDFILE_URL + post.file_upload.name)
+    else:
+        response['X-Sendfile'] = post.file_upload.path  # apache mod_xsendfile, lighttpd
+    del response['Content-Type']  # 프록시가 파일 확장자로 정한다
+    return response
+
+
+def serve_attachment(request, post):
+    storage, name = post.file_upload.storage, post.file_upload.name
+    if settings.BLOG_SENDFILE:
+        response = _offloaded_response(post)
+    else:
+        try:
+            size = storage.size(name)
+            modified = storage.get_modified_time(name).timestamp()
+        except OSError:  # DB에는 있지만 파일이 지워졌거나 복원되지 않은 경우
+            raise Http404('첨부 파일이 없습니다.')
+        etag = quote_etag(f'{size:x}-{int(modified * 1000):x}')
+        response = get_conditional_response(request, etag=etag, last_modified=int(modified))
+        if response is None:
+            response = _stream(request, post, size, etag, int(modified))
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = content_disposition_header(True, post.get_file_name())
+    if _is_new_download(request, response):
+        count_download(post.pk)
+    return response
+
+
+def _is_new_download(request, response):
+    # 이어받기(처음이 아닌 구간) 요청과 304, 416은 세지 않는다
+    if response.status_code == 206:
+        return response['Content-Range'].startswith('bytes 0-')
+    if settings.BLOG_SENDFILE:  # Range는 프록시가 처리하므로 요청 헤더로 판단한다
+        return request.META.get('HTTP_RANGE', 'bytes=0-').startswith('bytes=0-')
+    return response.status_code == 200
+
+
+def _stream(request, post, size, etag, modified):
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    # If-Range가 지금 파일과 다르면 파일이 바뀐 것이므로 이어받지 않고 전체를 보낸다
+    if range_header and (not if_range or if_range == etag or parse_http_date_safe(if_range) == modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = post.file_upload.storage.open(post.file_upload.name, 'rb')
+    content_type = mimetypes.guess_type(post.get_file_name())[0] or 'application/octet-stream'
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1), content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        size = end - start + 1
+    response.block_size = BLOCK_SIZE
+    response['Content-Length'] = size
+    return response
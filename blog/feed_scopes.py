@@ -0,0 +1,118 @@
+from django.conf import settings
+from .models import Post, Category, Tag
+from .page_cache import bump_feed_version
+
+# 피드/사이트맵 캐시의 버전 범위(scope). 응답은 자기가 보여주는 범위의 버전만 키에 넣으므로
+# 포스트 하나가 바뀌어도 그 포스트가 나오는 피드와 사이트맵 파일만 다시 만든다 (blog/page_cache.py cache_feed).
+#   latest                  전체 최신 피드
+#   category:<slug>         카테고리 피드
+#   tag:<slug>              태그 피드
+#   sitemap                 사이트맵 목록(/sitemap.xml). 사이트맵 파일이 하나라도 바뀌면 같이 바뀐다
+#   sitemap:<section>       섹션 전체 (/sitemap-<section>.xml의 모든 p)
+#   sitemap:<section>:<p>   섹션의 p번째 파일
+# 카테고리/태그 이름이 바뀌거나 지워지면 여러 피드의 항목에 보이므로 전체 버전을 바꾼다.
+
+LATEST = 'latest'
+SITEMAP = 'sitemap'
+# 이 필드만 저장하면 피드와 사이트맵 내용이 바뀌지 않는다
+POST_IGNORED_FIELDS = {'comment_count', 'download_count', 'head_image_variants'}
+TAXONOMY_IGNORED_FIELDS = {'post_count'}
+
+
+def _only(update_fields, ignored):
+    return update_fields is not None and set(update_fields) <= ignored
+
+
+def _category_scopes(category_ids):
+    ids = [pk for pk in category_ids if isinstance(pk, int)]  # None, 알 수 없는 값(counters.DEFERRED)은 뺀다
+    if not ids:
+        return []
+    return [f'category:{slug}' for slug in Category.objects.filter(pk__in=ids).values_list('slug', flat=True)]
+
+
+def _tag_scopes(tags):
+    return [f'tag:{slug}' for slug in tags.values_list('slug', flat=True)]
+
+
+def _post_shard(post_id):
+    limit = getattr(settings, 'BLOG_SITEMAP_LIMIT', 5000)
+    return Post.objects.filter(pk__lt=post_id).count() // limit + 1
+
+
+# 요청 -> 범위 (cache_feed, feed_etag, feed_last_modified에 넘긴다)
+
+def latest_scopes(request, *args, **kwargs):
+    return [LATEST]
+
+
+def category_scopes(request, slug):
+    return [f'category:{slug}']
+
+
+def tag_scopes(request, slug):
+    return [f'tag:{slug}']
+
+
+def sitemap_index_scopes(request, *args, **kwargs):
+    return [SITEMAP]
+
+
+def sitemap_section_scopes(request, section, **kwargs):
+    return [f'sitemap:{section}', f"sitemap:{section}:{request.GET.get('p', 1)}"]
+
+
+# 변경 -> 바꿀 범위 (blog/signals.py에서 연결)
+
+def post_saved(instance, created, update_fields):
+    if _only(update_fields, POST_IGNORED_FIELDS):
+        return
+    old_category_id = getattr(instance, '_saved_from_category_id', None)
+    scopes = [
+        LATEST, SITEMAP, 'sitemap:categories', 'sitemap:tags',
+        f'sitemap:posts:{_post_shard(instance.pk)}',
+        *_category_scopes({instance.category_id, old_category_id}),
+        *([] if created else _tag_scopes(Tag.objects.filter(post=instance))),
+    ]
+    if created:
+        scopes.append('sitemap:posts')  # 파일 수가 바뀔 수 있다
+    bump_feed_version(*scopes)
+
+
+def post_deleting(instance):
+    # 지우고 나면 포스트의 태그 연결이 없어지므로 지우기 전에 범위를 계산해 둔다
+    instance._feed_scopes = [
+        LATEST, SITEMAP, 'sitemap:posts', 'sitemap:categories', 'sitemap:tags',  # 뒤의 사이트맵 파일이 모두 밀린다
+        *_category_scopes([instance.__dict__.get('category_id')]),
+        *_tag_scopes(Tag.objects.filter(post=instance)),
+    ]
+
+
+def post_deleted(instance):
+    bump_feed_version(*instance.__dict__.pop('_feed_scopes', [LATEST, SITEMAP, 'sitemap:posts']))
+
+
+def tags_changed(instance, action, reverse, pk_set):
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_feed_version()  # 태그 쪽에서 여러 포스트를 바꾼 경우. 드물어서 전체를 바꾼다
+        return
+    if action == 'pre_clear':
+        cleared = Post.tags.through.objects.filter(post=instance).values_list('tag_id', flat=True)
+        instance._feed_cleared_tag_ids = list(cleared)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        tag_ids = pk_set if pk_set is not None else instance.__dict__.pop('_feed_cleared_tag_ids', [])
+        bump_feed_version(
+            LATEST, SITEMAP, 'sitemap:tags',
+            *_category_scopes([instance.category_id]),  # 카테고리 피드 항목에도 태그 이름이 나온다
+            *_tag_scopes(Tag.objects.filter(pk__in=tag_ids)),
+        )
+
+
+def taxonomy_saved(instance, created, update_fields):
+    # 새 카테고리/태그에는 아직 포스트가 없어서 바뀌는 피드가 없다. 이름이 바뀌면 여러 피드에 보이므로 전체를 바꾼다
+    if not created and not _only(update_fields, TAXONOMY_IGNORED_FIELDS):
+        bump_feed_version()
+
+
+def taxonomy_deleted(instance):
+    bump_feed_version()
@@ -0,0 +1,103 @@
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.http import condition
+from .models import Post, Category, Tag
+from .page_cache import cache_feed
+from .conditional import feed_etag, feed_last_modified
+from . import feed_scopes
+
+# 전체, 카테고리별, 태그별 RSS/Atom 피드. 본문은 저장할 때 렌더링해 둔 content_html을 그대로 쓴다.
+# 응답은 피드마다 따로 관리하는 피드 버전(그 피드의 포스트, 카테고리, 태그가 바뀔 때만 바뀐다)이 들어간 키로 캐시한다
+# (blog/page_cache.py, blog/feed_scopes.py)
+
+FEED_ITEMS = 20
+
+
+class LatestPostsFeed(Feed):
+    title = 'Blogcraft'
+    link = '/blog/'
+    description = 'Blogcraft의 최신 포스트'
+
+    def get_queryset(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return (
+            self.get_queryset(obj).select_related('author', 'category').prefetch_related('tags')
+            .defer('content').order_by('-pk')[:FEED_ITEMS]
+        )
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.get_content_markdown()
+
+    def item_author_name(self, item):
+        return item.author.username if item.author else None
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_categories(self, item):
+        names = [tag.name for tag in item.tags.all()]
+        return [item.category.name, *names] if item.category else names
+
+
+class CategoryFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Category, slug=slug)
+
+    def get_queryset(self, obj):
+        return Post.objects.filter(category=obj)
+
+    def title(self, obj):
+        return f'Blogcraft - {obj.name}'
+
+    def link(self, obj):
+        return obj.get_absolute_url()
+
+    def description(self, obj):
+        return f'Blogcraft의 {obj.name} 카테고리 최신 포스트'
+
+
+class TagFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Tag, slug=slug)
+
+    def get_queryset(self, obj):
+        return Post.objects.filter(tags=obj)
+
+    def title(self, obj):
+        return f'Blogcraft - #{obj.name}'
+
+    def link(self, obj):
+        return obj.get_absolute_url()
+
+    def description(self, obj):
+        return f'Blogcraft의 #{obj.name} 태그 최신 포스트'
+
+
+def feed_view(feed_class, scopes):
+    """feed_class의 RSS, Atom 뷰를 조건부 GET과 캐시를 붙여서 돌려준다. scopes는 blog/feed_scopes.py 참고."""
+    atom_class = type(f'Atom{feed_class.__name__}', (feed_class,), {
+        'feed_type': Atom1Feed,
+        'subtitle': feed_class.description,  # Atom은 description 대신 subtitle을 쓴다
+    })
+    views = []
+    for cls in (feed_class, atom_class):
+        feed = cls()
+        feed.__name__ = feed.__qualname__ = cls.__name__  # functools.wraps로 복사되어 /metrics의 view 이름이 된다
+        views.append(condition(
+            etag_func=feed_etag(scopes), last_modified_func=feed_last_modified(scopes),
+        )(cache_feed(scopes)(feed)))
+    return views
+
+
+latest_rss, latest_atom = feed_view(LatestPostsFeed, feed_scopes.latest_scopes)
+category_rss, category_atom = feed_view(CategoryFeed, feed_scopes.category_scopes)
+tag_rss, tag_atom = feed_view(TagFeed, feed_scopes.tag_scopes)
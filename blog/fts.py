@@ -0,0 +1,48 @@
+# SQLite FTS5 전문 검색 인덱스(blog_post_fts). trigram 토크나이저를 써서 기존 contains 검색처럼 부분 문자열도 찾는다.
+# 포스트/태그가 바뀌면 트리거가 인덱스를 갱신하므로 bulk_create, update() 등 ORM 경로와 상관없이 최신 상태가 유지된다.
+# SQLite는 ALTER TABLE 대신 테이블을 새로 만들어 옮기므로 그때 트리거가 사라진다.
+# 그래서 트리거는 IF NOT EXISTS로 만들고 post_migrate 때마다 ensure_fts_triggers()로 다시 확인한다.
+# 마이그레이션은 이 모듈을 가져오지 않고 그 시점의 SQL을 그대로 복사해 둔다 (0003_post_fts).
+# 트리거를 바꾸면 새 마이그레이션에서 예전 트리거를 지우고 새 SQL로 만든다.
+TAG_NAMES = """(
+    SELECT group_concat(t.name, ' ') FROM blog_tag t
+    JOIN blog_post_tags pt ON pt.tag_id = t.id
+    WHERE pt.post_id = {post_id}
+)"""
+
+TRIGGER_SQL = [
+    """CREATE TRIGGER IF NOT EXISTS blog_post_fts_insert AFTER INSERT ON blog_post BEGIN
+        INSERT INTO blog_post_fts(rowid, title, hook_text, content, tags)
+        VALUES (new.id, new.title, new.hook_text, new.content, '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS blog_post_fts_update AFTER UPDATE OF title, hook_text, content ON blog_post BEGIN
+        UPDATE blog_post_fts SET title = new.title, hook_text = new.hook_text, content = new.content
+        WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS blog_post_fts_delete AFTER DELETE ON blog_post BEGIN
+        DELETE FROM blog_post_fts WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS blog_post_fts_tag_add AFTER INSERT ON blog_post_tags BEGIN
+        UPDATE blog_post_fts SET tags = {TAG_NAMES.format(post_id='new.post_id')} WHERE rowid = new.post_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS blog_post_fts_tag_remove AFTER DELETE ON blog_post_tags BEGIN
+        UPDATE blog_post_fts SET tags = coalesce({TAG_NAMES.format(post_id='old.post_id')}, '') WHERE rowid = old.post_id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS blog_post_fts_tag_rename AFTER UPDATE OF name ON blog_tag BEGIN
+        UPDATE blog_post_fts SET tags = {TAG_NAMES.format(post_id='blog_post_fts.rowid')}
+        WHERE rowid IN (SELECT post_id FROM blog_post_tags WHERE tag_id = new.id);
+    END""",
+]
+
+
+def fts_table_exists(connection):
+    return 'blog_post_fts' in connection.introspection.table_names()
+
+
+def ensure_fts_triggers(connection):
+    if connection.vendor != 'sqlite' or not fts_table_exists(connection):
+        return
+    with connection.cursor() as cursor:
+        for sql in TRIGGER_SQL:
+            cursor.execute(sql)
+
@@ -0,0 +1,71 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+VARIANT_WIDTHS = (480, 800, 1200)  # 카드(모바일/데스크톱)와 상세 페이지에서 쓰는 너비
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif fmt == 'PNG':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+    return buffer.getvalue()
+
+
+def generate_variants(name, storage=default_storage):
+    """업로드된 원본 이미지(name)로 너비별 축소본과 WebP 버전을 만들어 저장하고 그 정보를 돌려준다.
+
+    DB에 접근하지 않으므로 render_image_variants 커맨드의 프로세스 풀에서도 그대로 쓸 수 있다.
+    """
+    with storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image)  # 휴대폰 사진의 회전 정보 반영
+        image.load()
+
+    fallback = 'PNG' if _has_alpha(image) else 'JPEG'
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if fallback == 'PNG' else 'RGB')
+
+    width, height = image.size
+    widths = [w for w in VARIANT_WIDTHS if w < width] + [min(width, VARIANT_WIDTHS[-1])]
+    root = os.path.splitext(name)[0]
+
+    variants = []
+    for w in sorted(set(widths)):
+        h = round(height * w / width)
+        resized = image if w == width else image.resize((w, h), Image.LANCZOS)
+        for fmt, ext in ((fallback, fallback.lower().replace('jpeg', 'jpg')), ('WEBP', 'webp')):
+            path = storage.save(f'{root}-{w}w.{ext}', ContentFile(_encode(resized, fmt)))
+            variants.append({'width': w, 'height': h, 'format': fmt.lower(), 'path': path})
+
+    return {'source': name, 'width': width, 'height': height, 'variants': variants}
+
+
+def delete_variants(data, storage=default_storage):
+    for variant in (data or {}).get('variants', []):
+        storage.delete(variant['path'])
+
+
+def build_srcset(data, webp=False, storage=default_storage):
+    return ', '.join(
+        f"{storage.url(v['path'])} {v['width']}w"
+        for v in (data or {}).get('variants', []) if (v['format'] == 'webp') == webp
+    )
+
+
+def largest_fallback_url(data, storage=default_storage):
+    fallbacks = [v for v in (data or {}).get('variants', []) if v['format'] != 'webp']
+    return storage.url(fallbacks[-1]['path']) if fallbacks else ''
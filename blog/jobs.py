@@ -0,0 +1,129 @@
+import json
+import logging
+import time
+import traceback
+from datetime import timedelta
+from hashlib import sha256
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_SECONDS = 10  # 재시도 간격: 10초, 20초, 40초, ...
+RETRY_MAX_SECONDS = 60 * 60
+STALE_AFTER = timedelta(minutes=10)  # 이 시간보다 오래 running인 작업은 워커가 죽은 것으로 보고 다시 대기시킨다
+# 끝난 작업은 이 기간이 지나면 지운다. 실패한 작업은 원인을 볼 수 있도록 더 오래 둔다
+DONE_RETENTION = timedelta(days=1)
+FAILED_RETENTION = timedelta(days=7)
+PRUNE_INTERVAL = 60 * 10  # 워커가 오래된 작업을 지우는 간격(초)
+PRUNE_BATCH_SIZE = 1000  # 한 번에 지우는 행 수. 쓰기 잠금을 오래 잡지 않도록 나눠서 지운다
+
+
+def _job_name(func):
+    return func if isinstance(func, str) else f'{func.__module__}.{func.__qualname__}'
+
+
+def _dedupe_key(name, args):
+    return sha256(f'{name}:{json.dumps(args, sort_keys=True)}'.encode()).hexdigest()
+
+
+def enqueue(func, *args, max_attempts=5):
+    """func(*args)를 백그라운드 작업으로 등록한다. 같은 작업이 이미 대기 중이면 그 작업을 돌려준다.
+
+    func는 모듈 최상위 함수(또는 그 경로 문자열)여야 하고 args는 JSON으로 저장할 수 있어야 한다.
+    """
+    name = _job_name(func)
+    args = list(args)
+    key = _dedupe_key(name, args)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name, args=args, dedupe_key=key, max_attempts=max_attempts, run_at=timezone.now(),
+            )
+    except IntegrityError:
+        job = Job.objects.filter(dedupe_key=key, status=Job.PENDING).first()
+        if job is None:  # 그 사이에 다른 워커가 가져갔다면 다시 등록
+            return enqueue(func, *args, max_attempts=max_attempts)
+        return job
+
+
+def requeue_stale_jobs():
+    return Job.objects.filter(status=Job.RUNNING, locked_at__lt=timezone.now() - STALE_AFTER).update(
+        status=Job.PENDING, locked_at=None,
+    )
+
+
+def prune_finished_jobs(done_retention=DONE_RETENTION, failed_retention=FAILED_RETENTION):
+    """보관 기간이 지난 done, failed 작업을 지우고 지운 수를 돌려준다."""
+    now = timezone.now()
+    deleted = 0
+    for status, retention in ((Job.DONE, done_retention), (Job.FAILED, failed_retention)):
+        old = Job.objects.filter(status=status, updated_at__lt=now - retention)
+        while True:
+            pks = list(old.values_list('pk', flat=True)[:PRUNE_BATCH_SIZE])
+            if not pks:
+                break
+            deleted += Job.objects.filter(pk__in=pks).delete()[0]
+    return deleted
+
+
+def claim_next_job():
+    # SQLite는 SELECT ... FOR UPDATE가 없으므로 status 조건을 건 UPDATE로 한 워커만 가져가도록 한다
+    while True:
+        job = Job.objects.filter(status=Job.PENDING, run_at__lte=timezone.now()).order_by('run_at', 'pk').first()
+        if job is None:
+            return None
+        now = timezone.now()
+        if Job.objects.filter(pk=job.pk, status=Job.PENDING).update(
+                status=Job.RUNNING, locked_at=now, attempts=job.attempts + 1, updated_at=now):
+            job.status, job.locked_at, job.attempts = Job.RUNNING, now, job.attempts + 1
+            return job
+
+
+def run_job(job):
+    try:
+        import_string(job.name)(*job.args)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = min(RETRY_BASE_SECONDS * 2 ** (job.attempts - 1), RETRY_MAX_SECONDS)
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + timedelta(seconds=delay)
+        else:
+            job.status = Job.FAILED
+        logger.warning('Job %s failed (attempt %s/%s)', job, job.attempts, job.max_attempts)
+    else:
+        job.status = Job.DONE
+        job.last_error = ''
+    job.locked_at = None
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        # 재시도를 기다리는 동안 같은 작업이 새로 등록되었다면 그쪽에 맡긴다
+        Job.objects.filter(pk=job.pk).update(status=Job.DONE, locked_at=None, updated_at=timezone.now())
+    return job
+
+
+def work(burst=False, poll_interval=1.0):
+    """대기 중인 작업을 하나씩 가져와 실행한다. burst=True이면 실행할 작업이 없을 때 끝낸다."""
+    processed = 0
+    requeue_stale_jobs()
+    prune_finished_jobs()
+    pruned_at = time.monotonic()
+    while True:
+        job = claim_next_job()
+        if job is None:
+            if burst:
+                return processed
+            time.sleep(poll_interval)
+            requeue_stale_jobs()
+            if time.monotonic() - pruned_at >= PRUNE_INTERVAL:
+                prune_finished_jobs()
+                pruned_at = time.monotonic()
+            continue
+        run_job(job)
+        processed += 1
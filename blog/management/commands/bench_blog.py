@@ -0,0 +1,184 @@
+import json
+import statistics
+import time
+from importlib import import_module
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from blog.models import Post, Category, Tag, Comment
+from blog.downloads import flush_download_counts
+
+# blog/urls.py, blog/api_urls.py, single_pages/urls.py의 모든 URL과 그 URL을 요청하는 방법.
+# URL을 새로 추가하면 여기에도 추가해야 한다 (빠진 URL이 있으면 bench_blog이 실패한다).
+#   route: urls.py의 path() 문자열, name: 결과에 쓸 이름, url: 요청할 주소(format 인자는 _context() 참고)
+#   method: GET/POST, login: bench_blog 사용자로 로그인해서 요청
+ENDPOINTS = [
+    {'urls': 'blog.urls', 'route': '', 'name': 'post_list', 'url': '/blog/'},
+    {'urls': 'blog.urls', 'route': '<int:pk>/', 'name': 'post_detail', 'url': '/blog/{post}/'},
+    {'urls': 'blog.urls', 'route': 'category/<str:slug>/', 'name': 'category_page', 'url': '/blog/category/{category}/'},
+    {'urls': 'blog.urls', 'route': 'tag/<str:slug>/', 'name': 'tag_page', 'url': '/blog/tag/{tag}/'},
+    {'urls': 'blog.urls', 'route': 'tag_autocomplete/', 'name': 'tag_autocomplete',
+     'url': '/blog/tag_autocomplete/?q={q}'},
+    {'urls': 'blog.urls', 'route': 'rss/', 'name': 'latest_rss', 'url': '/blog/rss/'},
+    {'urls': 'blog.urls', 'route': 'atom/', 'name': 'latest_atom', 'url': '/blog/atom/'},
+    {'urls': 'blog.urls', 'route': 'category/<str:slug>/rss/', 'name': 'category_rss',
+     'url': '/blog/category/{category}/rss/'},
+    {'urls': 'blog.urls', 'route': 'category/<str:slug>/atom/', 'name': 'category_atom',
+     'url': '/blog/category/{category}/atom/'},
+    {'urls': 'blog.urls', 'route': 'tag/<str:slug>/rss/', 'name': 'tag_rss', 'url': '/blog/tag/{tag}/rss/'},
+    {'urls': 'blog.urls', 'route': 'tag/<str:slug>/atom/', 'name': 'tag_atom', 'url': '/blog/tag/{tag}/atom/'},
+    {'urls': 'blog.urls', 'route': 'search/<str:q>/', 'name': 'post_search', 'url': '/blog/search/{q}/'},
+    {'urls': 'blog.urls', 'route': 'cards/', 'name': 'post_cards', 'url': '/blog/cards/?after={post}'},
+    {'urls': 'blog.urls', 'route': '<int:pk>/comments/', 'name': 'post_comments', 'url': '/blog/{post}/comments/'},
+    {'urls': 'blog.urls', 'route': '<int:pk>/download/', 'name': 'download_attachment',
+     'url': '/blog/{own_post}/download/'},
+    {'urls': 'blog.urls', 'route': 'create_post/', 'name': 'create_post', 'url': '/blog/create_post/', 'login': True},
+    {'urls': 'blog.urls', 'route': 'update_post/<int:pk>/', 'name': 'update_post',
+     'url': '/blog/update_post/{own_post}/', 'login': True},
+    {'urls': 'blog.urls', 'route': 'update_comment/<int:pk>/', 'name': 'update_comment',
+     'url': '/blog/update_comment/{own_comment}/', 'login': True},
+    {'urls': 'blog.urls', 'route': '<int:pk>/new_comment/', 'name': 'new_comment',
+     'url': '/blog/{own_post}/new_comment/', 'method': 'POST', 'data': {'content': 'bench_blog'}, 'login': True},
+    {'urls': 'blog.urls', 'route': 'cache_stats/', 'name': 'cache_stats', 'url': '/blog/cache_stats/', 'login': True},
+    {'urls': 'blog.api_urls', 'route': '<str:resource>/', 'name': 'api_posts', 'url': '/api/posts/'},
+    {'urls': 'blog.api_urls', 'route': '<str:resource>/<int:pk>/', 'name': 'api_post', 'url': '/api/posts/{post}/'},
+    {'urls': 'blog.api_urls', 'route': '<str:resource>/export/', 'name': 'api_posts_export',
+     'url': '/api/posts/export/?fields=id,title,updated_at'},
+    {'urls': 'single_pages.urls', 'route': '', 'name': 'landing', 'url': '/'},
+    {'urls': 'single_pages.urls', 'route': 'about_me/', 'name': 'about_me', 'url': '/about_me/'},
+]
+SKIPPED = {
+    ('blog.urls', 'delete_comment/<int:pk>/'): '요청할 때마다 댓글을 지운다',
+}
+BENCH_USERNAME = 'bench_blog'
+BENCH_FILE_SIZE = 1024 * 1024  # download_attachment가 보낼 첨부 파일 크기
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def check_coverage():
+    covered = {(e['urls'], e['route']) for e in ENDPOINTS} | SKIPPED.keys()
+    missing = [
+        f'{module}: {pattern.pattern}'
+        for module in sorted({e['urls'] for e in ENDPOINTS})
+        for pattern in import_module(module).urlpatterns
+        if (module, str(pattern.pattern)) not in covered
+    ]
+    if missing:
+        raise CommandError('bench_blog.ENDPOINTS에 없는 URL: ' + ', '.join(missing))
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """baseline보다 느려지거나 쿼리/응답 크기가 늘어난 엔드포인트의 설명 목록을 돌려준다."""
+    regressions = []
+    for name, now in results['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if before is None:
+            continue
+        if now['p95_ms'] > before['p95_ms'] * (1 + tolerance) and now['p95_ms'] - before['p95_ms'] > min_delta_ms:
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+        if now['queries'] > before['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {now['queries']}")
+        if now['bytes'] > before['bytes'] * (1 + tolerance):
+            regressions.append(f"{name}: bytes {before['bytes']} -> {now['bytes']}")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = ('blog/urls.py, blog/api_urls.py, single_pages/urls.py의 모든 URL을 테스트 클라이언트로 요청해서 '
+            '엔드포인트별 p50/p95 지연 시간, 쿼리 수, 응답 크기를 JSON으로 출력한다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='엔드포인트마다 측정할 요청 수')
+        parser.add_argument('--warmup', type=int, default=2, help='측정 전에 버리는 요청 수 (캐시 채우기)')
+        parser.add_argument('--no-page-cache', action='store_true', help='BLOG_PAGE_CACHE를 끄고 측정')
+        parser.add_argument('--output', help='결과 JSON을 저장할 파일 (기본: 표준 출력)')
+        parser.add_argument('--baseline', help='비교할 이전 결과 JSON. 느려진 엔드포인트가 있으면 실패한다')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='p95, 응답 크기 허용 증가율 (기본 20%%)')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0, help='이보다 작은 p95 차이는 잡음으로 본다')
+
+    def handle(self, *args, **options):
+        check_coverage()
+        settings = {'ALLOWED_HOSTS': ['*']}
+        if options['no_page_cache']:
+            settings['BLOG_PAGE_CACHE'] = False
+        with override_settings(**settings):
+            results = self.run(options['repeat'], options['warmup'])
+        results['meta']['page_cache'] = not options['no_page_cache']
+
+        output = json.dumps(results, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = compare(results, baseline, options['tolerance'], options['min_delta_ms'])
+            if regressions:
+                raise CommandError('Slower than baseline:\n' + '\n'.join(regressions))
+            # 표준 출력은 JSON만 쓰도록 결과 요약은 stderr로
+            self.stderr.write(f"No regressions against {options['baseline']}", style_func=self.style.SUCCESS)
+
+    def _context(self, user):
+        post = Post.objects.order_by('-comment_count', '-pk').first()
+        category = Category.objects.order_by('-post_count', 'pk').first()
+        tag = Tag.objects.order_by('-post_count', 'pk').first()
+        if post is None or category is None or tag is None:
+            raise CommandError('포스트, 카테고리, 태그가 필요합니다. manage.py seed_blog을 먼저 실행하세요.')
+        own_post = Post(title='bench_blog', content='bench_blog', author=user)
+        own_post.file_upload.save('bench_blog.bin', ContentFile(bytes(BENCH_FILE_SIZE)))  # save()까지 한다
+        own_comment = Comment.objects.create(post=own_post, author=user, content='bench_blog')
+        return {
+            'post': post.pk, 'category': category.slug, 'tag': tag.slug, 'q': tag.name,
+            'own_post': own_post.pk, 'own_comment': own_comment.pk,
+        }
+
+    def run(self, repeat, warmup):
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME, defaults={'is_staff': True})
+        anonymous, logged_in = Client(), Client()
+        logged_in.force_login(user)
+        context = self._context(user)
+        results = {
+            'meta': {'repeat': repeat, 'posts': Post.objects.count(), 'comments': Comment.objects.count()},
+            'endpoints': {},
+        }
+        try:
+            for endpoint in ENDPOINTS:
+                client = logged_in if endpoint.get('login') else anonymous
+                request = client.post if endpoint.get('method') == 'POST' else client.get
+                url = endpoint['url'].format(**context)
+                timings, queries = [], []
+                for i in range(warmup + repeat):
+                    with CaptureQueriesContext(connection) as ctx:
+                        started = time.perf_counter()
+                        response = request(url, endpoint.get('data'))
+                        # 파일 다운로드 같은 스트리밍 응답은 끝까지 받아야 전송 시간이 들어간다
+                        body = b''.join(response.streaming_content) if response.streaming else response.content
+                        elapsed = time.perf_counter() - started
+                    if i >= warmup:
+                        timings.append(elapsed * 1000)
+                        queries.append(len(ctx))
+                results['endpoints'][endpoint['name']] = {
+                    'url': url,
+                    'status': response.status_code,
+                    'p50_ms': round(statistics.median(timings), 2),
+                    'p95_ms': round(_percentile(timings, 0.95), 2),
+                    'queries': max(queries),
+                    'bytes': len(body),
+                }
+        finally:
+            flush_download_counts()
+            own_post = Post.objects.get(pk=context['own_post'])
+            own_post.file_upload.delete(save=False)
+            own_post.delete()  # 만든 댓글도 같이 지워진다
+        return results
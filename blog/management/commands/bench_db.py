@@ -0,0 +1,110 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from blog.models import Post, Comment
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+class Command(BaseCommand):
+    help = '여러 스레드에서 포스트 읽기와 댓글 쓰기를 섞어 실행하고 처리량, 지연 시간, 잠금 오류를 잰다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--ops', type=int, default=200, help='스레드당 실행할 요청 수')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='댓글 쓰기 비율 (0~1)')
+        parser.add_argument(
+            '--profiles', default='',
+            help='쉼표로 구분한 BLOG_DB_PROFILE 목록. 지정하면 프로필마다 따로 실행해서 비교한다 (예: sqlite-basic,sqlite)',
+        )
+        parser.add_argument('--json', action='store_true', help='결과를 JSON 한 줄로 출력')
+
+    def handle(self, *args, **options):
+        if options['profiles']:
+            return self.compare(options)
+
+        result = self.run(options['threads'], options['ops'], options['write_ratio'])
+        if options['json']:
+            self.stdout.write(json.dumps(result))
+        else:
+            self.print_results([result])
+
+    def compare(self, options):
+        # 설정은 프로세스마다 한 번만 읽히므로 프로필마다 새 프로세스에서 실행한다
+        results = []
+        for profile in options['profiles'].split(','):
+            out = subprocess.run(
+                [sys.executable, sys.argv[0], 'bench_db', '--json', '--threads', str(options['threads']),
+                 '--ops', str(options['ops']), '--write-ratio', str(options['write_ratio'])],
+                env={**os.environ, 'BLOG_DB_PROFILE': profile.strip()},
+                capture_output=True, text=True, check=True,
+            ).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+        self.print_results(results)
+
+    def run(self, threads, ops, write_ratio):
+        author, _ = User.objects.get_or_create(username='bench_db')
+        post = Post.objects.create(title='bench_db', content='bench_db', author=author)
+        stats = {'read': [], 'write': [], 'errors': 0}
+        lock = threading.Lock()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            reads, writes, errors = [], [], 0
+            try:
+                for i in range(ops):
+                    start = time.perf_counter()
+                    try:
+                        if rng.random() < write_ratio:
+                            Comment.objects.create(post_id=post.pk, author_id=author.pk, content=f'bench {seed}-{i}')
+                            writes.append(time.perf_counter() - start)
+                        else:
+                            list(Post.objects.for_detail().get(pk=post.pk).comment_set.all()[:20])
+                            reads.append(time.perf_counter() - start)
+                    except OperationalError:  # database is locked 등
+                        errors += 1
+            finally:
+                connection.close()
+            with lock:
+                stats['read'] += reads
+                stats['write'] += writes
+                stats['errors'] += errors
+
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        started = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        post.delete()  # 댓글도 같이 지워진다
+        return {
+            'profile': settings.BLOG_DB_PROFILE,
+            'ops_per_sec': round((len(stats['read']) + len(stats['write'])) / elapsed, 1),
+            'read_p50_ms': round(_percentile(stats['read'], 0.5), 2),
+            'read_p95_ms': round(_percentile(stats['read'], 0.95), 2),
+            'write_p50_ms': round(_percentile(stats['write'], 0.5), 2),
+            'write_p95_ms': round(_percentile(stats['write'], 0.95), 2),
+            'errors': stats['errors'],
+        }
+
+    def print_results(self, results):
+        columns = ['profile', 'ops_per_sec', 'read_p50_ms', 'read_p95_ms', 'write_p50_ms', 'write_p95_ms', 'errors']
+        self.stdout.write('  '.join(f'{c:>13}' for c in columns))
+        for result in results:
+            self.stdout.write('  '.join(f'{result[c]!s:>13}' for c in columns))
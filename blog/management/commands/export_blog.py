@@ -0,0 +1,59 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+from blog.models import Post
+from blog.transfer import JSONL, MARKDOWN, export_queryset, to_record, to_markdown, load_checkpoint, save_checkpoint
+
+
+class Command(BaseCommand):
+    help = ('포스트를 카테고리, 태그, 댓글과 함께 JSONL 파일이나 Markdown(front matter) 디렉터리로 내보낸다. '
+            'iterator(chunk_size)로 읽으므로 포스트가 많아도 메모리를 적게 쓰고, --resume으로 끊긴 곳부터 이어간다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSONL 파일 또는 (--format markdown이면) 디렉터리')
+        parser.add_argument('--format', choices=[JSONL, MARKDOWN], default=JSONL)
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--resume', action='store_true', help='<path>.checkpoint에 기록된 곳부터 이어서 내보낸다')
+
+    def handle(self, *args, **options):
+        path, fmt, chunk_size = options['path'], options['format'], options['chunk_size']
+        checkpoint_path = f'{path.rstrip(os.sep)}.checkpoint'
+        checkpoint = {'last_pk': 0, 'exported': 0, 'offset': 0}
+        if options['resume']:
+            checkpoint = load_checkpoint(checkpoint_path) or checkpoint
+
+        queryset = export_queryset().filter(pk__gt=checkpoint['last_pk'])
+        total = checkpoint['exported'] + Post.objects.filter(pk__gt=checkpoint['last_pk']).count()
+
+        if fmt == JSONL:
+            out = open(path, 'r+' if checkpoint['offset'] else 'w', encoding='utf-8')
+            out.seek(checkpoint['offset'])
+            out.truncate()  # 마지막 체크포인트 뒤에 쓰다 만 줄을 버린다
+        else:
+            os.makedirs(path, exist_ok=True)
+            out = None
+        try:
+            for post in queryset.iterator(chunk_size=chunk_size):
+                record = to_record(post)
+                if out is not None:
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                else:
+                    with open(os.path.join(path, f'{post.pk:08d}.md'), 'w', encoding='utf-8') as f:
+                        f.write(to_markdown(record))
+                checkpoint['last_pk'] = post.pk
+                checkpoint['exported'] += 1
+                if checkpoint['exported'] % chunk_size == 0:
+                    self._checkpoint(out, checkpoint_path, checkpoint, total)
+            self._checkpoint(out, checkpoint_path, checkpoint, total)
+        finally:
+            if out is not None:
+                out.close()
+        self.stdout.write(self.style.SUCCESS(f"Done: {checkpoint['exported']} posts -> {path}"))
+
+    def _checkpoint(self, out, checkpoint_path, checkpoint, total):
+        if out is not None:
+            out.flush()
+            checkpoint['offset'] = out.tell()
+        save_checkpoint(checkpoint_path, checkpoint)
+        self.stdout.write(f"{checkpoint['exported']}/{total} posts")
@@ -0,0 +1,57 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from blog.counters import recount_categories, recount_tags
+from blog.page_cache import bump_content_version, bump_feed_version, bump_tag_version
+from blog.related import rebuild_related_posts
+from blog.sidebar import invalidate_sidebar
+from blog.transfer import JSONL, MARKDOWN, Importer, detect_format, read_records, load_checkpoint, save_checkpoint
+
+
+class Command(BaseCommand):
+    help = ('export_blog으로 내보낸 JSONL 파일이나 Markdown 디렉터리를 가져온다. 포스트, 태그, 카테고리, 댓글, '
+            '태그 연결을 배치마다 한 트랜잭션 안에서 bulk_create하고, --resume으로 끊긴 곳부터 이어간다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSONL 파일 또는 Markdown 디렉터리')
+        parser.add_argument('--format', choices=[JSONL, MARKDOWN], help='기본: 디렉터리면 markdown, 파일이면 jsonl')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--resume', action='store_true', help='<path>.checkpoint에 기록된 곳부터 이어서 가져온다')
+
+    def handle(self, *args, **options):
+        path, batch_size = options['path'], options['batch_size']
+        if not os.path.exists(path):
+            raise CommandError(f'{path}가 없습니다.')
+        fmt = options['format'] or detect_format(path)
+        checkpoint_path = f'{path.rstrip(os.sep)}.checkpoint.import'
+        checkpoint = {'position': 0, 'imported': 0}
+        if options['resume']:
+            checkpoint = load_checkpoint(checkpoint_path) or checkpoint
+            self.stdout.write(f"Resuming after record {checkpoint['position']}")
+
+        importer = Importer()
+        batch, position = [], checkpoint['position']
+        try:
+            for position, record in read_records(path, fmt, skip=checkpoint['position']):
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    self._import(importer, batch, position, checkpoint, checkpoint_path)
+                    batch = []
+            if batch:
+                self._import(importer, batch, position, checkpoint, checkpoint_path)
+        finally:
+            # bulk_create는 신호를 보내지 않으므로 카운터와 캐시를 직접 맞춘다 (중간에 실패해도 넣은 만큼은 맞춘다)
+            recount_categories()
+            recount_tags()
+            rebuild_related_posts()
+            invalidate_sidebar()
+            bump_content_version()
+            bump_feed_version()
+            bump_tag_version()
+        self.stdout.write(self.style.SUCCESS(f"Done: {checkpoint['imported']} posts from {path}"))
+
+    def _import(self, importer, batch, position, checkpoint, checkpoint_path):
+        checkpoint['imported'] += importer.import_batch(batch)
+        checkpoint['position'] = position
+        save_checkpoint(checkpoint_path, checkpoint)  # 트랜잭션이 커밋된 다음에 기록한다
+        self.stdout.write(f"{checkpoint['imported']} posts imported (record {position})")
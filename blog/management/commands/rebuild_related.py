@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from blog.related import rebuild_related_posts, REBUILD_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = '모든 포스트의 관련 포스트(RelatedPost)를 태그와 카테고리로 다시 계산한다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        total = rebuild_related_posts(
+            options['batch_size'], progress=lambda done, n: self.stdout.write(f'{done}/{n} posts'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Done: {total} posts'))
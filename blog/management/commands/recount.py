@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from blog.counters import recount_categories, recount_tags, recount_comments
+from blog.page_cache import bump_content_version, bump_tag_version
+from blog.sidebar import invalidate_sidebar
+
+
+class Command(BaseCommand):
+    help = 'Category.post_count, Tag.post_count, Post.comment_count를 실제 개수로 다시 센다.'
+
+    def handle(self, *args, **options):
+        fixed = {
+            'categories': recount_categories(),
+            'tags': recount_tags(),
+            'posts': recount_comments(),
+        }
+        if any(fixed.values()):
+            invalidate_sidebar()
+            bump_content_version()  # 예전 개수로 캐시된 페이지를 버린다
+            bump_tag_version()
+        self.stdout.write(self.style.SUCCESS(
+            'Fixed: ' + ', '.join(f'{n} {name}' for name, n in fixed.items())
+        ))
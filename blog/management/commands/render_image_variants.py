@@ -0,0 +1,57 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from blog import images
+from blog.models import Post
+
+
+def _init_worker():
+    django.setup()  # spawn 방식으로 만들어진 프로세스에서도 설정을 읽을 수 있도록
+
+
+def _render(pk, name):
+    # 워커 프로세스에서는 이미지 처리만 하고 DB 저장은 부모 프로세스가 모아서 한다
+    try:
+        return pk, images.generate_variants(name)
+    except OSError:
+        return pk, {'source': name}
+
+
+class Command(BaseCommand):
+    help = 'head_image가 있는 포스트의 축소본/WebP 이미지를 프로세스 풀에서 병렬로 만든다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--all', action='store_true', help='이미 만들어진 이미지도 다시 만든다')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(head_image='').order_by('pk').only('pk', 'head_image', 'head_image_variants')
+        todo = [
+            (post.pk, post.head_image.name, post.head_image_variants) for post in posts.iterator()
+            if options['all'] or post.head_image_variants.get('source') != post.head_image.name
+        ]
+        if not todo:
+            self.stdout.write(self.style.SUCCESS('Done: 0 posts'))
+            return
+
+        old_variants = {pk: data for pk, name, data in todo}
+        connections.close_all()  # fork된 워커가 부모의 DB 연결을 물려받지 않도록
+        done = []
+        with ProcessPoolExecutor(max_workers=options['processes'], initializer=_init_worker) as executor:
+            futures = [executor.submit(_render, pk, name) for pk, name, data in todo]
+            for future in as_completed(futures):
+                pk, data = future.result()
+                images.delete_variants(old_variants[pk])
+                done.append(Post(pk=pk, head_image_variants=data))
+                if len(done) % options['batch_size'] == 0:
+                    Post.objects.bulk_update(done[-options['batch_size']:], ['head_image_variants'])
+                    self.stdout.write(f'{len(done)}/{len(todo)} posts')
+
+        remainder = len(done) % options['batch_size']
+        if remainder:
+            Post.objects.bulk_update(done[-remainder:], ['head_image_variants'])
+        self.stdout.write(self.style.SUCCESS(f'Done: {len(done)} posts'))
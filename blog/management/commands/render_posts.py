@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = '저장된 포스트의 content_html, excerpt_html, word_count를 배치 단위로 채운다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help='이미 렌더링된 포스트도 다시 렌더링')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Post.objects.order_by('pk').only('pk', 'content')
+        if not options['all']:
+            queryset = queryset.filter(content_html='')
+
+        last_pk = 0
+        total = 0
+        while True:
+            # pk 기준으로 잘라서 가져오므로 OFFSET 없이 일정한 속도로 진행된다
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for post in batch:
+                post.render_content()
+            Post.objects.bulk_update(batch, ['content_html', 'excerpt_html', 'word_count'])
+            last_pk = batch[-1].pk
+            total += len(batch)
+            self.stdout.write(f'{total} posts rendered')
+
+        self.stdout.write(self.style.SUCCESS(f'Done: {total} posts'))
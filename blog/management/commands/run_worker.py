@@ -0,0 +1,44 @@
+import multiprocessing
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from blog.jobs import work
+
+
+def _worker(burst, poll_interval):
+    django.setup()
+    work(burst=burst, poll_interval=poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'blog.models.Job 테이블에 쌓인 백그라운드 작업을 실행한다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='작업을 실행할 워커 프로세스 수')
+        parser.add_argument('--burst', action='store_true', help='대기 중인 작업을 모두 실행하면 종료')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='작업이 없을 때 기다리는 시간(초)')
+
+    def handle(self, *args, **options):
+        burst, poll_interval = options['burst'], options['poll_interval']
+        if options['processes'] <= 1:
+            processed = work(burst=burst, poll_interval=poll_interval)
+            self.stdout.write(self.style.SUCCESS(f'Done: {processed} jobs'))
+            return
+
+        connections.close_all()  # fork된 워커가 부모의 DB 연결을 같이 쓰지 않도록
+        workers = [
+            multiprocessing.Process(target=_worker, args=(burst, poll_interval), daemon=True)
+            for _ in range(options['processes'])
+        ]
+        for p in workers:
+            p.start()
+        try:
+            for p in workers:
+                p.join()
+        except KeyboardInterrupt:
+            for p in workers:
+                p.terminate()
+            for p in workers:
+                p.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
@@ -0,0 +1,154 @@
+import random
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sites.models import Site
+from allauth.socialaccount.models import SocialApp
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from blog.models import Post, Category, Comment
+from blog.tags import resolve_tags
+from blog.counters import recount_categories, recount_tags, recount_comments
+from blog.page_cache import bump_content_version, bump_feed_version, bump_tag_version
+from blog.related import rebuild_related_posts
+from blog.sidebar import invalidate_sidebar
+
+SEED_PREFIX = 'seed_'  # seed_blog이 만든 사용자/카테고리 이름 앞에 붙여서 --flush로 지울 수 있게 한다
+
+WORDS = (
+    'django python 장고 파이썬 블로그 웹 서버 캐시 쿼리 인덱스 모델 뷰 템플릿 테스트 배포 도커 '
+    'database index cache query model view template test deploy docker async worker signal '
+    'performance latency 성능 최적화 데이터 페이지 댓글 태그 카테고리 검색 이미지 마크다운 '
+    'request response middleware settings migration admin form static media session user'
+).split()
+CODE = '''```python
+def hello(name):
+    return f'hello {name}'
+```'''
+
+
+def _sentence(rng, n_min=6, n_max=16):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(n_min, n_max))]
+    return ' '.join(words).capitalize() + '.'
+
+
+def _markdown(rng):
+    # 실제 글처럼 제목, 문단, 목록, 코드 블록, 링크가 섞인 본문
+    blocks = []
+    for _ in range(rng.randint(3, 8)):
+        kind = rng.random()
+        if kind < 0.15:
+            blocks.append(f'## {_sentence(rng, 2, 5)[:-1]}')
+        elif kind < 0.3:
+            blocks.append('\n'.join(f'- {_sentence(rng, 3, 8)}' for _ in range(rng.randint(2, 5))))
+        elif kind < 0.4:
+            blocks.append(CODE)
+        else:
+            paragraph = ' '.join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+            if rng.random() < 0.3:
+                paragraph += f' **{rng.choice(WORDS)}** [link](https://example.com/{rng.choice(WORDS)})'
+            blocks.append(paragraph)
+    return '\n\n'.join(blocks)
+
+
+class Command(BaseCommand):
+    help = '성능 측정용으로 포스트, 태그, 카테고리, 댓글을 bulk_create로 대량 생성한다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=5, help='포스트당 평균 댓글 수')
+        parser.add_argument('--tags', type=int, default=300)
+        parser.add_argument('--categories', type=int, default=12)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0, help='같은 seed면 같은 데이터를 만든다')
+        parser.add_argument('--flush', action='store_true', help='이전에 seed_blog로 만든 데이터를 먼저 지운다')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['flush']:
+            self.flush()
+
+        self.make_social_app()
+        users = self.make_users(options['users'])
+        categories = self.make_categories(options['categories'])
+        tags = resolve_tags([f'{rng.choice(WORDS)}-{i}' for i in range(options['tags'])])
+
+        total, batch_size = options['posts'], options['batch_size']
+        made = 0
+        while made < total:
+            n = min(batch_size, total - made)
+            with transaction.atomic():
+                self.make_posts(rng, n, users, categories, tags, options['comments'])
+            made += n
+            self.stdout.write(f'{made}/{total} posts')
+
+        # bulk_create는 신호를 보내지 않으므로 카운터와 캐시를 직접 맞춘다
+        recount_categories()
+        recount_tags()
+        recount_comments()
+        rebuild_related_posts()
+        invalidate_sidebar()
+        bump_content_version()
+        bump_feed_version()
+        bump_tag_version()
+        self.stdout.write(self.style.SUCCESS(f'Done: {made} posts'))
+
+    def flush(self):
+        posts = Post.objects.filter(author__username__startswith=SEED_PREFIX)
+        Post.tags.through.objects.filter(post__in=posts).delete()
+        Comment.objects.filter(post__in=posts).delete()
+        deleted, _ = posts.delete()
+        User.objects.filter(username__startswith=SEED_PREFIX).delete()
+        Category.objects.filter(name__startswith=SEED_PREFIX).delete()
+        self.stdout.write(f'Flushed {deleted} objects')
+
+    def make_social_app(self):
+        # 템플릿의 구글 로그인 링크는 SocialApp이 없으면 오류가 나므로, 빈 DB에서도 페이지가 열리도록 만들어 둔다
+        if SocialApp.objects.filter(provider='google').exists():
+            return
+        site, _ = Site.objects.get_or_create(id=settings.SITE_ID, defaults={'domain': 'localhost', 'name': 'localhost'})
+        app = SocialApp.objects.create(provider='google', name='Google', client_id='seed-client-id', secret='seed-secret')
+        app.sites.add(site)
+
+    def make_users(self, n):
+        usernames = [f'{SEED_PREFIX}user{i}' for i in range(n)]
+        User.objects.bulk_create(
+            [User(username=name, email=f'{name}@example.com', password='!') for name in usernames],
+            ignore_conflicts=True,
+        )
+        return list(User.objects.filter(username__in=usernames))
+
+    def make_categories(self, n):
+        names = [f'{SEED_PREFIX}category{i}' for i in range(n)]
+        Category.objects.bulk_create(
+            [Category(name=name, slug=name.replace('_', '-')) for name in names], ignore_conflicts=True,
+        )
+        return list(Category.objects.filter(name__in=names))
+
+    def make_posts(self, rng, n, users, categories, tags, comments_per_post):
+        posts = []
+        for _ in range(n):
+            post = Post(
+                title=_sentence(rng, 2, 4)[:30],
+                hook_text=_sentence(rng, 4, 10)[:100],
+                content=_markdown(rng),
+                author=rng.choice(users),
+                category=rng.choice(categories) if categories and rng.random() < 0.9 else None,
+            )
+            post.render_content()
+            posts.append(post)
+        Post.objects.bulk_create(posts)
+
+        Through = Post.tags.through
+        links = []
+        for post in posts:
+            for tag in rng.sample(tags, min(len(tags), rng.randint(0, 4))):
+                links.append(Through(post_id=post.pk, tag_id=tag.pk))
+        Through.objects.bulk_create(links)
+
+        Comment.objects.bulk_create([
+            Comment(post=post, author=rng.choice(users), content=_sentence(rng, 3, 30))
+            for post in posts
+            for _ in range(rng.randint(0, comments_per_post * 2))
+        ])
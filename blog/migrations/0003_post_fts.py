@@ -0,0 +1,72 @@
+from django.db import migrations
+
+# SQLite FTS5 전문 검색 인덱스. trigram 토크나이저를 써서 기존 contains 검색처럼 부분 문자열도 찾는다.
+# 포스트/태그가 바뀌면 트리거가 인덱스를 갱신하므로 bulk_create, update() 등 ORM 경로와 상관없이 최신 상태가 유지된다.
+TAG_NAMES = """(
+    SELECT group_concat(t.name, ' ') FROM blog_tag t
+    JOIN blog_post_tags pt ON pt.tag_id = t.id
+    WHERE pt.post_id = {post_id}
+)"""
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE blog_post_fts USING fts5(title, hook_text, content, tags, tokenize='trigram')",
+    """CREATE TRIGGER blog_post_fts_insert AFTER INSERT ON blog_post BEGIN
+        INSERT INTO blog_post_fts(rowid, title, hook_text, content, tags)
+        VALUES (new.id, new.title, new.hook_text, new.content, '');
+    END""",
+    """CREATE TRIGGER blog_post_fts_update AFTER UPDATE OF title, hook_text, content ON blog_post BEGIN
+        UPDATE blog_post_fts SET title = new.title, hook_text = new.hook_text, content = new.content
+        WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER blog_post_fts_delete AFTER DELETE ON blog_post BEGIN
+        DELETE FROM blog_post_fts WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER blog_post_fts_tag_add AFTER INSERT ON blog_post_tags BEGIN
+        UPDATE blog_post_fts SET tags = {TAG_NAMES.format(post_id='new.post_id')} WHERE rowid = new.post_id;
+    END""",
+    f"""CREATE TRIGGER blog_post_fts_tag_remove AFTER DELETE ON blog_post_tags BEGIN
+        UPDATE blog_post_fts SET tags = coalesce({TAG_NAMES.format(post_id='old.post_id')}, '') WHERE rowid = old.post_id;
+    END""",
+    f"""CREATE TRIGGER blog_post_fts_tag_rename AFTER UPDATE OF name ON blog_tag BEGIN
+        UPDATE blog_post_fts SET tags = {TAG_NAMES.format(post_id='blog_post_fts.rowid')}
+        WHERE rowid IN (SELECT post_id FROM blog_post_tags WHERE tag_id = new.id);
+    END""",
+    f"""INSERT INTO blog_post_fts(rowid, title, hook_text, content, tags)
+        SELECT p.id, p.title, p.hook_text, p.content, coalesce({TAG_NAMES.format(post_id='p.id')}, '')
+        FROM blog_post p""",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS blog_post_fts_insert',
+    'DROP TRIGGER IF EXISTS blog_post_fts_update',
+    'DROP TRIGGER IF EXISTS blog_post_fts_delete',
+    'DROP TRIGGER IF EXISTS blog_post_fts_tag_add',
+    'DROP TRIGGER IF EXISTS blog_post_fts_tag_remove',
+    'DROP TRIGGER IF EXISTS blog_post_fts_tag_rename',
+    'DROP TABLE IF EXISTS blog_post_fts',
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return  # 다른 DB에서는 blog.search가 ORM 검색으로 대체한다
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_post_rendered_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
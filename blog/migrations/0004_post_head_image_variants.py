@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='head_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-18 23:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='post',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='blog.post'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created_at', 'id'], name='blog_comment_post_created'),
+        ),
+        # 태그 페이지: tag_id로 찾은 포스트를 최신순으로. 자동 생성된 중간 테이블이라 Meta.indexes를 쓸 수 없다
+        migrations.RunSQL(
+            'CREATE INDEX blog_post_tags_tag_post ON blog_post_tags (tag_id, post_id)',
+            'DROP INDEX blog_post_tags_tag_post',
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['name'], name='blog_tag_name'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-18 23:30
+
+from django.db import migrations, models
+
+
+# 트리거가 남아 있으면 SQLite가 blog_post, blog_tag 테이블을 다시 만들면서 이름을 바꿀 때 "no such table" 오류가 난다.
+# 트리거는 마이그레이션이 끝나면 post_migrate 신호에서 다시 만든다 (blog/signals.py)
+DROP_FTS_TRIGGERS_SQL = [
+    'DROP TRIGGER IF EXISTS blog_post_fts_insert',
+    'DROP TRIGGER IF EXISTS blog_post_fts_update',
+    'DROP TRIGGER IF EXISTS blog_post_fts_delete',
+    'DROP TRIGGER IF EXISTS blog_post_fts_tag_add',
+    'DROP TRIGGER IF EXISTS blog_post_fts_tag_remove',
+    'DROP TRIGGER IF EXISTS blog_post_fts_tag_rename',
+]
+
+
+def drop_fts_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_FTS_TRIGGERS_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_comment_post_pk_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_fts_triggers, drop_fts_triggers),
+        migrations.AddField(
+            model_name='post',
+            name='download_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-19 00:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_related_post'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='relatedpost',
+            name='computed_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
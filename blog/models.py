@@ -2,12 +2,33 @@ from django.db import models
 from django.contrib.auth.models import User
 from markdownx.models import MarkdownxField
 from markdownx.utils import markdown
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+from django.utils import timezone
+from .avatars import avatar_url_for
+from . import images
 import os
 
+EXCERPT_WORDS = 45  # 목록 카드에 보여줄 요약(excerpt)의 단어 수
+
+
+def exclude_counters(instance, kwargs, counters):
+    # 카운터 필드는 신호에서 F()로만 바꾼다. 메모리에 있던 예전 값으로 덮어쓰지 않도록 일반 save()에서는 빼고 저장한다
+    if kwargs.get('update_fields') is None and not kwargs.get('force_insert') and not instance._state.adding:
+        kwargs['update_fields'] = [
+            f.name for f in instance._meta.concrete_fields
+            if not f.primary_key and f.name not in counters and f.attname in instance.__dict__
+        ]
+
 
 class Category(models.Model):
     name = models.CharField(max_length=50, unique=True)  # 카테고리의 이름
     slug = models.SlugField(max_length=200, unique=True, allow_unicode=True)
+    post_count = models.IntegerField(default=0, editable=False)  # blog/counters.py에서 신호로 관리
+
+    def save(self, *args, **kwargs):
+        exclude_counters(self, kwargs, ['post_count'])
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -22,6 +43,11 @@ class Category(models.Model):
 class Tag(models.Model):
     name = models.CharField(max_length=50)
     slug = models.SlugField(max_length=200, unique=True, allow_unicode=True)
+    post_count = models.IntegerField(default=0, editable=False)  # blog/counters.py에서 신호로 관리
+
+    def save(self, *args, **kwargs):
+        exclude_counters(self, kwargs, ['post_count'])
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -29,6 +55,21 @@ class Tag(models.Model):
     def get_absolute_url(self):
         return f'/blog/tag/{self.slug}/'
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='blog_tag_name'),  # 태그 입력은 이름으로 찾는다 (blog/tags.py)
+        ]
+
+
+class PostQuerySet(models.QuerySet):
+    def for_list(self):
+        # 목록 카드에서 쓰는 author, category, tags를 고정된 수의 쿼리로 가져온다
+        return self.select_related('author', 'category').prefetch_related('tags').defer('content', 'content_html')
+
+    def for_detail(self):
+        # 댓글은 한 페이지씩 따로 가져온다 (blog/comments.py)
+        return self.select_related('author', 'category').prefetch_related('tags')
+
 
 class Post(models.Model):
     title = models.CharField(max_length=30)
@@ -36,6 +77,8 @@ class Post(models.Model):
     content = MarkdownxField()
 
     head_image = models.ImageField(upload_to='blog/images/%Y/%m/%d/', blank=True)
+    # head_image의 축소본/WebP 경로와 크기. blog/images.py의 generate_variants() 결과
+    head_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     file_upload = models.FileField(upload_to='blog/files/%Y/%m/%d/', blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -46,31 +89,101 @@ class Post(models.Model):
     category = models.ForeignKey(Category, null=True, blank=True, on_delete=models.SET_NULL)
     tags = models.ManyToManyField(Tag, blank=True)
 
+    comment_count = models.IntegerField(default=0, editable=False)  # blog/counters.py에서 신호로 관리
+    download_count = models.PositiveIntegerField(default=0, editable=False)  # blog/downloads.py에서 모아서 더한다
+
+    objects = PostQuerySet.as_manager()
+
+    # 저장할 때 미리 렌더링해두는 필드들. 요청마다 마크다운을 다시 변환하지 않기 위함
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt_html = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+
     def __str__(self):
         return f'[{self.pk}]{self.title} :: {self.author}'  # 포스트 목록에 작성자 정보 출력
 
+    def render_content(self):
+        self.content_html = markdown(self.content)
+        self.excerpt_html = Truncator(self.content_html).words(EXCERPT_WORDS, html=True, truncate=" …")
+        self.word_count = len(strip_tags(self.content_html).split())
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.render_content()
+        elif 'content' in update_fields:  # content를 저장할 때만 다시 렌더링
+            self.render_content()
+            kwargs['update_fields'] = set(update_fields) | {'content_html', 'excerpt_html', 'word_count'}
+        exclude_counters(self, kwargs, ['comment_count', 'download_count'])
+        super().save(*args, **kwargs)
+
+        if self.head_image_variants.get('source') != (self.head_image.name or None):
+            # 이미지 변환은 오래 걸리므로 요청 안에서 하지 않고 run_worker에 맡긴다
+            from .jobs import enqueue
+            from .tasks import render_head_image_variants
+            enqueue(render_head_image_variants, self.pk)
+
+    def update_head_image_variants(self):
+        old = self.head_image_variants
+        data = {}
+        if self.head_image:
+            try:
+                data = images.generate_variants(self.head_image.name)
+            except OSError:
+                data = {'source': self.head_image.name}  # 이미지로 읽을 수 없는 파일이면 원본을 그대로 보여준다
+        images.delete_variants(old)
+        self.head_image_variants = data
+        # update()는 신호를 보내지 않으므로 캐시된 페이지와 ETag(updated_at)가 바뀌도록 직접 처리한다
+        self.updated_at = timezone.now()
+        Post.objects.filter(pk=self.pk).update(head_image_variants=data, updated_at=self.updated_at)
+        from .page_cache import bump_content_version
+        from . import feed_scopes
+        bump_content_version()
+        feed_scopes.post_saved(self, False, ['head_image_variants', 'updated_at'])  # 사이트맵의 lastmod
+
     def get_absolute_url(self):
         return f'/blog/{self.pk}/'
 
     # file download
+    def get_download_url(self):
+        return f'/blog/{self.pk}/download/'
+
     def get_file_name(self):
         return os.path.basename(self.file_upload.name)
 
     def get_file_ext(self):
         return self.get_file_name().split('.')[-1]
 
+    def has_head_image_variants(self):
+        # 이미지를 바꾼 직후에는 작업이 끝날 때까지 예전 축소본 대신 원본을 보여준다
+        data = self.head_image_variants
+        return bool(self.head_image and data.get('variants') and data.get('source') == self.head_image.name)
+
+    def get_head_image_srcset(self):
+        return images.build_srcset(self.head_image_variants)
+
+    def get_head_image_webp_srcset(self):
+        return images.build_srcset(self.head_image_variants, webp=True)
+
+    def get_head_image_fallback_url(self):
+        return images.largest_fallback_url(self.head_image_variants) or self.head_image.url
+
     def get_content_markdown(self):
-        return markdown(self.content)
+        if self.content_html:
+            return self.content_html
+        return markdown(self.content)  # 아직 render_posts로 채워지지 않은 예전 포스트
+
+    def get_excerpt(self):
+        if self.excerpt_html:
+            return self.excerpt_html
+        return Truncator(self.get_content_markdown()).words(EXCERPT_WORDS, html=True, truncate=" …")
 
     def get_avatar_url(self):
-        if self.author.socialaccount_set.exists():
-            return self.author.socialaccount_set.first().get_avatar_url()
-        else:
-            return f'https://api.dicebear.com/9.x/lorelei/svg?seed={self.author.email}'
+        return avatar_url_for(self.author)
 
 
 class Comment(models.Model):
-    post = models.ForeignKey(Post, on_delete=models.CASCADE)  # 여러 댓글이 한 포스트의 댓글이 되므로 post 필드에는 외래키를 사용
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, db_index=False)  # 여러 댓글이 한 포스트의 댓글이 되므로 post 필드에는 외래키를 사용
     author = models.ForeignKey(User, on_delete=models.CASCADE)  # 작성자를 저장할 author 필드
     content = models.TextField()  # 댓글 내용을 담을 content필드
     created_at = models.DateTimeField(auto_now_add=True)  # 댓글 작성 일시
@@ -82,8 +195,63 @@ class Comment(models.Model):
     def get_absolute_url(self):
         return f'{self.post.get_absolute_url()}#comment-{self.pk}'  # 이때 #은 html 요소의 id를 의미함
 
+    class Meta:
+        indexes = [
+            # 포스트별 댓글을 pk 커서로 최신순/오래된 순 페이지 조회 (post 외래키 인덱스도 겸한다)
+            models.Index(fields=['post', 'id'], name='blog_comment_post_pk'),
+        ]
+
     def get_avatar_url(self):
-        if self.author.socialaccount_set.exists():
-            return self.author.socialaccount_set.first().get_avatar_url()
-        else:
-            return f'https://api.dicebear.com/9.x/lorelei/svg?seed={self.author.email}'
+        return avatar_url_for(self.author)
+
+
+class RelatedPost(models.Model):
+    # 포스트마다 미리 계산해 둔 관련 포스트 상위 목록 (blog/related.py, manage.py rebuild_related)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_links', db_index=False)
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()  # 0부터, 점수가 높은 순서
+    score = models.FloatField()
+    computed_at = models.DateTimeField(auto_now_add=True)  # 상세 페이지의 ETag/Last-Modified에 쓴다 (blog/conditional.py)
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id} ({self.score:.3f})'
+
+    class Meta:
+        constraints = [
+            # 상세 페이지에서 post_id로 rank 순서대로 읽는다 (post 외래키 인덱스도 겸한다)
+            models.UniqueConstraint(fields=['post', 'rank'], name='blog_relatedpost_post_rank'),
+        ]
+
+
+class Job(models.Model):
+    # 별도 브로커 없이 DB 테이블로 관리하는 백그라운드 작업. blog/jobs.py, manage.py run_worker 참고
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=200)  # 실행할 함수의 경로 (예: blog.tasks.render_head_image_variants)
+    args = models.JSONField(default=list, blank=True)
+    dedupe_key = models.CharField(max_length=64)  # name과 args로 만든 해시. 같은 대기 작업을 두 번 넣지 않기 위함
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField()  # 이 시각 이후에 실행 (재시도 backoff)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'[{self.pk}]{self.name}{tuple(self.args)} :: {self.status}'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='blog_job_status_run_at'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'], condition=models.Q(status='pending'), name='blog_job_unique_pending',
+            ),
+        ]
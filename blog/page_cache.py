@@ -0,0 +1,165 @@
+import time
+from functools import wraps
+from hashlib import md5
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from blogcraft_django.minify import minify_response
+
+CONTENT_VERSION_KEY = 'blog:content_version'
+# 피드/사이트맵용 버전. 댓글에는 바뀌지 않고 포스트, 카테고리, 태그가 바뀔 때만 바뀐다.
+# 전체 버전과 범위(scope)별 버전이 있고, 응답은 전체 버전과 자기 범위의 버전으로 캐시한다 (blog/feed_scopes.py)
+FEED_VERSION_KEY = 'blog:feed_version'
+# 태그 자동완성 인덱스(blog/tags.py)용 버전. 태그가 생기거나 지워지거나 post_count가 바뀔 때 바뀐다
+TAG_VERSION_KEY = 'blog:tag_version'
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24  # 내용이 바뀌면 버전이 바뀌므로 TTL을 짧게 잡을 필요가 없다
+STATS_KEYS = {
+    'hits': 'blog:page_cache:hits',
+    'misses': 'blog:page_cache:misses',
+}
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # 버전 키가 캐시에서 밀려나도 예전 키와 겹치지 않도록 시각으로 새 버전을 만든다
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_content_version():
+    return _get_version(CONTENT_VERSION_KEY)
+
+
+def bump_content_version():
+    cache.set(CONTENT_VERSION_KEY, time.time_ns(), None)
+
+
+def get_feed_versions(scopes):
+    """[전체 버전, 범위별 버전...]. 캐시를 한 번만 조회한다."""
+    keys = [FEED_VERSION_KEY, *(f'{FEED_VERSION_KEY}:{scope}' for scope in scopes)]
+    found = cache.get_many(keys)
+    return [found[key] if key in found else _get_version(key) for key in keys]
+
+
+def request_feed_versions(request, scopes, *args, **kwargs):
+    # 같은 요청 안의 캐시 키, ETag, Last-Modified가 같은 버전을 쓰도록 요청에 기억해 둔다
+    if not hasattr(request, '_feed_versions'):
+        request._feed_versions = get_feed_versions(scopes(request, *args, **kwargs))
+    return request._feed_versions
+
+
+def bump_feed_version(*scopes):
+    """범위를 주지 않으면 전체 버전을 바꿔서 모든 피드와 사이트맵을 다시 만든다."""
+    now = time.time_ns()
+    keys = [f'{FEED_VERSION_KEY}:{scope}' for scope in dict.fromkeys(scopes)] or [FEED_VERSION_KEY]
+    cache.set_many({key: now for key in keys}, None)
+
+
+def get_tag_version():
+    return _get_version(TAG_VERSION_KEY)
+
+
+def bump_tag_version():
+    cache.set(TAG_VERSION_KEY, time.time_ns(), None)
+
+
+def page_cache_key(request):
+    path = md5(request.get_full_path().encode()).hexdigest()
+    return f'blog:page:{get_content_version()}:{path}'
+
+
+def _count(name):
+    key = STATS_KEYS[name]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def page_cache_stats():
+    stats = cache.get_many(STATS_KEYS.values())
+    return {name: stats.get(key, 0) for name, key in STATS_KEYS.items()}
+
+
+def _is_cacheable(request):
+    return (
+        getattr(settings, 'BLOG_PAGE_CACHE', True)
+        and request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+    )
+
+
+def _lookup(request):
+    key = page_cache_key(request)
+    response = cache.get(key)
+    if response is not None:
+        _count('hits')
+        response['X-Page-Cache'] = 'HIT'
+    else:
+        _count('misses')
+    return key, response
+
+
+def _store(request, key, response):
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    minify_response(response)  # 캐시에서 꺼낼 때마다 다시 줄이지 않도록 줄인 HTML을 저장한다
+    # CSRF 토큰이나 쿠키가 들어간 응답은 다른 사람에게 보여주면 안 된다
+    if response.status_code == 200 and not response.cookies and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+        cache.set(key, response, PAGE_CACHE_TIMEOUT)
+    response['X-Page-Cache'] = 'MISS'
+    return response
+
+
+def cache_anonymous_page(view_func):
+    """로그인하지 않은 사용자의 GET 요청 응답을 내용 버전이 들어간 키로 캐시한다. async 뷰에도 쓸 수 있다."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            request.user = await request.auser()  # 세션 조회를 async로 끝내 둔다
+            if not _is_cacheable(request):
+                return await view_func(request, *args, **kwargs)
+            key, response = await sync_to_async(_lookup)(request)
+            if response is not None:
+                return response
+            response = await view_func(request, *args, **kwargs)
+            return await sync_to_async(_store)(request, key, response)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not _is_cacheable(request):
+            return view_func(request, *args, **kwargs)
+        key, response = _lookup(request)
+        if response is not None:
+            return response
+        return _store(request, key, view_func(request, *args, **kwargs))
+    return wrapper
+
+
+def cache_feed(scopes):
+    """피드, 사이트맵처럼 사용자와 상관없는 GET 응답을 피드 버전이 들어간 키로 캐시한다.
+
+    scopes(request, *args, **kwargs)는 응답이 보여주는 범위 목록이다 (blog/feed_scopes.py).
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'BLOG_PAGE_CACHE', True) or request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            versions = request_feed_versions(request, scopes, *args, **kwargs)
+            path = md5(request.get_full_path().encode()).hexdigest()
+            key = f"blog:feed:{'-'.join(map(str, versions))}:{path}"
+            response = cache.get(key)
+            if response is not None:
+                _count('hits')
+                response['X-Page-Cache'] = 'HIT'
+                return response
+            _count('misses')
+            return _store(request, key, view_func(request, *args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,83 @@
+from django.http import Http404
+
+
+class KeysetPage:
+    """pk 커서(keyset)로 자른 한 페이지. OFFSET과 COUNT(*) 없이 인덱스 범위 조회만 한다.
+
+    descending(기본값, 최신순)이면 after=<pk>는 그보다 오래된 글, before=<pk>는 그보다 새로운 글을 뜻한다.
+    오래된 순이면 반대가 된다.
+    """
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        return self.object_list[-1].pk if self._has_next else None
+
+    @property
+    def previous_cursor(self):
+        return self.object_list[0].pk if self._has_previous else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _parse_cursor(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise Http404('잘못된 커서입니다.')
+
+
+def _keyset_queries(queryset, per_page, after, before, descending):
+    # forward: after 쪽(다음 페이지)으로 가는 비교, backward: before 쪽(이전 페이지)으로 가는 비교
+    forward, backward = ('lt', 'gt') if descending else ('gt', 'lt')
+    order = '-pk' if descending else 'pk'
+    if before is not None:
+        before = _parse_cursor(before)
+        reverse_order = 'pk' if descending else '-pk'
+        items = queryset.filter(**{f'pk__{backward}': before}).order_by(reverse_order)[:per_page + 1]
+        return items, queryset.filter(**{f'pk__{forward}e': before}), True
+    items = queryset.order_by(order)
+    if after is None:
+        return items[:per_page + 1], None, False
+    after = _parse_cursor(after)
+    return items.filter(**{f'pk__{forward}': after})[:per_page + 1], queryset.filter(**{f'pk__{backward}e': after}), False
+
+
+def _keyset_page(items, per_page, has_other_side, backwards):
+    # backwards(before 커서)이면 반대 순서로 가져왔으므로 뒤집는다
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if backwards:
+        items = items[::-1]
+        has_next, has_previous = has_other_side, has_more
+    else:
+        has_next, has_previous = has_more, has_other_side
+    if not items:
+        has_next = has_previous = False  # 빈 페이지에서는 커서를 만들 수 없다
+    return KeysetPage(items, has_next, has_previous)
+
+
+def keyset_paginate(queryset, per_page, after=None, before=None, descending=True):
+    items, other_side, backwards = _keyset_queries(queryset, per_page, after, before, descending)
+    has_other_side = other_side is not None and other_side.exists()
+    return _keyset_page(list(items), per_page, has_other_side, backwards)
+
+
+async def akeyset_paginate(queryset, per_page, after=None, before=None, descending=True):
+    items, other_side, backwards = _keyset_queries(queryset, per_page, after, before, descending)
+    has_other_side = other_side is not None and await other_side.aexists()
+    return _keyset_page([item async for item in items], per_page, has_other_side, backwards)
@@ -0,0 +1,225 @@
+import heapq
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+from .jobs import enqueue
+from .models import Post, Tag, RelatedPost
+from .page_cache import bump_content_version
+
+# 관련 포스트 추천. 포스트를 태그 TF-IDF 벡터(태그가 있으면 1, 가중치는 idf)로 보고
+#   점수 = 코사인 유사도 + CATEGORY_WEIGHT (같은 카테고리일 때)
+# 로 상위 RELATED_LIMIT개를 RelatedPost 테이블에 저장한다. 상세 페이지는 인덱스를 타는 쿼리 하나로 읽기만 한다.
+# 유사도는 태그 -> 포스트 역색인으로 태그를 공유하는 포스트끼리만 더한다 (희소 행렬 곱 X·Xᵀ을 한 행씩 계산하는 것과 같다).
+# 같은 태그를 공유하는 포스트가 모자라면 같은 카테고리의 최신 포스트로 채운다.
+#   전체 계산: manage.py rebuild_related
+#   부분 계산: 포스트의 태그나 카테고리가 바뀌면 update_related_posts 작업이 그 포스트와 이웃 포스트의 목록만 고친다.
+#             idf가 조금씩 달라지는 것은 반영하지 않으므로 가끔 rebuild_related로 전체를 다시 계산한다.
+
+RELATED_LIMIT = 5
+CATEGORY_WEIGHT = 0.3
+MAX_TAG_POSTS = 1000  # 이보다 많은 포스트에 붙은 태그는 idf가 낮고 비교할 쌍만 늘리므로 후보를 찾을 때 건너뛴다
+REBUILD_BATCH_SIZE = 1000
+
+
+class TagGraph:
+    """포스트의 태그, 카테고리와 태그별 포스트 수(df)로 포스트 사이의 점수를 계산한다."""
+
+    def __init__(self, post_tags, post_categories, df, total):
+        self.post_tags = post_tags  # {post_id: [tag_id]}
+        self.post_categories = post_categories  # {post_id: category_id}
+        self.df = df  # {tag_id: 태그가 붙은 포스트 수}
+        self.total = total  # 전체 포스트 수
+        self.tag_posts = defaultdict(list)
+        for post_id, tag_ids in post_tags.items():
+            for tag_id in tag_ids:
+                self.tag_posts[tag_id].append(post_id)
+        self.weights = {tag_id: math.log((total + 1) / (n + 1)) + 1 for tag_id, n in df.items()}
+        self.norms = {
+            post_id: math.sqrt(sum(self.weights[tag_id] ** 2 for tag_id in tag_ids))
+            for post_id, tag_ids in post_tags.items()
+        }
+        self.category_latest = None
+
+    @classmethod
+    def load(cls):
+        post_categories = dict(Post.objects.values_list('pk', 'category_id').iterator(chunk_size=5000))
+        post_tags = defaultdict(list)
+        for post_id, tag_id in Post.tags.through.objects.values_list('post_id', 'tag_id').iterator(chunk_size=5000):
+            post_tags[post_id].append(tag_id)
+        df = defaultdict(int)
+        for tag_ids in post_tags.values():
+            for tag_id in tag_ids:
+                df[tag_id] += 1
+        graph = cls(dict(post_tags), post_categories, df, len(post_categories))
+        # 카테고리마다 최신 포스트 RELATED_LIMIT + 1개 (자기 자신을 빼도 RELATED_LIMIT개가 남도록)
+        latest = defaultdict(list)
+        for post_id in sorted(post_categories, reverse=True):
+            category_id = post_categories[post_id]
+            if category_id is not None and len(latest[category_id]) <= RELATED_LIMIT:
+                latest[category_id].append(post_id)
+        graph.category_latest = latest
+        return graph
+
+    @classmethod
+    def load_around(cls, post_id):
+        """post_id와 태그를 공유하거나 post_id를 관련 포스트로 가진 포스트만 읽는다 (부분 계산용)."""
+        Through = Post.tags.through
+        own_tags = list(Through.objects.filter(post_id=post_id).values_list('tag_id', flat=True))
+        df = dict(Tag.objects.filter(pk__in=own_tags).values_list('pk', 'post_count'))
+        shared = [tag_id for tag_id in own_tags if df.get(tag_id, 0) <= MAX_TAG_POSTS]
+        post_ids = {post_id}
+        post_ids.update(Through.objects.filter(tag_id__in=shared).values_list('post_id', flat=True))
+        post_ids.update(RelatedPost.objects.filter(related_id=post_id).values_list('post_id', flat=True))
+
+        category_latest = None
+        category_id = Post.objects.filter(pk=post_id).values_list('category_id', flat=True).first()
+        if category_id is not None:
+            in_category = Post.objects.filter(category_id=category_id)
+            category_latest = {category_id: list(
+                in_category.order_by('-pk').values_list('pk', flat=True)[:RELATED_LIMIT + 1]
+            )}
+            if post_id in category_latest[category_id]:
+                # 최신 포스트는 같은 카테고리에서 목록이 덜 찬 포스트의 빈자리를 채운다
+                post_ids.update(
+                    in_category.annotate(n=Count('related_links')).filter(n__lt=RELATED_LIMIT)
+                    .values_list('pk', flat=True)
+                )
+
+        post_tags = defaultdict(list)
+        for pk, tag_id in Through.objects.filter(post_id__in=post_ids).values_list('post_id', 'tag_id'):
+            post_tags[pk].append(tag_id)
+        df.update(Tag.objects.filter(pk__in={t for tags in post_tags.values() for t in tags} - df.keys())
+                  .values_list('pk', 'post_count'))
+        post_categories = dict(Post.objects.filter(pk__in=post_ids).values_list('pk', 'category_id'))
+        graph = cls(dict(post_tags), post_categories, df, Post.objects.count())
+        graph.category_latest = category_latest
+        return graph
+
+    def _same_category(self, a, b):
+        category_id = self.post_categories.get(a)
+        return category_id is not None and category_id == self.post_categories.get(b)
+
+    def score(self, a, b):
+        shared = set(self.post_tags.get(a, ())) & set(self.post_tags.get(b, ()))
+        similarity = sum(self.weights[tag_id] ** 2 for tag_id in shared)
+        if similarity:
+            similarity /= self.norms[a] * self.norms[b]
+        return similarity + (CATEGORY_WEIGHT if self._same_category(a, b) else 0)
+
+    def neighbors(self, post_id):
+        """태그를 공유하는 포스트: 태그 가중치 곱의 합 (코사인 유사도의 분자)."""
+        dots = defaultdict(float)
+        for tag_id in self.post_tags.get(post_id, ()):
+            if self.df[tag_id] > MAX_TAG_POSTS:
+                continue
+            w2 = self.weights[tag_id] ** 2
+            for other in self.tag_posts[tag_id]:
+                if other != post_id:
+                    dots[other] += w2
+        return dots
+
+    def related(self, post_id, limit=RELATED_LIMIT):
+        """[(related_id, score)]를 점수가 높은 순서로 (같으면 최신 포스트 먼저) 돌려준다."""
+        norm = self.norms.get(post_id)
+        scores = {
+            other: dot / (norm * self.norms[other]) + (CATEGORY_WEIGHT if self._same_category(post_id, other) else 0)
+            for other, dot in self.neighbors(post_id).items()
+        }
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+        category_id = self.post_categories.get(post_id)
+        if len(top) < limit and category_id is not None and self.category_latest:
+            picked = {other for other, _ in top} | {post_id}
+            for other in self.category_latest.get(category_id, ()):
+                if len(top) >= limit:
+                    break
+                if other not in picked:
+                    top.append((other, CATEGORY_WEIGHT))
+            top.sort(key=lambda item: (item[1], item[0]), reverse=True)
+        return top
+
+
+def _write(lists):
+    # {post_id: [(related_id, score)]} 로 해당 포스트들의 목록을 통째로 바꾼다
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=lists).delete()
+        RelatedPost.objects.bulk_create([
+            RelatedPost(post_id=post_id, related_id=related_id, rank=rank, score=score)
+            for post_id, items in lists.items()
+            for rank, (related_id, score) in enumerate(items)
+        ], batch_size=1000)
+
+
+def rebuild_related_posts(batch_size=REBUILD_BATCH_SIZE, progress=None):
+    """모든 포스트의 관련 포스트를 다시 계산한다. 배치마다 트랜잭션을 나눠서 쓰기 잠금을 오래 잡지 않는다."""
+    graph = TagGraph.load()
+    post_ids = sorted(graph.post_categories)
+    for start in range(0, len(post_ids), batch_size):
+        batch = post_ids[start:start + batch_size]
+        _write({post_id: graph.related(post_id) for post_id in batch})
+        if progress:
+            progress(start + len(batch), len(post_ids))
+    bump_content_version()
+    return len(post_ids)
+
+
+def update_related_posts(post_id):
+    """post_id의 목록을 다시 계산하고, 이웃 포스트의 목록에서는 post_id의 자리만 고친다."""
+    if not Post.objects.filter(pk=post_id).exists():
+        return  # 그 사이에 삭제된 포스트 (다른 포스트의 목록에서는 CASCADE로 지워졌다)
+    graph = TagGraph.load_around(post_id)
+
+    current = defaultdict(list)
+    for row in RelatedPost.objects.filter(post_id__in=graph.post_categories).order_by('post_id', 'rank'):
+        current[row.post_id].append((row.related_id, row.score))
+    lists = {}
+    own = graph.related(post_id)
+    if own != current[post_id]:
+        lists[post_id] = own
+    for other in set(graph.post_categories) - {post_id}:
+        old = current[other]
+        items = [item for item in old if item[0] != post_id]
+        score = graph.score(other, post_id)
+        if score:
+            items.append((post_id, score))
+        items = heapq.nlargest(RELATED_LIMIT, items, key=lambda item: (item[1], item[0]))
+        if items != old:
+            lists[other] = items
+
+    if lists:  # 바뀐 목록이 없으면 페이지 캐시를 그대로 둔다
+        _write(lists)
+        bump_content_version()  # 캐시된 상세 페이지의 관련 포스트를 바꾼다
+
+
+def schedule_update(post_ids):
+    # 요청 안에서 계산하지 않고 run_worker에 맡긴다. 같은 포스트의 대기 작업은 하나로 합쳐진다
+    from .tasks import update_related_posts as task  # tasks가 이 모듈을 가져오므로 여기서 가져온다
+    for post_id in post_ids:
+        enqueue(task, post_id)
+
+
+def remember_referrers(post):
+    # 포스트를 지우면 CASCADE로 다른 포스트의 목록에서 빠져 한 자리가 빈다. 지우기 전에 그 포스트들을 기억해 둔다
+    post._related_referrers = list(RelatedPost.objects.filter(related_id=post.pk).values_list('post_id', flat=True))
+
+
+def schedule_referrers(post):
+    schedule_update(post.__dict__.pop('_related_referrers', []))
+
+
+def related_queryset(post_id):
+    return (
+        RelatedPost.objects.filter(post_id=post_id).order_by('rank')
+        .select_related('related')
+        .only('related', 'related__title', 'related__hook_text', 'related__created_at')
+    )
+
+
+def get_related_posts(post_id):
+    """상세 페이지용. (post, rank) 인덱스를 타는 쿼리 하나로 관련 포스트를 점수 순서대로 가져온다."""
+    return [row.related for row in related_queryset(post_id)]
+
+
+async def aget_related_posts(post_id):
+    return [row.related async for row in related_queryset(post_id)]
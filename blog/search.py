@@ -0,0 +1,81 @@
+from django.db import connection
+from django.db.models import Q
+from .models import Post
+
+MIN_TRIGRAM_LENGTH = 3  # trigram 인덱스는 3글자 이상의 검색어만 찾을 수 있다
+FTS_QUERY = (
+    'SELECT rowid FROM blog_post_fts WHERE blog_post_fts MATCH %s {short_terms}'
+    # 제목, 태그 > 훅 텍스트 > 본문 순으로 가중치를 준 관련도순, 같으면 최신순
+    'ORDER BY bm25(blog_post_fts, 10.0, 5.0, 1.0, 10.0), rowid DESC'
+)
+# 짧은 검색어는 인덱스로 찾을 수 없으므로 MATCH로 찾은 후보 행에서만 contains로 거른다
+FTS_SHORT_TERM = (
+    "AND (title LIKE %s ESCAPE '\\' OR hook_text LIKE %s ESCAPE '\\' "
+    "OR content LIKE %s ESCAPE '\\' OR tags LIKE %s ESCAPE '\\') "
+)
+
+
+def _fts_match(terms):
+    # 사용자가 입력한 따옴표, 연산자(AND, OR, *)가 FTS5 문법으로 해석되지 않도록 각 단어를 문자열로 감싼다
+    return ' '.join('"{}"'.format(t.replace('"', '""')) for t in terms)
+
+
+def _like_pattern(term):
+    # icontains와 같이 %, _를 글자 그대로 찾는다
+    return '%{}%'.format(term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+
+
+def search_post_ids(q):
+    """검색어 q에 맞는 포스트 pk 목록을 관련도순으로 돌려준다."""
+    terms = q.split()
+    if not terms:
+        return []
+    long_terms = [t for t in terms if len(t) >= MIN_TRIGRAM_LENGTH]
+    if connection.vendor == 'sqlite' and long_terms:
+        # 한국어는 두 글자 단어가 많으므로, 3글자 이상인 검색어가 하나라도 있으면 인덱스로 후보를 줄인다
+        short_terms = [t for t in terms if len(t) < MIN_TRIGRAM_LENGTH]
+        params = [_fts_match(long_terms)]
+        for t in short_terms:
+            params += [_like_pattern(t)] * 4
+        with connection.cursor() as cursor:
+            cursor.execute(FTS_QUERY.format(short_terms=FTS_SHORT_TERM * len(short_terms)), params)
+            return [row[0] for row in cursor.fetchall()]
+
+    condition = Q()
+    for t in terms:
+        condition &= (
+            Q(title__icontains=t) | Q(hook_text__icontains=t) | Q(content__icontains=t) | Q(tags__name__icontains=t)
+        )
+    return list(Post.objects.filter(condition).order_by('-pk').values_list('pk', flat=True).distinct())
+
+
+class SearchResults:
+    """관련도순 pk 목록을 들고 있다가, 페이지에 해당하는 포스트만 가져온다.
+
+    Paginator는 count()와 슬라이싱만 사용하므로 QuerySet 대신 넘길 수 있다.
+    전체 개수는 인덱스 쿼리 결과의 길이이므로 COUNT 쿼리를 따로 날리지 않는다.
+    """
+
+    def __init__(self, post_ids, queryset):
+        self.post_ids = post_ids
+        self.queryset = queryset
+        self.model = queryset.model
+
+    def count(self):
+        return len(self.post_ids)
+
+    def __len__(self):
+        return len(self.post_ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        post_ids = self.post_ids[index]
+        posts = self.queryset.in_bulk(post_ids)
+        return [posts[pk] for pk in post_ids if pk in posts]
+
+
+def search_posts(q, queryset=None):
+    if queryset is None:
+        queryset = Post.objects.for_list()
+    return SearchResults(search_post_ids(q), queryset)
@@ -0,0 +1,30 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from .models import Post, Category
+
+SIDEBAR_CACHE_KEY = 'blog:sidebar'
+SIDEBAR_CACHE_TIMEOUT = 60 * 60  # 신호(signal)로 무효화되므로 길게 잡아도 된다
+
+
+def build_sidebar():
+    categories = list(Category.objects.order_by('pk'))  # 포스트 수는 Category.post_count에 저장되어 있다
+    return {
+        'categories': categories,
+        'no_category_post_count': Post.objects.filter(category=None).count(),
+    }
+
+
+def get_sidebar():
+    sidebar = cache.get(SIDEBAR_CACHE_KEY)
+    if sidebar is None:
+        sidebar = build_sidebar()
+        cache.set(SIDEBAR_CACHE_KEY, sidebar, SIDEBAR_CACHE_TIMEOUT)
+    return sidebar
+
+
+async def aget_sidebar():
+    return await sync_to_async(get_sidebar)()
+
+
+def invalidate_sidebar():
+    cache.delete(SIDEBAR_CACHE_KEY)
@@ -0,0 +1,160 @@
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete, m2m_changed, post_migrate
+from django.dispatch import receiver
+from django.contrib.auth.models import User
+from allauth.socialaccount.models import SocialAccount
+from .models import Post, Category, Tag, Comment
+from .sidebar import invalidate_sidebar
+from .avatars import invalidate_avatar
+from .page_cache import bump_content_version, bump_tag_version
+from .fts import ensure_fts_triggers
+from .db import configure_sqlite
+from . import counters, feed_scopes, related
+
+
+# 카운터 수신자를 먼저 등록해서, 아래의 캐시 무효화보다 먼저 실행되도록 한다
+@receiver(post_init, sender=Post)
+def remember_post_category(sender, instance, **kwargs):
+    counters.remember_category(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post_category(sender, instance, created, update_fields, **kwargs):
+    counters.post_saved(instance, created, update_fields)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_post_tags(sender, instance, **kwargs):
+    counters.post_deleting(instance)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.post_deleted(instance)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def count_post_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    counters.tags_changed(instance, action, reverse, pk_set)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    counters.comment_saved(instance, created)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.comment_deleted(instance)
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_sidebar_cache(sender, **kwargs):
+    invalidate_sidebar()
+
+
+@receiver([post_save, post_delete], sender=SocialAccount)
+def invalidate_social_avatar(sender, instance, **kwargs):
+    invalidate_avatar(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_avatar(sender, instance, **kwargs):
+    invalidate_avatar(instance.pk)  # 소셜 계정이 없으면 email로 아바타를 만들기 때문
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Tag)
+def bump_page_cache_version(sender, **kwargs):
+    bump_content_version()  # 이전 버전으로 캐시된 페이지는 더 이상 쓰이지 않는다
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def bump_page_cache_version_on_tags(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_content_version()
+
+
+# 피드/사이트맵 캐시는 바뀐 포스트가 나오는 범위의 버전만 바꾼다. 댓글은 피드와 사이트맵에 나오지 않으므로 여기에 없다
+@receiver(post_save, sender=Post)
+def bump_post_feed_versions(sender, instance, created, update_fields, **kwargs):
+    feed_scopes.post_saved(instance, created, update_fields)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_post_feed_scopes(sender, instance, **kwargs):
+    feed_scopes.post_deleting(instance)
+
+
+@receiver(post_delete, sender=Post)
+def bump_deleted_post_feed_versions(sender, instance, **kwargs):
+    feed_scopes.post_deleted(instance)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def bump_feed_versions_on_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    feed_scopes.tags_changed(instance, action, reverse, pk_set)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+def bump_taxonomy_feed_versions(sender, instance, created, update_fields, **kwargs):
+    feed_scopes.taxonomy_saved(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def bump_deleted_taxonomy_feed_versions(sender, instance, **kwargs):
+    feed_scopes.taxonomy_deleted(instance)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+@receiver(post_delete, sender=Post)  # 지운 포스트의 태그들은 post_count가 줄어든다
+def bump_tag_index_version(sender, **kwargs):
+    bump_tag_version()  # 태그 자동완성 인덱스를 다음 요청에서 다시 만든다 (blog/tags.py)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def bump_tag_index_version_on_tags(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_tag_version()
+
+
+@receiver(post_save, sender=Post)
+def schedule_related_posts(sender, instance, update_fields, **kwargs):
+    if update_fields is None or {'category', 'category_id'} & set(update_fields):
+        related.schedule_update([instance.pk])  # 카테고리가 바뀌었을 수 있다
+
+
+@receiver(pre_delete, sender=Post)
+def remember_related_referrers(sender, instance, **kwargs):
+    related.remember_referrers(instance)
+
+
+@receiver(post_delete, sender=Post)
+def schedule_related_referrers(sender, instance, **kwargs):
+    related.schedule_referrers(instance)  # 빈자리를 채우도록 다시 계산한다
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def schedule_related_posts_on_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            related.schedule_update([instance.pk])
+        elif pk_set:  # 태그 쪽에서 post_set.add(...)/remove(...)를 한 경우
+            related.schedule_update(sorted(pk_set))
+
+
+@receiver(post_migrate)
+def restore_fts_triggers(sender, using, **kwargs):
+    # 마이그레이션으로 blog_post 테이블이 다시 만들어지면 검색 인덱스 트리거도 사라지므로 다시 만든다
+    if sender.name == 'blog':
+        ensure_fts_triggers(connections[using])
+
+
+# 새 DB 연결마다 WAL, busy_timeout 등 SQLite PRAGMA를 적용한다
+connection_created.connect(configure_sqlite, dispatch_uid='blog.configure_sqlite')
@@ -0,0 +1,66 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.sitemaps import Sitemap, views
+from django.db.models import Max
+from django.views.decorators.http import condition
+from .models import Post, Category, Tag
+from .page_cache import cache_feed
+from .conditional import feed_etag, feed_last_modified
+from . import feed_scopes
+
+# /sitemap.xml은 섹션별 사이트맵 파일 목록(sitemap index)이고, 각 섹션은 limit개씩 나뉜다
+# (/sitemap-posts.xml?p=2). 포스트가 많아도 파일 하나가 커지지 않고, 바뀐 내용이 있는 파일만 캐시에서 다시 만든다
+# (파일마다 피드 버전 범위가 따로 있다, blog/feed_scopes.py).
+
+
+class PostSitemap(Sitemap):
+    changefreq = 'weekly'
+
+    @property
+    def limit(self):
+        return getattr(settings, 'BLOG_SITEMAP_LIMIT', 5000)
+
+    def items(self):
+        return Post.objects.only('pk', 'updated_at').order_by('pk')
+
+    def lastmod(self, item):
+        return item.updated_at
+
+
+class CategorySitemap(Sitemap):
+    changefreq = 'daily'
+
+    def items(self):
+        return Category.objects.filter(post_count__gt=0).annotate(last=Max('post__updated_at')).order_by('pk')
+
+    def lastmod(self, item):
+        return item.last
+
+
+class TagSitemap(CategorySitemap):
+    def items(self):
+        return Tag.objects.filter(post_count__gt=0).annotate(last=Max('post__updated_at')).order_by('pk')
+
+
+SITEMAPS = {
+    'posts': PostSitemap,
+    'categories': CategorySitemap,
+    'tags': TagSitemap,
+}
+
+
+def _cached(view, scopes):
+    @wraps(view)
+    def without_last_modified(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        # sitemap 뷰는 naive datetime(USE_TZ = False)을 UTC로 보고 Last-Modified를 만든다. 피드 버전의 시각을 대신 쓴다
+        del response['Last-Modified']
+        return response
+    return condition(
+        etag_func=feed_etag(scopes), last_modified_func=feed_last_modified(scopes),
+    )(cache_feed(scopes)(without_last_modified))
+
+
+sitemap_index = _cached(views.index, feed_scopes.sitemap_index_scopes)
+sitemap_section = _cached(views.sitemap, feed_scopes.sitemap_section_scopes)
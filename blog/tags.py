@@ -0,0 +1,161 @@
+import heapq
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection
+from django.utils.text import slugify
+from .models import Tag
+from .page_cache import get_tag_version
+
+# 태그 자동완성 (/blog/tag_autocomplete/?q=).
+# 모든 태그를 프로세스 메모리에 소문자 이름 순으로 정렬해 두고 이분 탐색으로 접두어 구간을 찾는다.
+# 짧은 접두어는 구간이 넓으므로 TOP_PREFIX_LENGTH 글자까지는 post_count 상위 목록을 미리 만들어 둔다.
+# 태그나 post_count가 바뀌면 tag 버전(blog/page_cache.py)이 바뀌고, 다음 요청이 백그라운드에서 인덱스를 다시 만든다.
+AUTOCOMPLETE_LIMIT = 10
+TOP_PREFIX_LENGTH = 3
+
+
+def parse_tags(tags_str):
+    """'python; 장고, web' 같은 입력을 중복 없는 태그 이름 목록으로 바꾼다."""
+    names = []
+    for name in (tags_str or '').replace(',', ';').split(';'):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def resolve_tags(names):
+    """이름에 해당하는 Tag들을 돌려준다. 없는 태그는 slug와 함께 한 번에 만든다."""
+    names = list(dict.fromkeys(names))
+    if not names:
+        return []
+    tags = {t.name: t for t in Tag.objects.filter(name__in=names)}
+    missing = [name for name in names if name not in tags]
+    if missing:
+        slugs = {name: slugify(name, allow_unicode=True) for name in missing}
+        taken = set(Tag.objects.filter(slug__in=slugs.values()).values_list('slug', flat=True))
+        new_tags = []
+        for name in missing:
+            slug = base = slugs[name]
+            n = 2
+            while slug in taken:  # 'Python'과 'python'처럼 slug가 겹치는 경우
+                slug = f'{base}-{n}'
+                n += 1
+            taken.add(slug)
+            new_tags.append(Tag(name=name, slug=slug))
+        # 동시에 같은 태그를 만드는 요청이 있어도 실패하지 않도록 충돌은 무시하고 다시 읽어온다
+        Tag.objects.bulk_create(new_tags, ignore_conflicts=True)
+        tags.update({t.name: t for t in Tag.objects.filter(name__in=missing)})
+    return [tags[name] for name in names if name in tags]
+
+
+def sync_tags(post, names):
+    """post의 태그를 names와 같게 맞춘다. 바뀐 태그만 M2M 테이블에 추가/삭제한다.
+
+    스크립트에서도 쓸 수 있다: sync_tags(post, ['python', 'django'])
+    """
+    wanted = {t.pk: t for t in resolve_tags(names)}
+    current = set(post.tags.values_list('pk', flat=True))
+
+    removed = current - wanted.keys()
+    if removed:
+        post.tags.remove(*removed)
+    added = [tag for pk, tag in wanted.items() if pk not in current]
+    if added:
+        post.tags.add(*added)
+
+
+class TagIndex:
+    """접두어로 태그를 찾아 post_count가 큰 순서로 돌려준다. 만든 뒤에는 읽기만 하므로 스레드끼리 함께 써도 된다."""
+
+    def __init__(self, rows, limit=AUTOCOMPLETE_LIMIT):
+        # rows: (name, slug, post_count)
+        rows = sorted(rows, key=lambda row: (row[0].casefold(), -row[2]))
+        self.keys = [name.casefold() for name, _, _ in rows]
+        self.rows = rows
+        self.limit = limit
+        # 접두어: post_count가 큰 순서로 limit개의 행 번호
+        self.top = {}
+        by_count = sorted(range(len(rows)), key=lambda i: (-rows[i][2], self.keys[i]))
+        for i in by_count:
+            key = self.keys[i]
+            for length in range(1, min(len(key), TOP_PREFIX_LENGTH) + 1):
+                top = self.top.setdefault(key[:length], [])
+                if len(top) < limit:
+                    top.append(i)
+
+    @classmethod
+    def build(cls):
+        return cls(Tag.objects.values_list('name', 'slug', 'post_count').iterator(chunk_size=5000))
+
+    def search(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        key = prefix.strip().casefold()
+        if not key:
+            return []
+        limit = min(limit, self.limit)
+        if len(key) <= TOP_PREFIX_LENGTH:
+            found = self.top.get(key, [])[:limit]
+        else:
+            lo = bisect_left(self.keys, key)
+            hi = bisect_left(self.keys, key + '\U0010ffff', lo)
+            found = heapq.nsmallest(limit, range(lo, hi), key=lambda i: (-self.rows[i][2], self.keys[i]))
+        return [self.rows[i] for i in found]
+
+
+_index_lock = threading.Lock()
+_index = None  # (버전, TagIndex)
+_rebuilding = None  # 다시 만들고 있는 버전
+
+
+def _rebuild_index(version):
+    global _index, _rebuilding
+    try:
+        index = TagIndex.build()
+        with _index_lock:
+            _index = (version, index)
+    finally:
+        with _index_lock:
+            _rebuilding = None
+
+
+def _rebuild_in_thread(version):
+    try:
+        _rebuild_index(version)
+    finally:
+        connection.close()  # 이 스레드에서 연 DB 연결
+
+
+def _start_rebuild(version):
+    threading.Thread(target=_rebuild_in_thread, args=(version,), daemon=True).start()
+
+
+def get_tag_index():
+    """지금 쓸 TagIndex. 버전이 바뀌었으면 예전 인덱스를 그대로 돌려주고 백그라운드 스레드 하나가 새로 만든다.
+
+    인덱스를 만드는 동안(태그 수십만 개면 수백 ms) 입력할 때마다 오는 요청이 기다리지 않게 하기 위함이다.
+    프로세스에 인덱스가 아직 없을 때와 settings.BLOG_TAG_INDEX_BACKGROUND가 False일 때만 요청 안에서 만든다.
+    """
+    global _index, _rebuilding
+    version = get_tag_version()
+    index = _index
+    if index is not None and index[0] == version:
+        return index[1]
+    if index is None or not getattr(settings, 'BLOG_TAG_INDEX_BACKGROUND', True):
+        with _index_lock:  # 여러 요청이 동시에 인덱스를 만들지 않도록 한다
+            if _index is None or _index[0] != version:
+                _index = (version, TagIndex.build())
+            return _index[1]
+    with _index_lock:
+        start = _rebuilding is None
+        if start:
+            _rebuilding = version
+    if start:
+        _start_rebuild(version)
+    return index[1]
+
+
+def autocomplete_tags(prefix, limit=AUTOCOMPLETE_LIMIT):
+    """prefix로 시작하는 태그를 (name, slug, post_count) 목록으로 돌려준다. 대소문자는 구분하지 않는다."""
+    return get_tag_index().search(prefix, limit)
@@ -0,0 +1,16 @@
+from .models import Post
+from . import related
+
+# blog.jobs.enqueue()로 등록해서 run_worker가 실행하는 작업들. 인자는 JSON으로 저장되므로 pk를 넘긴다
+
+
+def render_head_image_variants(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return  # 그 사이에 삭제된 포스트
+    if post.head_image_variants.get('source') != (post.head_image.name or None):
+        post.update_head_image_variants()
+
+
+def update_related_posts(post_id):
+    related.update_related_posts(post_id)
@@ -1,12 +1,52 @@
-from django.test import TestCase, Client
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import quote
+from asgiref.sync import sync_to_async
+from io import BytesIO, StringIO
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.conf import settings
+from django.utils import timezone
+from django.test import TestCase, Client, override_settings
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from bs4 import BeautifulSoup
+from blogcraft_django import metrics
+from blogcraft_django.minify import minify_html
+from django.templatetags.static import static
 from django.contrib.auth.models import User  # User모델을 사용하기 위함
-from .models import Post, Category, Tag, Comment
+from .models import Post, Category, Tag, Comment, Job
+from .sidebar import get_sidebar
+from .avatars import prefetch_avatars
+from .search import search_post_ids
+from .tags import parse_tags, sync_tags
+from . import tags
+from .page_cache import page_cache_stats, get_content_version
+from .jobs import enqueue, work, prune_finished_jobs, DONE_RETENTION, FAILED_RETENTION
+from .downloads import flush_download_counts
+from .transfer import from_markdown
+from .related import get_related_posts, related_queryset, update_related_posts, RELATED_LIMIT
 # allauth.socialaccount.models.SocialApp.DoesNotExist 오류 해결용 코드
-from allauth.socialaccount.models import SocialApp
+from allauth.socialaccount.models import SocialApp, SocialAccount
 from django.contrib.sites.models import Site
 
 
+def failing_task(message):
+    raise ValueError(message)  # test_jobs에서 재시도를 확인하기 위한 작업
+
+
+# 테스트는 트랜잭션 안에서 돌아서 다른 스레드의 DB 연결에는 데이터가 보이지 않으므로 태그 인덱스를 요청 안에서 만든다
+# 실행할 때마다 빈 캐시로 시작하도록 파일 캐시 대신 메모리 캐시를 쓴다
+@override_settings(
+    BLOG_TAG_INDEX_BACKGROUND=False,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'blog-tests'}},
+)
 class TestView(TestCase):
     def setUp(self):  # setUp() 함수는 TestCase의 초기 데이터베이스 상태를 정의할 수 있다.
         # allauth.socialaccount.models.SocialApp.DoesNotExist 오류 해결용 코드
@@ -474,3 +514,890 @@ class TestView(TestCase):
         self.assertNotIn(self.post_002.title, main_area.text)
         self.assertIn(self.post_003.title, main_area.text)
         self.assertIn(post_about_python.title, main_area.text)
+
+    def test_rendered_content(self):
+        post = Post.objects.create(
+            title='마크다운 포스트',
+            content='# 제목\n\n' + ' '.join(['word'] * 60),
+            author=self.user_milan
+        )
+        self.assertIn('<h1>제목</h1>', post.content_html)
+        self.assertEqual(post.word_count, 61)
+        self.assertIn('…', post.excerpt_html)
+        self.assertNotIn(' '.join(['word'] * 60), post.excerpt_html)
+
+        # 렌더링 필드가 비어있는 예전 포스트는 render_posts 커맨드로 채운다
+        Post.objects.update(content_html='', excerpt_html='', word_count=0)
+        call_command('render_posts', batch_size=2, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertIn('<h1>제목</h1>', post.content_html)
+        self.assertEqual(post.word_count, 61)
+        self.assertEqual(Post.objects.filter(content_html='').count(), 0)
+
+    def test_sidebar_cache(self):
+        sidebar = get_sidebar()
+        counts = {c.name: c.post_count for c in sidebar['categories']}
+        self.assertEqual(counts, {'programming': 1, 'react': 1})
+        self.assertEqual(sidebar['no_category_post_count'], 1)
+
+        with self.assertNumQueries(0):  # 두 번째부터는 캐시에서 가져온다
+            get_sidebar()
+
+        # 포스트가 바뀌면 signal로 캐시가 무효화된다
+        Post.objects.create(
+            title='새 포스트',
+            content='react 포스트',
+            category=self.category_react,
+            author=self.user_milan
+        )
+        counts = {c.name: c.post_count for c in get_sidebar()['categories']}
+        self.assertEqual(counts['react'], 2)
+
+        self.post_003.delete()
+        self.assertEqual(get_sidebar()['no_category_post_count'], 0)
+
+    def test_avatar_url(self):
+        SocialAccount.objects.create(
+            user=self.user_ain, provider='google', uid='ain',
+            extra_data={'picture': 'https://example.com/ain.png'}
+        )
+        for i in range(5):
+            Comment.objects.create(post=self.post_001, author=self.user_ain, content=f'ain 댓글 {i}')
+
+        comments = list(self.post_001.comment_set.select_related('author'))
+        prefetch_avatars([c.author for c in comments])
+        with self.assertNumQueries(0):  # 미리 채워둔 아바타를 사용하므로 댓글마다 쿼리하지 않는다
+            urls = {c.author.username: c.get_avatar_url() for c in comments}
+        self.assertEqual(urls['ain'], 'https://example.com/ain.png')
+        self.assertIn('dicebear', urls['milan'])
+
+        # 소셜 계정이 바뀌면 캐시가 무효화된다
+        SocialAccount.objects.filter(user=self.user_ain).delete()
+        comment = Comment.objects.filter(author=self.user_ain).first()
+        self.assertIn('dicebear', comment.get_avatar_url())
+
+    @override_settings(BLOG_PAGE_CACHE=False)
+    def test_query_count_does_not_grow(self):
+        def count_queries(url):
+            self.client.get(url)  # 사이드바 캐시를 채운다
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            return len(ctx)
+
+        urls = [
+            '/blog/',
+            self.category_programming.get_absolute_url(),
+            self.tag_hello.get_absolute_url(),
+            self.post_001.get_absolute_url(),
+        ]
+        before = [count_queries(url) for url in urls]
+
+        for i in range(10):
+            post = Post.objects.create(
+                title=f'추가 포스트 {i}',
+                content='추가 포스트입니다.',
+                category=self.category_programming,
+                author=self.user_ain if i % 2 else self.user_milan
+            )
+            post.tags.add(self.tag_hello, self.tag_python)
+            Comment.objects.create(post=self.post_001, author=self.user_ain, content=f'댓글 {i}')
+
+        after = [count_queries(url) for url in urls]
+        self.assertEqual(before, after)
+
+    def test_search_index(self):
+        # 본문, 훅 텍스트도 검색되고 제목에 있는 경우가 더 위에 나온다
+        in_content = Post.objects.create(
+            title='장고 이야기', content='django 전문 검색을 만들어봅니다.', author=self.user_milan
+        )
+        in_title = Post.objects.create(
+            title='django 검색', hook_text='검색 기능', content='본문', author=self.user_milan
+        )
+        self.assertEqual(search_post_ids('django'), [in_title.pk, in_content.pk])
+
+        # 태그가 추가/변경/삭제되면 인덱스도 바뀐다
+        self.assertEqual(search_post_ids('python'), [self.post_003.pk])
+        self.tag_python.name = 'pythonic'
+        self.tag_python.save()
+        self.assertEqual(search_post_ids('pythonic'), [self.post_003.pk])
+        self.post_003.tags.remove(self.tag_python)
+        self.assertEqual(search_post_ids('python'), [])
+        self.post_002.tags.add(self.tag_python)
+        self.assertEqual(search_post_ids('python'), [self.post_002.pk])
+
+        # 짧은 검색어는 ORM 검색으로 대체된다
+        self.assertIn(in_content.pk, search_post_ids('장고'))
+        # 3글자 이상인 검색어가 섞여 있으면 인덱스로 찾은 후보에서만 짧은 검색어를 거른다
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(search_post_ids('장고 django'), [in_content.pk])
+        self.assertEqual(len(ctx), 1)
+        self.assertIn('blog_post_fts MATCH', ctx.captured_queries[0]['sql'])
+        self.assertEqual(search_post_ids('django 검색'), [in_title.pk, in_content.pk])
+        self.assertEqual(search_post_ids('django 1%'), [])
+
+        for i in range(6):
+            Post.objects.create(title=f'django 포스트 {i}', content='내용', author=self.user_milan)
+        response = self.client.get('/blog/search/django/')
+        soup = BeautifulSoup(response.content, 'html.parser')
+        main_area = soup.find('div', id='main-area')
+        self.assertIn('Search: django (8)', main_area.text)
+        self.assertEqual(len(main_area.find_all('div', class_='card')), 5)
+        response = self.client.get('/blog/search/django/?page=2')
+        soup = BeautifulSoup(response.content, 'html.parser')
+        self.assertEqual(len(soup.find('div', id='main-area').find_all('div', class_='card')), 3)
+
+    def test_keyset_pagination(self):
+        for i in range(9):
+            Post.objects.create(title=f'추가 포스트 {i}', content='내용', author=self.user_milan)
+        all_pks = list(Post.objects.order_by('-pk').values_list('pk', flat=True))  # 12개
+
+        def card_pks(response):
+            soup = BeautifulSoup(response.content, 'html.parser')
+            cards = soup.find('div', id='post-cards').find_all('div', class_='card')
+            return [int(card.attrs['id'].split('-')[1]) for card in cards], soup
+
+        seen = []
+        url = '/blog/'
+        while url:
+            response = self.client.get(url)
+            pks, soup = card_pks(response)
+            seen += pks
+            older = soup.find('a', id='older-link')
+            url = '/blog/' + older.attrs['href'] if older else None
+        self.assertEqual(seen, all_pks)
+
+        # 이전(Newer) 커서로 돌아가면 같은 페이지가 나온다
+        response = self.client.get(f'/blog/?after={all_pks[4]}')
+        pks, soup = card_pks(response)
+        self.assertEqual(pks, all_pks[5:10])
+        newer = soup.find('a', string='←Newer')
+        pks, _ = card_pks(self.client.get('/blog/' + newer.attrs['href']))
+        self.assertEqual(pks, all_pks[0:5])
+
+        # 무한 스크롤용 JSON
+        data = self.client.get(f'/blog/cards/?after={all_pks[4]}').json()
+        self.assertIn(f'id="post-{all_pks[5]}"', data['html'])
+        self.assertEqual(data['next_cursor'], all_pks[9])
+        data = self.client.get(f'/blog/cards/?after={all_pks[9]}').json()
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(self.client.get('/blog/cards/?after=abc').status_code, 404)
+
+    def test_sync_tags(self):
+        self.assertEqual(parse_tags(' python; 새 태그, python ;; '), ['python', '새 태그'])
+
+        names = [f'tag {i}' for i in range(15)]
+        with CaptureQueriesContext(connection) as ctx:
+            sync_tags(self.post_002, names)
+        self.assertLessEqual(len(ctx), 15)  # 태그 개수와 상관없이 일정한 쿼리 수 (관련 포스트 작업 등록, 피드 범위 포함)
+        self.assertEqual(self.post_002.tags.count(), 15)
+        self.assertEqual(Tag.objects.get(name='tag 3').slug, 'tag-3')
+
+        # 바뀐 부분만 through 테이블에 반영된다
+        through = Post.tags.through
+        kept = through.objects.get(post=self.post_002, tag__name='tag 0').pk
+        sync_tags(self.post_002, ['tag 0', 'python', 'Python'])
+        self.assertEqual(
+            sorted(self.post_002.tags.values_list('name', flat=True)), ['Python', 'python', 'tag 0']
+        )
+        self.assertTrue(through.objects.filter(pk=kept).exists())
+        self.assertEqual(Tag.objects.get(name='Python').slug, 'python-2')
+
+        sync_tags(self.post_002, [])
+        self.assertEqual(self.post_002.tags.count(), 0)
+
+    def test_tag_autocomplete(self):
+        def names(q, **params):
+            response = self.client.get('/blog/tag_autocomplete/', {'q': q, **params})
+            self.assertEqual(response.status_code, 200)
+            return [tag['name'] for tag in response.json()['results']]
+
+        sync_tags(self.post_001, ['hello', 'Pytest'])
+        sync_tags(self.post_002, ['Pytest', 'pyramid'])
+        Tag.objects.create(name='pylint', slug='pylint')
+        # 대소문자 없이 접두어로 찾고, 많이 쓰인 태그가 먼저 나온다
+        self.assertEqual(names('PY'), ['Pytest', 'pyramid', 'python', 'pylint'])
+        self.assertEqual(names('py', limit=2), ['Pytest', 'pyramid'])
+        self.assertEqual(names('pyth'), ['python'])  # 미리 만든 목록보다 긴 접두어
+        self.assertEqual(names('파이'), ['파이썬 공부'])
+        self.assertEqual(names(''), [])
+        self.assertEqual(names('zzz'), [])
+
+        # 인덱스가 만들어진 뒤에는 DB를 읽지 않는다
+        with CaptureQueriesContext(connection) as ctx:
+            names('py')
+        self.assertEqual(len(ctx), 0)
+
+        # 태그가 바뀌면 다음 요청에서 인덱스를 다시 만든다
+        sync_tags(self.post_003, ['pylint'])
+        self.assertEqual(names('py'), ['Pytest', 'pylint', 'pyramid', 'python'])
+        self.post_002.delete()
+        self.assertEqual(names('py'), ['pylint', 'Pytest', 'pyramid', 'python'])
+
+        # 백그라운드에서 다시 만드는 동안은 예전 인덱스로 바로 답한다
+        with override_settings(BLOG_TAG_INDEX_BACKGROUND=True), mock.patch('blog.tags._start_rebuild') as start:
+            Tag.objects.create(name='pyflakes', slug='pyflakes')
+            self.assertEqual(names('py'), ['pylint', 'Pytest', 'pyramid', 'python'])
+            names('py')
+            start.assert_called_once()  # 다시 만드는 스레드는 하나만
+            tags._rebuild_index(*start.call_args.args)
+            self.assertEqual(names('py'), ['pylint', 'Pytest', 'pyflakes', 'pyramid', 'python'])
+
+    def test_page_cache(self):
+        url = self.post_001.get_absolute_url()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        hits = page_cache_stats()['hits']
+        with self.assertNumQueries(1):  # ETag/Last-Modified 계산용 쿼리 하나만 실행된다
+            response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertEqual(page_cache_stats()['hits'], hits + 1)
+
+        # 댓글이 달리면 내용 버전이 바뀌어 새로 렌더링된다
+        Comment.objects.create(post=self.post_001, author=self.user_ain, content='새 댓글입니다.')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertIn('새 댓글입니다.', response.content.decode())
+
+        # 로그인한 사용자는 캐시를 거치지 않는다 (CSRF 토큰이 들어간 댓글 폼)
+        self.client.login(username='milan', password='1234Arabbit')
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertEqual(self.client.get('/blog/cache_stats/').json()['hits'], hits + 1)
+
+    def test_conditional_get(self):
+        url = self.post_001.get_absolute_url()
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        # 댓글이 삭제되면 ETag가 바뀐다
+        self.comment_001.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        for list_url in ['/blog/', self.category_programming.get_absolute_url(), self.tag_hello.get_absolute_url()]:
+            response = self.client.get(list_url)
+            response = self.client.get(
+                list_url,
+                HTTP_IF_NONE_MATCH=response['ETag'],
+            )
+            self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/blog/')
+        last_modified = response['Last-Modified']
+        self.assertEqual(self.client.get('/blog/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        etag = response['ETag']
+        self.post_002.delete()
+        self.assertEqual(self.client.get('/blog/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_head_image_variants(self):
+        def upload(name, size):
+            buffer = BytesIO()
+            Image.new('RGB', size, 'red').save(buffer, 'JPEG')
+            return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            post = Post.objects.create(
+                title='사진 포스트', content='사진', author=self.user_milan,
+                head_image=upload('photo.jpg', (1600, 900)),
+            )
+            self.assertEqual(post.head_image_variants, {})  # 이미지 변환은 백그라운드 작업으로 넘어간다
+            response = self.client.get(post.get_absolute_url())
+            self.assertIsNone(BeautifulSoup(response.content, 'html.parser').find('source', type='image/webp'))
+            etag = response['ETag']
+            call_command('run_worker', burst=True, stdout=StringIO())
+            # 작업이 끝나면 캐시된 페이지 대신 축소본이 들어간 페이지를 새로 만들고 ETag도 바뀐다
+            response = self.client.get(post.get_absolute_url(), headers={'if-none-match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['X-Page-Cache'], 'HIT')
+            self.assertNotEqual(response['ETag'], etag)
+            self.assertIsNotNone(BeautifulSoup(response.content, 'html.parser').find('source', type='image/webp'))
+            post.refresh_from_db()
+            data = post.head_image_variants
+            self.assertEqual((data['width'], data['height']), (1600, 900))
+            self.assertEqual(
+                sorted((v['width'], v['format']) for v in data['variants']),
+                [(480, 'jpeg'), (480, 'webp'), (800, 'jpeg'), (800, 'webp'), (1200, 'jpeg'), (1200, 'webp')]
+            )
+            for v in data['variants']:
+                with Image.open(os.path.join(media_root, v['path'])) as image:
+                    self.assertEqual(image.size, (v['width'], v['height']))
+
+            response = self.client.get('/blog/')
+            soup = BeautifulSoup(response.content, 'html.parser')
+            img = soup.find('div', id=f'post-{post.pk}').find('img')
+            self.assertIn('480w', img.attrs['srcset'])
+            self.assertEqual(img.attrs['width'], '1600')
+            webp = soup.find('div', id=f'post-{post.pk}').find('source', type='image/webp')
+            self.assertIn('.webp 1200w', webp.attrs['srcset'])
+
+            # 예전에 올린 이미지는 커맨드로 다시 만든다
+            Post.objects.filter(pk=post.pk).update(head_image_variants={})
+            call_command('render_image_variants', processes=2, stdout=StringIO())
+            post.refresh_from_db()
+            self.assertEqual(len(post.head_image_variants['variants']), 6)
+
+    def test_related_posts(self):
+        def related(post):
+            return [p.pk for p in get_related_posts(post.pk)]
+
+        post_004 = Post.objects.create(
+            title='네번째 포스트입니다.', content='python hello', category=self.category_programming,
+            author=self.user_milan,
+        )
+        sync_tags(post_004, ['python', 'hello'])
+        response = self.client.get(post_004.get_absolute_url())
+        self.assertNotContains(response, 'id="related-posts"')  # 계산은 백그라운드 작업으로 넘어간다
+        etag = response['ETag']
+
+        work(burst=True)
+        # 목록이 계산되면 ETag가 바뀌어서 브라우저가 예전 페이지를 계속 쓰지 않는다
+        response = self.client.get(post_004.get_absolute_url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        # 태그를 공유하고 같은 카테고리인 post_001이 먼저, 태그만 공유하는 post_003이 다음
+        self.assertEqual(related(post_004), [self.post_001.pk, self.post_003.pk])
+        # 이웃 포스트의 목록에도 post_004가 들어간다
+        self.assertIn(post_004.pk, related(self.post_001))
+        self.assertIn(post_004.pk, related(self.post_003))
+        self.assertEqual(related(self.post_002), [])
+
+        with CaptureQueriesContext(connection) as ctx:
+            related(post_004)
+        self.assertEqual(len(ctx), 1)
+
+        # 캐시된 상세 페이지도 바뀐다
+        response = self.client.get(post_004.get_absolute_url())
+        soup = BeautifulSoup(response.content, 'html.parser')
+        links = [a.attrs['href'] for a in soup.find('div', id='related-posts').find_all('a')]
+        self.assertEqual(links, [self.post_001.get_absolute_url(), self.post_003.get_absolute_url()])
+
+        # 태그를 빼면 그 포스트와 이웃의 목록만 다시 계산한다
+        sync_tags(post_004, ['hello'])
+        work(burst=True)
+        self.assertEqual(related(post_004), [self.post_001.pk])
+        self.assertNotIn(post_004.pk, related(self.post_003))
+
+        # 같은 카테고리의 포스트로 빈자리를 채운다
+        self.post_002.category = self.category_programming
+        self.post_002.save()
+        work(burst=True)
+        self.assertEqual(related(self.post_002), [post_004.pk, self.post_001.pk])
+
+        # 전체 다시 계산한 결과와 부분 계산한 결과가 같다
+        before = {post.pk: related(post) for post in Post.objects.all()}
+        call_command('rebuild_related', stdout=StringIO())
+        self.assertEqual({post.pk: related(post) for post in Post.objects.all()}, before)
+
+        # 목록에 있던 포스트를 지우면 빈자리를 다시 채운다
+        for i in range(RELATED_LIMIT + 1):
+            post = Post.objects.create(title=f'hello {i}', content='hello', author=self.user_ain)
+            sync_tags(post, ['hello'])
+        work(burst=True)
+        self.assertEqual(len(related(self.post_001)), RELATED_LIMIT)
+        Post.objects.get(pk=related(self.post_001)[0]).delete()
+        work(burst=True)
+        after_delete = {post.pk: related(post) for post in Post.objects.all()}
+        self.assertEqual(len(after_delete[self.post_001.pk]), RELATED_LIMIT)
+        call_command('rebuild_related', stdout=StringIO())
+        self.assertEqual({post.pk: related(post) for post in Post.objects.all()}, after_delete)
+
+        # 다시 계산해도 목록이 그대로면 페이지 캐시를 버리지 않는다
+        version = get_content_version()
+        update_related_posts(self.post_001.pk)
+        self.assertEqual(get_content_version(), version)
+
+    def test_jobs(self):
+        work(burst=True)  # setUp에서 등록된 관련 포스트 작업을 먼저 처리한다
+        job = enqueue(failing_task, 'boom')
+        self.assertEqual(enqueue(failing_task, 'boom').pk, job.pk)  # 같은 대기 작업은 한 번만 등록
+        self.assertNotEqual(enqueue(failing_task, 'other').pk, job.pk)
+        Job.objects.filter(name='blog.tests.failing_task', args=['other']).delete()
+
+        self.assertEqual(work(burst=True), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn('ValueError: boom', job.last_error)
+        self.assertGreater(job.run_at, job.created_at)  # backoff 후에 다시 실행된다
+
+        # 재시도를 기다리는 중에 같은 작업을 등록해도 새로 만들지 않는다
+        self.assertEqual(enqueue(failing_task, 'boom').pk, job.pk)
+        self.assertEqual(work(burst=True), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_at=job.created_at, attempts=job.max_attempts - 1)
+        self.assertEqual(work(burst=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+        # 보관 기간이 지난 done, failed 작업은 지운다. 대기 중인 작업은 남긴다
+        pending = enqueue(failing_task, 'later')
+        done = Job.objects.filter(status=Job.DONE)
+        self.assertTrue(done.exists())
+        done_count = done.update(updated_at=timezone.now() - DONE_RETENTION - timedelta(minutes=1))
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - DONE_RETENTION - timedelta(minutes=1))
+        self.assertEqual(prune_finished_jobs(), done_count)
+        self.assertFalse(done.exists())
+        self.assertTrue(Job.objects.filter(pk=job.pk).exists())  # 실패한 작업은 더 오래 둔다
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - FAILED_RETENTION - timedelta(minutes=1))
+        self.assertEqual(prune_finished_jobs(), 1)
+        self.assertEqual(list(Job.objects.values_list('pk', flat=True)), [pending.pk])
+
+    def test_sqlite_pragmas(self):
+        if connection.vendor != 'sqlite' or not settings.BLOG_SQLITE_PRAGMAS.get('busy_timeout'):
+            self.skipTest('튜닝된 SQLite 프로필에서만 확인한다')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.BLOG_SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], settings.BLOG_SQLITE_PRAGMAS['cache_size'])
+
+    def test_query_plans_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN은 SQLite 전용')
+
+        def plan(queryset):
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                return [row[3] for row in cursor.fetchall()]
+
+        hot_queries = {
+            'post list': Post.objects.for_list().filter(pk__lt=100).order_by('-pk')[:6],
+            'category page': Post.objects.for_list().filter(category=self.category_programming).order_by('-pk'),
+            'no category': Post.objects.for_list().filter(category=None).order_by('-pk'),
+            'no category count': Post.objects.filter(category=None).values('pk'),
+            'tag page': Post.objects.for_list().filter(tags=self.tag_hello),
+            'comments': Comment.objects.filter(post=self.post_001, pk__lt=100).order_by('-pk')[:21],
+            'comments oldest': Comment.objects.filter(post=self.post_001, pk__gt=1).order_by('pk')[:21],
+            'tag by name': Tag.objects.filter(name='hello'),
+            'related posts': related_queryset(self.post_001.pk),
+        }
+        for name, queryset in hot_queries.items():
+            with self.subTest(name):
+                steps = plan(queryset)
+                self.assertFalse([step for step in steps if step.startswith('SCAN')], steps)
+        for name in ('comments', 'comments oldest', 'related posts'):
+            self.assertNotIn('USE TEMP B-TREE FOR ORDER BY', plan(hot_queries[name]))
+
+    def test_counters(self):
+        def counts():
+            return (
+                list(Category.objects.order_by('pk').values_list('post_count', flat=True)),
+                list(Tag.objects.order_by('pk').values_list('post_count', flat=True)),
+                list(Post.objects.order_by('pk').values_list('comment_count', flat=True)),
+            )
+
+        # programming, react / 파이썬 공부, python, hello / post_001~003
+        self.assertEqual(counts(), ([1, 1], [1, 1, 1], [1, 0, 0]))
+
+        stale = Post.objects.get(pk=self.post_001.pk)  # 댓글이 달리기 전에 읽은 인스턴스
+        Comment.objects.create(post=self.post_001, author=self.user_ain, content='두번째 댓글')
+        stale.title = '제목 수정'
+        stale.save()  # 예전 comment_count로 덮어쓰지 않는다
+        self.assertEqual(counts()[2], [2, 0, 0])
+        self.comment_001.delete()
+        self.assertEqual(counts()[2], [1, 0, 0])
+
+        self.post_002.category = self.category_programming
+        self.post_002.save()
+        self.assertEqual(counts()[0], [2, 0])
+
+        self.post_003.tags.remove(self.tag_python, self.tag_hello)  # hello는 연결되어 있지 않다
+        self.tag_hello.post_set.add(self.post_002, self.post_003)
+        self.assertEqual(counts()[1], [1, 0, 3])
+        self.tag_hello.post_set.clear()
+        self.assertEqual(counts()[1], [1, 0, 0])
+
+        self.post_003.delete()
+        self.post_001.delete()
+        self.assertEqual(counts(), ([1, 0], [0, 0, 0], [0]))
+
+        # 신호 없이 바뀐 값은 recount로 바로잡는다
+        Category.objects.update(post_count=7)
+        Post.objects.update(comment_count=3)
+        out = StringIO()
+        call_command('recount', stdout=out)
+        self.assertIn('Fixed: 2 categories, 0 tags, 1 posts', out.getvalue())
+        self.assertEqual(counts(), ([1, 0], [0, 0, 0], [0]))
+
+    @override_settings(BLOG_PAGE_CACHE=False)
+    def test_comment_pagination(self):
+        def detail_queries():
+            self.client.get(self.post_003.get_absolute_url())  # 사이드바, 아바타 캐시를 채운다
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(self.post_003.get_absolute_url())
+            return len(ctx)
+
+        Comment.objects.create(post=self.post_003, author=self.user_ain, content='댓글 0')
+        before = detail_queries()
+        Comment.objects.bulk_create([
+            Comment(post=self.post_003, author=self.user_ain, content=f'댓글 {i}') for i in range(1, 45)
+        ])
+        Post.objects.filter(pk=self.post_003.pk).update(comment_count=45)  # bulk_create는 신호가 없다
+        self.assertEqual(detail_queries(), before)  # 댓글 수와 상관없이 쿼리 수가 같다
+
+        pks = list(self.post_003.comment_set.order_by('-pk').values_list('pk', flat=True))
+        response = self.client.get(self.post_003.get_absolute_url())
+        soup = BeautifulSoup(response.content, 'html.parser')
+        shown = [int(div['id'].split('-')[1]) for div in soup.find('div', id='comments').find_all('div', class_='media')]
+        self.assertEqual(shown, pks[:20])  # 첫 페이지는 최신 댓글 20개
+        self.assertIn('45 comments', soup.find('div', id='comment-order').text)
+        cursor = soup.find('button', id='load-more-comments')['data-cursor']
+
+        while cursor:
+            data = self.client.get(f'{self.post_003.get_absolute_url()}comments/?after={cursor}').json()
+            shown += [int(div['id'].split('-')[1])
+                      for div in BeautifulSoup(data['html'], 'html.parser').find_all('div', class_='media')]
+            cursor = data['next_cursor']
+        self.assertEqual(shown, pks)
+
+        response = self.client.get(self.post_003.get_absolute_url() + '?comments=oldest')
+        soup = BeautifulSoup(response.content, 'html.parser')
+        shown = [int(div['id'].split('-')[1]) for div in soup.find('div', id='comments').find_all('div', class_='media')]
+        self.assertEqual(shown, pks[::-1][:20])
+        cursor = soup.find('button', id='load-more-comments')['data-cursor']
+        data = self.client.get(f'{self.post_003.get_absolute_url()}comments/?order=oldest&after={cursor}').json()
+        self.assertIn(f'id="comment-{pks[::-1][20]}"', data['html'])
+
+    def test_seed_and_bench(self):
+        call_command('seed_blog', posts=30, comments=2, tags=10, categories=3, users=3, batch_size=10, stdout=StringIO())
+        self.assertEqual(Post.objects.filter(author__username__startswith='seed_').count(), 30)
+        self.assertTrue(Comment.objects.filter(post__author__username__startswith='seed_').exists())
+        self.assertEqual(  # bulk_create로 만든 데이터도 카운터가 맞아야 한다
+            sum(Category.objects.values_list('post_count', flat=True)),
+            Post.objects.exclude(category=None).count(),
+        )
+
+        with tempfile.TemporaryDirectory() as tmp, override_settings(MEDIA_ROOT=tmp):
+            result_path = os.path.join(tmp, 'bench.json')
+            call_command('bench_blog', repeat=1, warmup=1, output=result_path)
+            with open(result_path) as f:
+                results = json.load(f)
+            self.assertIn('post_detail', results['endpoints'])
+            self.assertEqual(results['endpoints']['post_detail']['status'], 200)
+            self.assertEqual(results['endpoints']['new_comment']['status'], 302)
+            self.assertEqual(results['endpoints']['download_attachment']['bytes'], 1024 * 1024)
+
+            # 쿼리 수가 늘어나면 baseline 비교에서 실패한다
+            results['endpoints']['post_list']['queries'] = 0
+            baseline_path = os.path.join(tmp, 'baseline.json')
+            with open(baseline_path, 'w') as f:
+                json.dump(results, f)
+            with self.assertRaisesMessage(CommandError, 'post_list: queries 0 ->'):
+                call_command('bench_blog', repeat=1, warmup=1, output=result_path, baseline=baseline_path)
+        self.assertFalse(Post.objects.filter(title='bench_blog').exists())  # 측정용 포스트는 지운다
+
+    def test_download_attachment(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            flush_download_counts()  # 다른 테스트에서 모아 둔 수를 비운다
+            data = bytes(range(256)) * 40
+            self.post_001.file_upload = SimpleUploadedFile('보고서 final.csv', data)
+            self.post_001.save()
+            url = f'/blog/{self.post_001.pk}/download/'
+
+            response = self.client.get(f'/blog/{self.post_001.pk}/')
+            self.assertIn(url, response.content.decode())
+
+            response = self.client.get(url, headers={'accept-encoding': 'gzip'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), data)
+            self.assertFalse(response.has_header('Content-Encoding'))  # 파일은 gzip으로 다시 압축하지 않는다
+            self.assertEqual(response['Content-Length'], str(len(data)))
+            self.assertEqual(response['Accept-Ranges'], 'bytes')
+            self.assertEqual(response['Content-Type'], 'text/csv')
+            self.assertIn("attachment; filename*=utf-8''", response['Content-Disposition'])
+
+            # 이어받기
+            response = self.client.get(url, headers={'range': 'bytes=100-199'})
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(data)}')
+            self.assertEqual(b''.join(response.streaming_content), data[100:200])
+            response = self.client.get(url, headers={'range': 'bytes=-10'})
+            self.assertEqual(b''.join(response.streaming_content), data[-10:])
+            response = self.client.get(url, headers={'range': f'bytes={len(data)}-'})
+            self.assertEqual(response.status_code, 416)
+            # 파일이 바뀌었으면(If-Range가 다르면) 전체를 보낸다
+            response = self.client.get(url, headers={'range': 'bytes=100-199', 'if-range': '"old"'})
+            self.assertEqual(response.status_code, 200)
+            # DB에는 있지만 파일이 없으면 500이 아니라 404
+            Post.objects.filter(pk=self.post_002.pk).update(file_upload='blog/files/missing.csv')
+            response = self.client.get(f'/blog/{self.post_002.pk}/download/', headers={'range': 'bytes=0-9'})
+            self.assertEqual(response.status_code, 404)
+
+            # 다운로드 수는 모아 두었다가 한 번에 더한다. 이어받기 요청은 세지 않는다
+            flush_download_counts()
+            self.assertEqual(Post.objects.get(pk=self.post_001.pk).download_count, 2)
+
+            with override_settings(BLOG_SENDFILE='nginx'):
+                response = self.client.get(url)
+            self.assertEqual(response['X-Accel-Redirect'], quote('/protected-media/' + self.post_001.file_upload.name))
+            self.assertEqual(response.content, b'')
+            flush_download_counts()
+            self.assertEqual(Post.objects.get(pk=self.post_001.pk).download_count, 3)
+
+            self.assertEqual(self.client.get(f'/blog/{self.post_002.pk}/download/').status_code, 404)
+
+    def test_feeds_and_sitemap(self):
+        response = self.client.get('/blog/rss/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/rss+xml; charset=utf-8')
+        soup = BeautifulSoup(response.content, 'html.parser')
+        self.assertEqual([item.title.text for item in soup.find_all('item')],
+                         [self.post_003.title, self.post_002.title, self.post_001.title])
+        self.assertIn('<p>hello world! we are the world</p>', soup.find_all('item')[2].description.text)
+        self.assertIn(f'/blog/{self.post_001.pk}/', response.content.decode())
+
+        soup = BeautifulSoup(self.client.get('/blog/category/programming/atom/').content, 'html.parser')
+        self.assertEqual([entry.title.text for entry in soup.find_all('entry')], [self.post_001.title])
+        soup = BeautifulSoup(self.client.get('/blog/tag/python/rss/').content, 'html.parser')
+        self.assertEqual([item.title.text for item in soup.find_all('item')], [self.post_003.title])
+        self.assertEqual(self.client.get('/blog/tag/no-such-tag/rss/').status_code, 404)
+
+        # 캐시와 조건부 GET. 댓글로는 다시 만들지 않고 포스트가 바뀌면 다시 만든다
+        response = self.client.get('/blog/rss/')
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/blog/rss/', headers={'if-none-match': response['ETag']}).status_code, 304)
+        Comment.objects.create(post=self.post_002, author=self.user_ain, content='피드와 상관없는 댓글')
+        self.assertEqual(self.client.get('/blog/rss/')['X-Page-Cache'], 'HIT')
+        self.client.get('/blog/category/react/atom/')
+        self.post_002.title = '바뀐 제목'
+        self.post_002.save()
+        response = self.client.get('/blog/rss/', headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('바뀐 제목', response.content.decode())
+        self.assertEqual(self.client.get('/blog/category/react/atom/')['X-Page-Cache'], 'MISS')
+        # 바뀐 포스트가 나오지 않는 피드는 그대로 쓴다
+        self.assertEqual(self.client.get('/blog/category/programming/atom/')['X-Page-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/blog/tag/python/rss/')['X-Page-Cache'], 'HIT')
+        # 카운터만 저장하면 피드 버전을 바꾸지 않는다
+        Post.objects.get(pk=self.post_002.pk).save(update_fields=['comment_count'])
+        self.assertEqual(self.client.get('/blog/rss/')['X-Page-Cache'], 'HIT')
+        # 카테고리를 옮기면 예전 카테고리와 새 카테고리의 피드가 모두 바뀐다
+        self.post_002.category = self.category_programming
+        self.post_002.save()
+        response = self.client.get('/blog/category/programming/atom/')
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertIn('바뀐 제목', response.content.decode())
+        self.assertEqual(self.client.get('/blog/category/react/atom/')['X-Page-Cache'], 'MISS')
+        # 태그를 붙이면 그 태그의 피드가 바뀐다
+        self.post_002.tags.add(self.tag_python)
+        self.assertIn('바뀐 제목', self.client.get('/blog/tag/python/rss/').content.decode())
+
+        # 사이트맵은 BLOG_SITEMAP_LIMIT개씩 나뉜다
+        with override_settings(BLOG_SITEMAP_LIMIT=1):
+            index = self.client.get('/sitemap.xml').content.decode()
+            self.assertIn('/sitemap-posts.xml?p=3</loc>', index)
+            self.assertNotIn('/sitemap-posts.xml?p=4</loc>', index)
+            self.assertIn('/sitemap-tags.xml</loc>', index)
+            response = self.client.get('/sitemap-posts.xml?p=2')
+            self.assertIn(f'/blog/{self.post_002.pk}/</loc>', response.content.decode())
+            self.assertEqual(self.client.get('/sitemap-posts.xml?p=4').status_code, 404)
+            # 포스트를 고치면 그 포스트가 있는 사이트맵 파일만 다시 만든다
+            self.client.get('/sitemap-posts.xml?p=1')
+            self.post_002.save()
+            self.assertEqual(self.client.get('/sitemap-posts.xml?p=1')['X-Page-Cache'], 'HIT')
+            self.assertEqual(self.client.get('/sitemap-posts.xml?p=2')['X-Page-Cache'], 'MISS')
+            self.assertEqual(self.client.get('/sitemap.xml')['X-Page-Cache'], 'MISS')
+        categories = self.client.get('/sitemap-categories.xml').content.decode()
+        self.assertIn('/blog/category/programming/</loc>', categories)
+        self.assertIn('<lastmod>', categories)
+
+    def test_json_api(self):
+        response = self.client.get('/api/posts/?limit=2')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([post['id'] for post in data['results']], [self.post_003.pk, self.post_002.pk])
+        self.assertEqual(data['results'][0]['tags'], [
+            {'id': tag.pk, 'name': tag.name, 'slug': tag.slug} for tag in (self.tag_python_kor, self.tag_python)
+        ])
+        self.assertEqual(data['results'][1]['category']['slug'], 'react')
+        data = self.client.get(f"/api/posts/?limit=2&after={data['next_cursor']}").json()
+        self.assertEqual([post['id'] for post in data['results']], [self.post_001.pk])
+        self.assertIsNone(data['next_cursor'])
+
+        # 필드 선택: 필요한 컬럼만 읽고 태그를 요청하지 않으면 prefetch 쿼리도 하지 않는다
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get('/api/posts/?fields=id,content_html&category=programming').json()
+        self.assertEqual(data['results'], [{'id': self.post_001.pk, 'content_html': self.post_001.content_html}])
+        self.assertEqual(len([q for q in ctx.captured_queries if 'blog_tag' in q['sql']]), 0)
+        response = self.client.get('/api/posts/?fields=id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+        # id 목록 조회는 요청한 순서대로, 없는 id는 missing으로
+        data = self.client.get(f'/api/posts/?fields=id&ids={self.post_002.pk},{self.post_001.pk},999').json()
+        self.assertEqual(data, {'results': [{'id': self.post_002.pk}, {'id': self.post_001.pk}], 'missing': [999]})
+
+        data = self.client.get(f'/api/posts/{self.post_001.pk}/').json()
+        self.assertEqual(data['content_html'], self.post_001.content_html)
+        self.assertEqual(data['comment_count'], 1)
+        data = self.client.get(f'/api/comments/?post={self.post_001.pk}').json()
+        self.assertEqual(data['results'][0]['content'], self.comment_001.content)
+        for url, param in [('/api/comments/?post=abc', 'post'), ('/api/comments/export/?post=abc', 'post'),
+                           ('/api/posts/?after=abc', 'after'), ('/api/posts/?before=1.5', 'before')]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400)  # 잘못된 필터 값, 커서는 500, 404가 아니라 400
+            self.assertIn(param, response.json()['error'])
+        self.assertEqual(self.client.get('/api/tags/').json()['results'][0]['post_count'], 1)
+        self.assertEqual(self.client.get('/api/users/').status_code, 404)
+
+        response = self.client.get('/api/posts/export/?fields=id,title')
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data, [{'id': post.pk, 'title': post.title} for post in (self.post_001, self.post_002, self.post_003)])
+
+    def test_export_import(self):
+        Post.objects.filter(pk=self.post_002.pk).update(head_image='blog/images/2024/01/01/head.jpg')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'blog.jsonl')
+            call_command('export_blog', path, chunk_size=2, stdout=StringIO())
+            with open(path, encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual([r['id'] for r in records], [self.post_001.pk, self.post_002.pk, self.post_003.pk])
+            self.assertEqual(records[0]['tags'], ['hello'])
+            self.assertEqual(records[0]['comments'][0]['content'], self.comment_001.content)
+
+            # --resume은 체크포인트 뒤에 쓰다 만 줄을 버리고 이어서 쓴다
+            with open(path, encoding='utf-8') as f:
+                first_line = f.readline()
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(first_line + '{"id": 2, "tit')
+            with open(path + '.checkpoint', 'w') as f:
+                json.dump({'last_pk': self.post_001.pk, 'exported': 1, 'offset': len(first_line.encode())}, f)
+            call_command('export_blog', path, resume=True, stdout=StringIO())
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual([json.loads(line) for line in f], records)
+
+            markdown_dir = os.path.join(tmp, 'markdown')
+            call_command('export_blog', markdown_dir, format='markdown', stdout=StringIO())
+            with open(os.path.join(markdown_dir, f'{self.post_003.pk:08d}.md'), encoding='utf-8') as f:
+                self.assertEqual(from_markdown(f.read()), records[2])
+
+            # 가져오기: 배치마다 bulk_create하므로 포스트 수와 상관없이 쿼리 수가 일정하다
+            with CaptureQueriesContext(connection) as ctx:
+                call_command('import_blog', path, batch_size=10, stdout=StringIO())
+            self.assertLess(len(ctx), 30)
+            imported = Post.objects.exclude(pk__in=[r['id'] for r in records]).order_by('pk')
+            self.assertEqual([p.title for p in imported], [r['title'] for r in records])
+            copy = imported[2]
+            self.assertEqual(sorted(copy.tags.values_list('name', flat=True)), ['python', '파이썬 공부'])
+            self.assertEqual(copy.created_at, self.post_003.created_at)  # 원래 작성 시각을 그대로 넣는다
+            self.assertEqual(copy.content_html, self.post_003.content_html)
+            self.assertEqual(imported[0].comment_set.get().created_at, self.comment_001.created_at)
+            self.assertEqual(imported[0].comment_count, 1)
+            self.assertEqual(Category.objects.get(slug='programming').post_count, 2)
+            self.assertEqual(Tag.objects.get(slug='python').post_count, 2)
+            # 머리 이미지가 있는 포스트만 이미지 변환 작업이 등록된다
+            render_jobs = Job.objects.filter(name='blog.tasks.render_head_image_variants', status=Job.PENDING)
+            self.assertTrue(render_jobs.filter(args=[imported[1].pk]).exists())
+            self.assertFalse(render_jobs.filter(args=[imported[0].pk]).exists())
+
+            # --resume은 체크포인트에 기록된 레코드 다음부터 가져온다
+            with open(markdown_dir + '.checkpoint.import', 'w') as f:
+                json.dump({'position': 2, 'imported': 2}, f)
+            call_command('import_blog', markdown_dir, resume=True, stdout=StringIO())
+            self.assertEqual(Post.objects.filter(title=self.post_003.title).count(), 3)
+            self.assertEqual(Post.objects.filter(title=self.post_001.title).count(), 2)
+
+    def test_request_metrics(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(BLOG_METRICS_DIR=tmp, BLOG_PAGE_CACHE=False):
+            response = self.client.get('/blog/')
+            timing = response['Server-Timing']
+            self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+            self.assertRegex(timing, r'tpl;dur=[\d.]+')
+            self.assertIn(f'size;desc="{len(response.content)} bytes"', timing)
+
+            # 다른 워커 프로세스가 쓴 값도 합쳐서 보여준다
+            view = metrics.view_name(response.wsgi_request)
+            own = metrics._totals['blog_request_duration_seconds'][view]['count']
+            buckets = len(metrics.HISTOGRAMS['blog_request_duration_seconds'][1])
+            other = {'blog_request_duration_seconds': {view: {'buckets': [5] * buckets, 'sum': 1.5, 'count': 5}}}
+            with open(os.path.join(tmp, '999999999.json'), 'w') as f:
+                json.dump(other, f)
+
+            response = self.client.get('/metrics')
+            self.assertEqual(response.status_code, 200)
+            text = response.content.decode()
+            self.assertIn('# TYPE blog_request_queries histogram', text)
+            self.assertIn(f'blog_request_duration_seconds_count{{view="{view}"}} {own + 5}', text)
+            self.assertIn(f'blog_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {own + 5}', text)
+            # 끝난 프로세스의 파일은 dead.json에 합쳐지고 값은 그대로 남는다
+            self.assertFalse(os.path.exists(os.path.join(tmp, '999999999.json')))
+            self.assertTrue(os.path.exists(os.path.join(tmp, 'dead.json')))
+            text = self.client.get('/metrics').content.decode()
+            self.assertIn(f'blog_request_duration_seconds_count{{view="{view}"}} {own + 5}', text)
+
+            # 허용한 주소에서만 볼 수 있다
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 403)
+            with override_settings(BLOG_METRICS_ALLOWED_IPS=['10.0.0.0/8']):
+                self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+    def test_static_pipeline(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(STATIC_ROOT=tmp):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            url = static('blog/bootstrap/bootstrap.min.css')
+            self.assertRegex(url, r'^/static/blog/bootstrap/bootstrap\.min\.[0-9a-f]{12}\.css$')
+            self.assertTrue(os.path.exists(os.path.join(tmp, url[len('/static/'):] + '.gz')))
+            with open(os.path.join(tmp, url[len('/static/'):]), 'rb') as f:
+                original = f.read()
+
+            # 해시가 들어간 이름은 미리 만든 gzip 파일을 immutable로 돌려준다
+            response = self.client.get(url, headers={'accept-encoding': 'gzip, deflate'})
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), original)
+
+            response = self.client.get(url)
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertEqual(b''.join(response.streaming_content), original)
+
+            response = self.client.get('/static/blog/bootstrap/bootstrap.min.css')
+            self.assertNotIn('immutable', response['Cache-Control'])
+
+        # HTML은 공백을 줄이고 gzip으로 압축한다. <pre> 안은 그대로 둔다
+        self.assertEqual(minify_html('<div>\n    <p>a  b</p>\n\n<!-- x --><pre>  1\n  2</pre>\n</div>'),
+                         '<div>\n<p>a b</p>\n<pre>  1\n  2</pre>\n</div>\n')
+        response = self.client.get('/blog/', headers={'accept-encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        html = gzip.decompress(response.content).decode()
+        self.assertNotIn('\n    ', html.split('<script')[0])
+
+        # 페이지 캐시에는 줄인 HTML을 저장하므로 캐시에서 꺼낸 응답은 다시 줄이지 않는다
+        self.client.get('/blog/')
+        with mock.patch('blogcraft_django.minify.minify_html') as minify:
+            response = self.client.get('/blog/')
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        minify.assert_not_called()
+        self.assertNotIn('\n    ', response.content.decode().split('<script')[0])
+
+
+@override_settings(ROOT_URLCONF='blogcraft_django.asgi_urls')
+class TestAsyncView(TestView):
+    # TestView의 테스트를 ASGI용 URL 설정(읽기 페이지는 async 뷰)으로 한 번 더 실행한다
+
+    @override_settings(BLOG_PAGE_CACHE=False)
+    async def test_concurrent_requests_interleave(self):
+        events = []
+
+        async def slow_sidebar():
+            # 느린 I/O를 기다리는 동안 다른 요청이 진행될 수 있어야 한다
+            events.append('start')
+            await asyncio.sleep(0.1)
+            events.append('end')
+            return await sync_to_async(get_sidebar)()
+
+        urls = ['/blog/', '/blog/1/', '/blog/category/programming/', '/blog/tag/hello/', '/blog/search/world/']
+        with mock.patch('blog.async_views.aget_sidebar', slow_sidebar):
+            responses = await asyncio.gather(*[self.async_client.get(url) for url in urls])
+
+        self.assertEqual([r.status_code for r in responses], [200] * len(urls))
+        # 요청이 하나씩 처리되었다면 start, end, start, end, ... 순서가 된다
+        self.assertEqual(events, ['start'] * len(urls) + ['end'] * len(urls))
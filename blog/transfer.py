@@ -0,0 +1,210 @@
+import json
+import os
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils.dateparse import parse_datetime
+from .jobs import enqueue
+from .models import Post, Category, Comment
+from .tasks import render_head_image_variants
+from .tags import resolve_tags
+
+# manage.py export_blog / import_blog이 쓰는 형식과 변환 함수들.
+# 포스트 하나가 레코드 하나이고, 카테고리, 태그, 댓글을 레코드 안에 함께 넣는다 (레코드끼리 서로 참조하지 않는다).
+#   jsonl:    파일 하나에 한 줄에 레코드 하나
+#   markdown: 디렉터리에 포스트마다 <id>.md 파일 하나. 본문 위의 front matter는 한 줄에 "키: JSON 값" (YAML로도 읽힌다)
+# 첨부 파일과 이미지는 MEDIA_ROOT 기준 경로만 옮긴다. 파일은 따로 복사한다.
+
+JSONL, MARKDOWN = 'jsonl', 'markdown'
+FRONT_MATTER = '---'
+
+
+def export_queryset():
+    comments = Comment.objects.select_related('author').order_by('pk')
+    return (
+        Post.objects.select_related('author', 'category')
+        .prefetch_related('tags', Prefetch('comment_set', queryset=comments))
+        .order_by('pk')
+    )
+
+
+def _name(user):
+    return user.username if user else None
+
+
+def to_record(post):
+    return {
+        'id': post.pk,
+        'title': post.title,
+        'hook_text': post.hook_text,
+        'author': _name(post.author),
+        'category': {'name': post.category.name, 'slug': post.category.slug} if post.category else None,
+        'tags': [tag.name for tag in post.tags.all()],
+        'created_at': post.created_at.isoformat(),
+        'updated_at': post.updated_at.isoformat(),
+        'head_image': post.head_image.name or None,
+        'file_upload': post.file_upload.name or None,
+        'comments': [
+            {
+                'author': _name(comment.author),
+                'content': comment.content,
+                'created_at': comment.created_at.isoformat(),
+                'modified_at': comment.modified_at.isoformat(),
+            }
+            for comment in post.comment_set.all()
+        ],
+        'content': post.content,
+    }
+
+
+def to_markdown(record):
+    lines = [FRONT_MATTER]
+    for key, value in record.items():
+        if key != 'content':
+            lines.append(f'{key}: {json.dumps(value, ensure_ascii=False)}')
+    lines += [FRONT_MATTER, record['content']]
+    return '\n'.join(lines)
+
+
+def from_markdown(text):
+    head, separator, content = text.partition(f'\n{FRONT_MATTER}\n')
+    if not head.startswith(FRONT_MATTER) or not separator:
+        raise ValueError('front matter(---)가 없습니다.')
+    record = {}
+    for line in head[len(FRONT_MATTER):].strip().splitlines():
+        key, _, value = line.partition(':')
+        record[key.strip()] = json.loads(value)
+    record['content'] = content
+    return record
+
+
+def detect_format(path):
+    return MARKDOWN if os.path.isdir(path) else JSONL
+
+
+def read_records(path, fmt, skip=0):
+    """(위치, 레코드)를 하나씩 읽는다. 위치는 1부터 세며 체크포인트에 저장해서 skip으로 넘긴다."""
+    if fmt == JSONL:
+        with open(path, encoding='utf-8') as f:
+            for position, line in enumerate(f, 1):
+                if position > skip and line.strip():
+                    yield position, json.loads(line)
+    else:
+        names = sorted(name for name in os.listdir(path) if name.endswith('.md'))
+        for position, name in enumerate(names, 1):
+            if position > skip:
+                with open(os.path.join(path, name), encoding='utf-8') as f:
+                    yield position, from_markdown(f.read())
+
+
+def load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, data):
+    # 중간에 끊겨도 체크포인트 파일이 깨지지 않도록 임시 파일을 바꿔치기한다
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def keep_timestamps(*models):
+    """auto_now/auto_now_add 필드를 잠시 꺼서 bulk_create가 레코드의 원래 시각을 그대로 저장하게 한다.
+
+    필드 설정을 프로세스 전체에서 바꾸므로 import_blog처럼 요청을 처리하지 않는 명령에서만 쓴다.
+    """
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Importer:
+    """레코드를 배치 단위로 bulk_create한다. 사용자, 카테고리, 태그는 한 번 찾은 것을 기억해서 배치마다 다시 조회하지 않는다."""
+
+    def __init__(self):
+        self.users = {}
+        self.categories = {}
+        self.tags = {}
+
+    def _resolve_users(self, names):
+        missing = [name for name in names if name and name not in self.users]
+        if missing:
+            User.objects.bulk_create([User(username=name, password='!') for name in missing], ignore_conflicts=True)
+            self.users.update(User.objects.filter(username__in=missing).in_bulk(field_name='username'))
+
+    def _resolve_categories(self, categories):
+        missing = {c['slug']: c for c in categories if c and c['slug'] not in self.categories}
+        if missing:
+            Category.objects.bulk_create(
+                [Category(name=c['name'], slug=c['slug']) for c in missing.values()], ignore_conflicts=True,
+            )
+            self.categories.update(Category.objects.filter(slug__in=missing).in_bulk(field_name='slug'))
+
+    def _resolve_tags(self, names):
+        missing = [name for name in dict.fromkeys(names) if name not in self.tags]
+        if missing:
+            self.tags.update({tag.name: tag for tag in resolve_tags(missing)})
+
+    @transaction.atomic
+    def import_batch(self, records):
+        """레코드들을 한 트랜잭션으로 넣는다. 만든 포스트 수를 돌려준다."""
+        self._resolve_users({r['author'] for r in records} | {c['author'] for r in records for c in r['comments']})
+        self._resolve_categories([r['category'] for r in records])
+        self._resolve_tags([name for r in records for name in r['tags']])
+
+        posts = []
+        for record in records:
+            post = Post(
+                title=record['title'],
+                hook_text=record.get('hook_text', ''),
+                content=record['content'],
+                author=self.users.get(record['author']),
+                category=self.categories[record['category']['slug']] if record['category'] else None,
+                head_image=record.get('head_image') or '',
+                file_upload=record.get('file_upload') or '',
+                comment_count=len(record['comments']),
+                created_at=parse_datetime(record['created_at']),
+                updated_at=parse_datetime(record['updated_at']),
+            )
+            post.render_content()
+            posts.append(post)
+        with keep_timestamps(Post, Comment):
+            Post.objects.bulk_create(posts)
+            Comment.objects.bulk_create([
+                Comment(
+                    post=post, author=self.users[data['author']], content=data['content'],
+                    created_at=parse_datetime(data['created_at']), modified_at=parse_datetime(data['modified_at']),
+                )
+                for post, record in zip(posts, records)
+                for data in record['comments']
+            ])
+
+        Through = Post.tags.through
+        Through.objects.bulk_create([
+            Through(post_id=post.pk, tag_id=self.tags[name].pk)
+            for post, record in zip(posts, records)
+            for name in dict.fromkeys(record['tags'])
+            if name in self.tags
+        ])
+        # bulk_create는 Post.save를 거치지 않으므로 머리 이미지 변환 작업을 직접 등록한다 (배치와 같은 트랜잭션)
+        for post in posts:
+            if post.head_image:
+                enqueue(render_head_image_variants, post.pk)
+        return len(posts)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, feeds
 
 urlpatterns = [
     path('search/<str:q>/', views.PostSearch.as_view()),  # 대문자로 작성하느 것은 CBV로 만들겠다는 의미.
@@ -7,9 +7,20 @@ urlpatterns = [
     path('update_comment/<int:pk>/', views.CommentUpdate.as_view()),
     path('update_post/<int:pk>/', views.PostUpdate.as_view()),
     path('create_post/', views.PostCreate.as_view()),
+    path('tag_autocomplete/', views.tag_autocomplete),
     path('tag/<str:slug>/', views.tag_page),
+    path('tag/<str:slug>/rss/', feeds.tag_rss),
+    path('tag/<str:slug>/atom/', feeds.tag_atom),
     path('category/<str:slug>/', views.category_page),
+    path('category/<str:slug>/rss/', feeds.category_rss),
+    path('category/<str:slug>/atom/', feeds.category_atom),
+    path('rss/', feeds.latest_rss),
+    path('atom/', feeds.latest_atom),
     path('<int:pk>/new_comment/', views.new_comment),
+    path('<int:pk>/comments/', views.post_comments),
+    path('<int:pk>/download/', views.download_attachment),
+    path('cards/', views.post_cards),
+    path('cache_stats/', views.cache_stats),
     path('', views.PostList.as_view()),
     path('<int:pk>/', views.PostDetail.as_view()),
 ]
@@ -3,37 +3,51 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.shortcuts import get_object_or_404
 from .models import Post, Category, Tag, Comment
 from .forms import CommentForm
+from .sidebar import get_sidebar
+from .comments import comment_order, get_comment_page
+from .search import search_posts
+from .pagination import KeysetPage, keyset_paginate
+from .tags import parse_tags, sync_tags, autocomplete_tags, AUTOCOMPLETE_LIMIT
+from .page_cache import cache_anonymous_page, page_cache_stats
+from .downloads import serve_attachment
+from .related import get_related_posts
+from .conditional import post_detail_etag, post_detail_last_modified, post_list_etag, post_list_last_modified
 from django.shortcuts import render, redirect
+from django.http import Http404, JsonResponse
+from django.template.loader import render_to_string
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
-from django.utils.text import slugify
-from django.db.models import Q
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition, require_safe
 
 
 # category_page함수는 FBV로 만들었다.
+@condition(etag_func=post_list_etag, last_modified_func=post_list_last_modified('category'))
+@cache_anonymous_page
 def category_page(request, slug):
     if slug == 'no_category':
         category = '미분류'
-        post_list = Post.objects.filter(category=None)
+        post_list = Post.objects.for_list().filter(category=None)
     else:
         category = Category.objects.get(slug=slug)
-        post_list = Post.objects.filter(category=category)
+        post_list = Post.objects.for_list().filter(category=category)
 
     return render(
         request,
         'blog/post_list.html',
         {
             'post_list': post_list,
-            'categories': Category.objects.all(),
-            'no_category_post_count': Post.objects.filter(category=None).count(),
             'category': category,
+            **get_sidebar(),
         }
     )
 
 
+@condition(etag_func=post_list_etag, last_modified_func=post_list_last_modified('tag'))
+@cache_anonymous_page
 def tag_page(request, slug):
     tag = Tag.objects.get(slug=slug)
-    post_list = tag.post_set.all()
+    post_list = Post.objects.for_list().filter(tags=tag)
 
     return render(
         request,
@@ -41,12 +55,54 @@ def tag_page(request, slug):
         {
             'post_list': post_list,
             'tag': tag,
-            'categories': Category.objects.all(),
-            'no_category_post_count': Post.objects.filter(category=None).count(),
+            **get_sidebar(),
         }
     )
 
 
+def post_cards(request):
+    # 무한 스크롤용: after 커서 다음의 포스트 카드 HTML과 다음 커서를 JSON으로 돌려준다
+    page = keyset_paginate(Post.objects.for_list(), PostList.paginate_by, after=request.GET.get('after'))
+    html = render_to_string('blog/post_cards.html', {'post_list': page.object_list}, request=request)
+    return JsonResponse({'html': html, 'next_cursor': page.next_cursor})
+
+
+def post_comments(request, pk):
+    # 댓글 "더 보기"용: after 커서 다음의 댓글 HTML과 다음 커서를 JSON으로 돌려준다
+    page = get_comment_page(pk, comment_order(request.GET.get('order')), after=request.GET.get('after'))
+    html = render_to_string('blog/comments.html', {'comments': page}, request=request)
+    return JsonResponse({'html': html, 'next_cursor': page.next_cursor})
+
+
+@require_safe
+def download_attachment(request, pk):
+    # 첨부 파일을 Range 요청을 지원하며 보낸다. settings.BLOG_SENDFILE이 있으면 프록시가 보낸다
+    post = get_object_or_404(Post.objects.only('pk', 'file_upload'), pk=pk)
+    if not post.file_upload:
+        raise Http404
+    return serve_attachment(request, post)
+
+
+@require_safe
+def tag_autocomplete(request):
+    # 태그 입력 자동완성: q로 시작하는 태그를 많이 쓰인 순서로 돌려준다 (blog/tags.py의 메모리 인덱스)
+    try:
+        limit = min(max(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), 1), AUTOCOMPLETE_LIMIT)
+    except ValueError:
+        limit = AUTOCOMPLETE_LIMIT
+    results = [
+        {'name': name, 'slug': slug, 'post_count': post_count}
+        for name, slug, post_count in autocomplete_tags(request.GET.get('q', ''), limit)
+    ]
+    return JsonResponse({'results': results}, json_dumps_params={'ensure_ascii': False})
+
+
+def cache_stats(request):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return JsonResponse(page_cache_stats())
+
+
 def new_comment(request, pk):
     if request.user.is_authenticated:  # 로그인이 되어있지 않다면 댓글 폼 안보임
         post = get_object_or_404(Post, pk=pk)  # pk를 인자로 받고, 댓글을 달 post를 쿼리로 날려 가져옴. 없을 경우 404 에러
@@ -111,21 +167,7 @@ class PostUpdate(LoginRequiredMixin, UpdateView):
 
     def form_valid(self, form):
         response = super(PostUpdate, self).form_valid(form)
-        self.object.tags.clear()
-
-        tags_str = self.request.POST.get('tags_str')
-        if tags_str:
-            tags_str = tags_str.strip()
-            tags_str = tags_str.replace(',', ';')
-            tags_list = tags_str.split(';')
-
-            for t in tags_list:
-                t = t.strip()
-                tag, is_tag_created = Tag.objects.get_or_create(name=t)
-                if is_tag_created:
-                    tag.slug = slugify(t, allow_unicode=True)
-                    tag.save()
-                self.object.tags.add(tag)
+        sync_tags(self.object, parse_tags(self.request.POST.get('tags_str')))  # 바뀐 태그만 반영
         return response
 
 
@@ -145,60 +187,71 @@ class PostCreate(LoginRequiredMixin, UserPassesTestMixin, CreateView):
 
             tags_str = self.request.POST.get('tags_str')  # POST 방식으로 전달된 정보 중 name='tags_str'인 input값을 가져와라 
             if tags_str:
-                tags_str = tags_str.strip()
-
-                tags_str = tags_str.replace(',', ';')
-                tags_list = tags_str.split(';')
-
-                for t in tags_list:
-                    t = t.strip()
-                    tag, is_tag_created = Tag.objects.get_or_create(name=t)
-                    if is_tag_created:
-                        tag.slug = slugify(t, allow_unicode=True)
-                        tag.save()
-                    self.object.tags.add(tag)  # self.object는 이번에 새로 만들어지는 post를 의미함
-
-                return response
+                sync_tags(self.object, parse_tags(tags_str))  # self.object는 이번에 새로 만들어지는 post를 의미함
+            return response
         else:
             return redirect('/blog/')
 
 
+@method_decorator([
+    condition(etag_func=post_list_etag, last_modified_func=post_list_last_modified()),
+    cache_anonymous_page,
+], name='dispatch')
 class PostList(ListView):
     model = Post
+    queryset = Post.objects.for_list()
     ordering = '-pk'  # pk 값이 큰 순서대로. 측 최신의 글 순서대로 보여달라는 의미, -는 역순의 의미
     paginate_by = 5
+    keyset_pagination = True  # ?after=, ?before= 커서로 페이지를 나눈다. ?page= 링크는 그대로 동작
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset_pagination or 'page' in self.request.GET:
+            return super(PostList, self).paginate_queryset(queryset, page_size)
+        page = keyset_paginate(
+            queryset, page_size,
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return None, page, page.object_list, page.has_next() or page.has_previous()
 
     def get_context_data(self, **kwargs):
         context = super(PostList, self).get_context_data()
-        context['categories'] = Category.objects.all()
-        context['no_category_post_count'] = Post.objects.filter(category=None).count()
+        context.update(get_sidebar())
+        context['keyset'] = isinstance(context['page_obj'], KeysetPage)
         return context
 
 
+@method_decorator([
+    condition(etag_func=post_detail_etag, last_modified_func=post_detail_last_modified),
+    cache_anonymous_page,
+], name='dispatch')
 class PostDetail(DetailView):
     model = Post
+    queryset = Post.objects.for_detail()
 
     def get_context_data(self, **kwargs):
         context = super(PostDetail, self).get_context_data()
-        context['categories'] = Category.objects.all()
-        context['no_category_post_count'] = Post.objects.filter(category=None).count()
+        context.update(get_sidebar())
         context['comment_form'] = CommentForm
+
+        # 댓글은 첫 페이지만 그리고 나머지는 post_comments()로 받아온다
+        order = comment_order(self.request.GET.get('comments'))
+        context['comments'] = get_comment_page(self.object.pk, order)
+        context['comment_order'] = order
+        context['related_posts'] = get_related_posts(self.object.pk)  # 미리 계산해 둔 목록 (blog/related.py)
         return context
 
 
 class PostSearch(PostList):
-    paginate_by = None  # 검색된 결과를 한 페이지에 다 보여주도록 함
+    keyset_pagination = False  # 관련도순 정렬이라 pk 커서를 쓸 수 없다
 
-    def get_queryset(self):  # get_queryset()은 Post.objects.all()과 동일하게 model로 지정된 요소 전체를 가져오도록 함
+    def get_queryset(self):
         q = self.kwargs['q']  # URL을 통해 넘어온 검색어를 받아 q라는 변수에 저장함
-        post_list = Post.objects.filter(
-            Q(title__contains=q) | Q(tags__name__contains=q)  # 여러 쿼리를 동시에 쓴다. title이나 tag에 q의 내용을 포함
-        ).distinct()  # distinct()중복되는 요소가 있다면 한번만 가져올 것
-        return post_list
+        return search_posts(q)  # 제목, 훅 텍스트, 본문, 태그를 전문 검색 인덱스로 찾아 관련도순으로 정렬
 
     def get_context_data(self, **kwargs):
         context = super(PostSearch, self).get_context_data()
         q = self.kwargs['q']
-        context['search_info'] = f'Search: {q} ({self.get_queryset().count()})'
+        context['search_info'] = f'Search: {q} ({self.object_list.count()})'  # 검색 쿼리를 다시 실행하지 않는다
 
         return context
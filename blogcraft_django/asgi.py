@@ -12,5 +12,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogcraft_django.settings')
+os.environ.setdefault('BLOG_ASYNC_VIEWS', '1')  # 읽기 전용 페이지를 async 뷰로 (blogcraft_django/asgi_urls.py)
 
 application = get_asgi_application()
@@ -0,0 +1,13 @@
+"""
+ASGI 서버(blogcraft_django/asgi.py)로 실행할 때의 URL 설정.
+
+읽기 전용 페이지(블로그 목록, 상세, 카테고리, 태그, 검색, 랜딩)는 async 뷰가 먼저 처리하고,
+나머지 URL은 blogcraft_django/urls.py의 설정을 그대로 따른다.
+"""
+from django.urls import path, include
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('blog/', include('blog.async_urls')),
+    path('', include('single_pages.async_urls')),
+] + sync_urlpatterns
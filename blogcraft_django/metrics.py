@@ -0,0 +1,322 @@
+"""
+요청 계측(instrumentation).
+
+RequestMetricsMiddleware가 요청마다 DB 쿼리 수/시간, 템플릿 렌더링 시간, 전체 처리 시간, 응답 크기를 재서
+Server-Timing 헤더로 돌려주고, 뷰별 히스토그램에 더한다. /metrics는 그 히스토그램을 Prometheus 텍스트 형식으로 보여준다.
+
+워커 프로세스가 여러 개여도 /metrics가 전체 합계를 보여주도록, 프로세스마다 자기 누적값을
+settings.BLOG_METRICS_DIR 아래 <pid>.json 파일에 주기적으로 쓰고 /metrics에서 모든 파일을 합친다
+(prometheus_client의 multiprocess 모드와 같은 방식). 배포할 때 디렉터리를 비우면 값이 0부터 다시 쌓인다.
+끝난 프로세스의 파일은 dead.json에 합치고 지운다 (mark_process_dead). 누적값이 줄어들지 않으면서 파일 수는
+살아 있는 프로세스 수 + 1개로 유지된다. pid로 프로세스가 살아 있는지 보므로 디렉터리는 호스트(컨테이너)마다 따로 둔다.
+
+/metrics는 settings.BLOG_METRICS_ALLOWED_IPS에 있는 주소(또는 네트워크)에서 온 요청만 받는다.
+"""
+import atexit
+import fcntl
+import ipaddress
+import json
+import os
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates, Template
+
+FLUSH_INTERVAL = 1.0  # 초. 이 간격보다 자주 파일에 쓰지 않는다
+DEAD_FILE = 'dead.json'  # 끝난 프로세스들의 누적값
+LOCK_FILE = '.lock'
+
+# 이름: (설명, 버킷)
+HISTOGRAMS = {
+    'blog_request_duration_seconds': (
+        'Total time spent handling the request.',
+        [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+    ),
+    'blog_request_db_seconds': (
+        'Time spent in database queries per request.',
+        [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5],
+    ),
+    'blog_request_template_seconds': (
+        'Time spent rendering templates per request.',
+        [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1],
+    ),
+    'blog_request_queries': (
+        'Number of database queries per request.',
+        [0, 1, 2, 5, 10, 20, 50, 100],
+    ),
+    'blog_response_bytes': (
+        'Response body size in bytes.',
+        [1000, 10000, 50000, 100000, 500000, 1000000, 5000000],
+    ),
+}
+
+_current = ContextVar('blog_request_metrics', default=None)
+_lock = threading.Lock()
+_totals = {}  # {metric: {view: {'buckets': [...], 'sum': float, 'count': int}}}
+_last_flush = 0.0
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper()로 등록되어 모든 쿼리를 감싼다
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """render(), render_to_string()의 렌더링 시간을 재는 템플릿 백엔드 (settings.TEMPLATES의 BACKEND).
+
+    include, extends는 안쪽에서 처리되므로 가장 바깥 템플릿의 시간만 더해진다.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    func = getattr(match.func, 'view_class', match.func)
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def _observe(metric, view, value):
+    buckets = HISTOGRAMS[metric][1]
+    data = _totals.setdefault(metric, {}).setdefault(view, {'buckets': [0] * len(buckets), 'sum': 0, 'count': 0})
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            data['buckets'][i] += 1
+    data['sum'] += value
+    data['count'] += 1
+
+
+def _metrics_dir():
+    return getattr(settings, 'BLOG_METRICS_DIR', None) or None
+
+
+def _metrics_file(pid=None):
+    directory = _metrics_dir()
+    if not directory:
+        return None
+    return os.path.join(directory, f'{pid or os.getpid()}.json')
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(path, data):
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'  # 다른 프로세스, 같은 프로세스의 다른 스레드와 겹치지 않도록
+    with open(tmp, 'w') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _merge(into, data):
+    for metric, views in data.items():
+        for view, values in views.items():
+            merged = into.setdefault(metric, {}).setdefault(
+                view, {'buckets': [0] * len(values['buckets']), 'sum': 0, 'count': 0},
+            )
+            merged['buckets'] = [a + b for a, b in zip(merged['buckets'], values['buckets'])]
+            merged['sum'] += values['sum']
+            merged['count'] += values['count']
+    return into
+
+
+def _locked(directory, exclusive):
+    # 파일을 합치는 동안 /metrics가 두 번 세거나 빠뜨리지 않도록 디렉터리 단위로 잠근다
+    os.makedirs(directory, exist_ok=True)
+    f = open(os.path.join(directory, LOCK_FILE), 'a')
+    fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+    return f
+
+
+def mark_process_dead(pid):
+    """끝난 프로세스 pid의 누적값을 dead.json에 합치고 pid 파일을 지운다."""
+    path = _metrics_file(pid)
+    if path is None or not os.path.exists(path):
+        return
+    directory = os.path.dirname(path)
+    with _locked(directory, exclusive=True):
+        dead_path = os.path.join(directory, DEAD_FILE)
+        _write(dead_path, json.dumps(_merge(_read(dead_path), _read(path))))
+        os.remove(path)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # 다른 사용자의 프로세스
+        return True
+    return True
+
+
+@atexit.register
+def _mark_dead_at_exit():
+    # 정상 종료할 때는 마지막 값까지 쓰고 합친다. 강제로 죽은 프로세스는 /metrics에서 찾아 합친다
+    if _totals and _metrics_dir():
+        try:
+            flush(force=True)
+            mark_process_dead(os.getpid())
+        except OSError:
+            pass
+
+
+def flush(force=False):
+    """이 프로세스의 누적값을 파일에 쓴다. 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록 임시 파일을 바꿔치기한다."""
+    global _last_flush
+    path = _metrics_file()
+    now = time.monotonic()
+    if path is None or (not force and now - _last_flush < FLUSH_INTERVAL):
+        return
+    with _lock:
+        data = json.dumps(_totals)
+        _last_flush = now
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write(path, data)
+
+
+def record(request, response, metrics):
+    total = time.perf_counter() - metrics.started
+    size = 0 if response.streaming else len(response.content)
+    view = view_name(request)
+    with _lock:
+        _observe('blog_request_duration_seconds', view, total)
+        _observe('blog_request_db_seconds', view, metrics.db_time)
+        _observe('blog_request_template_seconds', view, metrics.template_time)
+        _observe('blog_request_queries', view, metrics.queries)
+        _observe('blog_response_bytes', view, size)
+    flush()
+
+    if getattr(settings, 'BLOG_SERVER_TIMING', True):
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries"',
+            f'tpl;dur={metrics.template_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+            f'size;desc="{size} bytes"',
+        ])
+
+
+class RequestMetricsMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self):
+        metrics = RequestMetrics()
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        return metrics, stack, _current.set(metrics)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, stack, token = self._start()
+        try:
+            with stack:
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        record(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics, stack, token = self._start()
+        try:
+            with stack:
+                response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        record(request, response, metrics)
+        return response
+
+
+def _merged_totals():
+    flush(force=True)
+    directory = _metrics_dir()
+    if not directory or not os.path.isdir(directory):
+        return _totals
+    pids = [int(name[:-5]) for name in os.listdir(directory) if name.endswith('.json') and name[:-5].isdigit()]
+    for pid in pids:
+        if not _is_alive(pid):
+            mark_process_dead(pid)
+    merged = {}
+    with _locked(directory, exclusive=False):
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                _merge(merged, _read(os.path.join(directory, name)))
+    return merged
+
+
+def _allowed(request):
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, 'BLOG_METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    )
+
+
+def metrics_view(request):
+    """모든 워커 프로세스의 히스토그램을 Prometheus 텍스트 형식(0.0.4)으로 돌려준다."""
+    if not _allowed(request):
+        return HttpResponseForbidden()
+    totals = _merged_totals()
+    lines = []
+    for metric, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} histogram')
+        for view, data in sorted(totals.get(metric, {}).items()):
+            for bound, count in zip(buckets, data['buckets']):
+                lines.append(f'{metric}_bucket{{view="{view}",le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{view="{view}",le="+Inf"}} {data["count"]}')
+            lines.append(f'{metric}_sum{{view="{view}"}} {data["sum"]}')
+            lines.append(f'{metric}_count{{view="{view}"}} {data["count"]}')
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
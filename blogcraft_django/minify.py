@@ -0,0 +1,64 @@
+"""
+HTML 응답 줄이기.
+
+템플릿의 들여쓰기와 빈 줄, 주석을 지운다. 공백이 의미 있는 <pre>, <textarea>, <script>, <style> 안은 건드리지 않고,
+태그 사이 공백은 한 칸(줄바꿈)으로 남겨서 inline 요소 사이 간격이 바뀌지 않게 한다.
+압축(gzip)은 바깥의 GZipMiddleware가 한다.
+"""
+import re
+
+from django.conf import settings
+from django.http import FileResponse
+from django.middleware import gzip
+from django.utils.deprecation import MiddlewareMixin
+
+PRESERVE = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2\s*>)', re.IGNORECASE | re.DOTALL)
+COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.DOTALL)  # 조건부 주석(<!--[if IE]>)은 남긴다
+LINE_BREAKS = re.compile(r'[ \t]*\n\s*')
+SPACES = re.compile(r'[ \t]{2,}')
+
+
+def minify_html(html):
+    parts = PRESERVE.split(html)
+    # split()은 [밖, 보존할 블록, 태그 이름, 밖, ...] 순서로 나눈다
+    out = []
+    for i in range(0, len(parts), 3):
+        text = COMMENT.sub('', parts[i])
+        text = LINE_BREAKS.sub('\n', text)
+        out.append(SPACES.sub(' ', text))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return ''.join(out).strip() + '\n'
+
+
+class GZipMiddleware(gzip.GZipMiddleware):
+    def process_response(self, request, response):
+        # 파일 다운로드(blog/downloads.py)는 Range 요청과 Content-Length가 원본 기준이어야 하므로 압축하지 않는다
+        if isinstance(response, FileResponse):
+            return response
+        return super().process_response(request, response)
+
+
+def minify_response(response):
+    """HTML 응답 본문을 한 번만 줄인다. 줄인 응답에는 표시를 남겨서 다시 줄이지 않는다.
+
+    페이지 캐시(blog/page_cache.py)는 저장하기 전에 이 함수를 불러서, 캐시에서 꺼낸 응답은 미들웨어가 건너뛴다.
+    """
+    if (
+        getattr(settings, 'BLOG_MINIFY_HTML', True)
+        and not getattr(response, 'minified', False)
+        and not response.streaming
+        and not response.has_header('Content-Encoding')
+        and response.get('Content-Type', '').startswith('text/html')
+    ):
+        content = minify_html(response.content.decode(response.charset))
+        response.content = content.encode(response.charset)
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+        response.minified = True
+    return response
+
+
+class HtmlMinifyMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        return minify_response(response)
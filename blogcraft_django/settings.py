@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.sitemaps',
     'django_extensions',
 
     'crispy_forms',
@@ -69,6 +71,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blogcraft_django.staticfiles.StaticFilesMiddleware',  # collectstatic 한 파일을 미리 압축한 그대로 돌려준다
+    'blogcraft_django.metrics.RequestMetricsMiddleware',  # 가장 바깥에서 전체 처리 시간을 잰다 (Server-Timing, /metrics)
+    'blogcraft_django.minify.GZipMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,13 +82,19 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',  # django ver 5부터는 필수로 요구함
+    'blogcraft_django.minify.HtmlMinifyMiddleware',  # 압축(GZipMiddleware)하기 전에 HTML 공백을 줄인다
 ]
 
-ROOT_URLCONF = 'blogcraft_django.urls'
+# ASGI 서버로 실행하면(asgi.py) 읽기 전용 페이지를 async 뷰로 처리한다
+BLOG_ASYNC_VIEWS = bool(int(os.environ.get('BLOG_ASYNC_VIEWS', 0)))
+if BLOG_ASYNC_VIEWS:
+    ROOT_URLCONF = 'blogcraft_django.asgi_urls'
+else:
+    ROOT_URLCONF = 'blogcraft_django.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'blogcraft_django.metrics.TimedDjangoTemplates',  # DjangoTemplates + 렌더링 시간 측정
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -102,11 +113,60 @@ WSGI_APPLICATION = 'blogcraft_django.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# BLOG_DB_PROFILE로 DB 설정을 고른다
+#   sqlite       : WAL 등 PRAGMA를 켠 SQLite (기본값, blog/db.py)
+#   sqlite-basic : 아무 옵션 없는 SQLite (벤치마크 비교용)
+#   postgres     : 커넥션 풀을 쓰는 PostgreSQL (psycopg 3 필요, SQL_* 환경변수)
+BLOG_DB_PROFILE = os.environ.get('BLOG_DB_PROFILE', 'sqlite')
+
+if BLOG_DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('SQL_DATABASE', 'blogcraft'),
+            'USER': os.environ.get('SQL_USER', 'postgres'),
+            'PASSWORD': os.environ.get('SQL_PASSWORD', ''),
+            'HOST': os.environ.get('SQL_HOST', 'localhost'),
+            'PORT': os.environ.get('SQL_PORT', '5432'),
+            # 풀이 연결을 관리하므로 CONN_MAX_AGE는 0이어야 한다
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('SQL_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.environ.get('SQL_POOL_MAX_SIZE', 10)),
+                    'timeout': 10,
+                },
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
+    if BLOG_DB_PROFILE == 'sqlite':
+        DATABASES['default'].update({
+            # WSGI에서는 요청마다 새로 연결하지 않고 재사용하되, 끊어진 연결은 요청 시작 때 확인해서 버린다.
+            # ASGI(BLOG_ASYNC_VIEWS)에서는 sync_to_async 스레드의 연결이 요청이 끝나도 반환되지 않으므로 0으로 둔다
+            'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 0 if BLOG_ASYNC_VIEWS else 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # 쓰기 트랜잭션이 처음부터 쓰기 잠금을 잡아서 읽기→쓰기 승격 중에 생기는 "database is locked"를 피한다
+                'transaction_mode': 'IMMEDIATE',
+            },
+        })
+
+# SQLite 연결이 만들어질 때 실행할 PRAGMA (blog/db.py)
+BLOG_SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',  # 읽기가 쓰기를 기다리지 않는다
+    'synchronous': 'NORMAL',  # WAL에서는 NORMAL로도 DB가 깨지지 않는다
+    'busy_timeout': 5000,  # 잠겨 있으면 바로 실패하지 않고 최대 5초 기다린다 (ms)
+    'cache_size': -20000,  # 약 20MB 페이지 캐시 (음수는 KiB 단위)
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+} if BLOG_DB_PROFILE == 'sqlite' else {
+    'journal_mode': 'DELETE',  # WAL 설정은 DB 파일에 남으므로 sqlite-basic에서는 SQLite 기본값으로 되돌린다
 }
 
 # Password validation
@@ -142,6 +202,13 @@ USE_TZ = False
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# collectstatic이 파일 이름에 내용 해시를 넣고 .gz/.br 파일을 만든다 (blogcraft_django/staticfiles.py)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'blogcraft_django.staticfiles.CompressedManifestStaticFilesStorage'},
+}
 
 # Image Upload
 MEDIA_URL = '/media/'
@@ -165,3 +232,51 @@ SITE_ID = 1
 ACCOUNT_EMAIL_REQUIRED = True
 ACCOUNT_EMAIL_VERIFICATION = 'none'
 LOGIN_REDIRECT_URL = '/blog/'
+
+# 캐시. 페이지 캐시와 그 버전 키(blog/page_cache.py), 사이드바, 아바타가 들어간다.
+# web, asgi, worker와 manage.py 명령은 서로 다른 프로세스이므로, 한 프로세스에서 바꾼 버전이 다른 프로세스에도 보이도록
+# 모두 같은 캐시를 써야 한다.
+#   'file':   BLOG_CACHE_DIR 아래 파일 (기본). docker-compose의 서비스들은 같은 디렉터리를 마운트하므로 공유된다
+#   'db':     DB 테이블 (먼저 manage.py createcachetable). 서버가 여러 대라면 이쪽을 쓴다
+#   'locmem': 프로세스마다 따로인 메모리. 프로세스 하나로 띄우는 개발 환경에서만 쓴다
+BLOG_CACHE = os.environ.get('BLOG_CACHE', 'file')
+BLOG_CACHE_DIR = os.environ.get('BLOG_CACHE_DIR', BASE_DIR / '.cache')
+if BLOG_CACHE == 'locmem':
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+elif BLOG_CACHE == 'db':
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'blog_cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }}
+else:
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BLOG_CACHE_DIR,
+        'OPTIONS': {'MAX_ENTRIES': 10000},  # 기본값 300이면 페이지 캐시가 금방 지워진다
+    }}
+
+# 로그인하지 않은 사용자의 블로그 페이지 캐시 (blog/page_cache.py)
+BLOG_PAGE_CACHE = True
+
+# 첨부 파일 다운로드(blog/downloads.py)를 프록시에 맡긴다.
+#   '': Django가 직접 보낸다 (Range 지원), 'nginx': X-Accel-Redirect, 'apache': X-Sendfile (mod_xsendfile, lighttpd)
+# nginx는 BLOG_SENDFILE_URL을 MEDIA_ROOT를 가리키는 internal location으로 설정한다
+BLOG_SENDFILE = os.environ.get('BLOG_SENDFILE', '')
+BLOG_SENDFILE_URL = os.environ.get('BLOG_SENDFILE_URL', '/protected-media/')
+
+# 사이트맵(blog/sitemaps.py) 파일 하나에 넣을 최대 포스트 수. 넘으면 /sitemap-posts.xml?p=2 처럼 나뉜다
+BLOG_SITEMAP_LIMIT = 5000
+
+# 태그 자동완성 인덱스(blog/tags.py)를 태그가 바뀐 뒤 백그라운드 스레드에서 다시 만든다. 그동안은 예전 인덱스로 답한다
+BLOG_TAG_INDEX_BACKGROUND = True
+
+# HTML 응답의 들여쓰기, 빈 줄, 주석을 지운다 (blogcraft_django/minify.py)
+BLOG_MINIFY_HTML = True
+
+# 요청 계측 (blogcraft_django/metrics.py)
+BLOG_SERVER_TIMING = True  # 응답에 Server-Timing 헤더를 붙인다
+# 워커 프로세스들이 /metrics 값을 합치기 위해 공유하는 디렉터리. 배포할 때 비운다
+BLOG_METRICS_DIR = os.environ.get('BLOG_METRICS_DIR', os.path.join(tempfile.gettempdir(), 'blogcraft_metrics'))
+# /metrics를 볼 수 있는 주소 또는 네트워크 (예: '127.0.0.1 10.0.0.0/8'). X-Forwarded-For가 아닌 REMOTE_ADDR로 확인한다
+BLOG_METRICS_ALLOWED_IPS = os.environ.get('BLOG_METRICS_ALLOWED_IPS', '127.0.0.1 ::1').split()
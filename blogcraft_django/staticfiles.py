@@ -0,0 +1,150 @@
+"""
+정적 파일 파이프라인.
+
+collectstatic 할 때 CompressedManifestStaticFilesStorage가 파일 이름에 내용 해시를 넣고
+(bootstrap.min.css -> bootstrap.min.<hash>.css), 텍스트 파일은 옆에 .gz, .br 파일을 미리 만들어 둔다.
+StaticFilesMiddleware는 STATIC_ROOT의 파일을 Accept-Encoding에 맞는 압축본으로 돌려주고,
+해시가 들어간 이름이면 내용이 절대 바뀌지 않으므로 Cache-Control: immutable을 붙인다.
+요청마다 압축하지 않으므로 CPU를 쓰지 않는다.
+
+brotli 패키지가 없으면 .br 파일은 만들지 않고 gzip만 쓴다.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import http_date, parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.svg', '.json', '.txt', '.html', '.xml', '.ico'}
+MIN_COMPRESS_SIZE = 256  # 이보다 작은 파일은 압축해도 헤더 크기만큼도 줄지 않는다
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MUTABLE_MAX_AGE = 60  # 해시가 없는 이름(템플릿 밖에서 직접 링크한 경우)은 짧게 캐시한다
+
+# 압축 방식: (Accept-Encoding 이름, 파일 확장자), 앞에 있을수록 우선
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def _accepts(request, encoding):
+    accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return any(
+        part.split(';')[0].strip() == encoding and not re.search(r';\s*q=0(\.0*)?\s*$', part)
+        for part in accept.split(',')
+    )
+
+
+def compress_file(path):
+    """path 옆에 path.gz, path.br을 만든다. 원본보다 작아지지 않으면 만들지 않는다. 만든 파일 목록을 돌려준다."""
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+        return []
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}  # mtime=0: 같은 내용이면 같은 파일
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    written = []
+    for extension, compressed in variants.items():
+        if len(compressed) < len(data):
+            with open(path + extension, 'wb') as f:
+                f.write(compressed)
+            written.append(path + extension)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if self.exists(name):
+                compress_file(self.path(name))
+
+    def url_converter(self, name, hashed_files, template=None):
+        converter = super().url_converter(name, hashed_files, template)
+
+        def keep_missing(matchobj):
+            # 주석 안의 주소나 빌드 전 소스(@import "tailwindcss")처럼 가리키는 파일이 없으면 그대로 둔다
+            try:
+                return converter(matchobj)
+            except ValueError:
+                return matchobj['matched']
+        return keep_missing
+
+    def stored_name(self, name):
+        # collectstatic을 하기 전(개발 서버, 테스트)이나 manifest에 없는 파일은 원래 이름을 쓴다
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def is_immutable(self, name):
+        names = getattr(self, '_immutable_names', None)
+        if names is None:
+            names = self._immutable_names = set(self.hashed_files.values())
+        return name in names
+
+
+class StaticFilesMiddleware(MiddlewareMixin):
+    """STATIC_URL 아래 요청을 STATIC_ROOT에서 바로 돌려준다. 미리 만든 압축본을 고르고 캐시 헤더를 붙인다."""
+
+    def process_request(self, request):
+        prefix = '/' + settings.STATIC_URL.lstrip('/')
+        if not settings.STATIC_ROOT or request.method not in ('GET', 'HEAD') or not request.path.startswith(prefix):
+            return None
+        name = request.path[len(prefix):]
+        try:
+            path = safe_join(settings.STATIC_ROOT, name)
+        except SuspiciousFileOperation:
+            return None
+        if not name or not os.path.isfile(path):
+            return None
+
+        stat = os.stat(path)
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if if_modified_since is not None and int(stat.st_mtime) <= if_modified_since:
+            response = HttpResponseNotModified()
+        else:
+            response = self._file_response(request, path)
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        is_immutable = getattr(staticfiles_storage, 'is_immutable', None)
+        if is_immutable is not None and is_immutable(name):
+            response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={MUTABLE_MAX_AGE}'
+        return response
+
+    def _file_response(self, request, path):
+        content_type, _ = mimetypes.guess_type(path)
+        serve_path, content_encoding = path, None
+        compressible = os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+        if compressible:
+            for encoding, extension in ENCODINGS:
+                if _accepts(request, encoding) and os.path.isfile(path + extension):
+                    serve_path, content_encoding = path + extension, encoding
+                    break
+
+        response = FileResponse(
+            open(serve_path, 'rb'), filename=os.path.basename(path),
+            content_type=content_type or 'application/octet-stream',
+        )
+        if content_encoding:
+            response['Content-Encoding'] = content_encoding
+        if compressible:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -19,10 +19,16 @@ from django.urls import path, include
 
 from django.conf import settings
 from django.conf.urls.static import static
+from .metrics import metrics_view
+from blog.sitemaps import SITEMAPS, sitemap_index, sitemap_section
 
 urlpatterns = [
     path('blog/', include('blog.urls')),
+    path('api/', include('blog.api_urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view),  # Prometheus 수집용
+    path('sitemap.xml', sitemap_index, {'sitemaps': SITEMAPS, 'sitemap_url_name': 'sitemap-section'}),
+    path('sitemap-<section>.xml', sitemap_section, {'sitemaps': SITEMAPS}, name='sitemap-section'),
     path('markdownx/', include('markdownx.urls')),
     # path('accounts/', include('allauth.urls')),
     path('accounts/', include('allauth.urls')),
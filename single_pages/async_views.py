@@ -0,0 +1,19 @@
+from asgiref.sync import sync_to_async
+from blog.models import Post
+from blog.avatars import prefetch_avatars
+from blog.page_cache import cache_anonymous_page
+from blog.async_views import arender
+
+
+# views.landing의 async 버전 (blogcraft_django/asgi_urls.py)
+@cache_anonymous_page
+async def landing(request):
+    recent_posts = [post async for post in Post.objects.select_related('author').order_by('-pk')[:3]]
+    await sync_to_async(prefetch_avatars)([post.author for post in recent_posts])
+    return await arender(
+        request,
+        'single_pages/landing.html',
+        {
+            'recent_posts': recent_posts
+        }
+    )
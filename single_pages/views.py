@@ -1,9 +1,13 @@
 from django.shortcuts import render
 from blog.models import Post
+from blog.avatars import prefetch_avatars
+from blog.page_cache import cache_anonymous_page
 
 
+@cache_anonymous_page
 def landing(request):
-    recent_posts = Post.objects.order_by('-pk')[:3]
+    recent_posts = list(Post.objects.select_related('author').order_by('-pk')[:3])
+    prefetch_avatars([post.author for post in recent_posts])
     return render(
         request,
         'single_pages/landing.html',